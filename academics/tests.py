@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from attendance.models import AttendanceRecord
+from schools.models import School
+from .models import ClassRoom, StudentProfile
+
+
+class StudentDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        cls.student, other = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{roll}'),
+                school=cls.school, classroom=classroom, roll_number=roll,
+            )
+            for roll in ('1', '2')
+        ]
+        cls.today = date.today()
+        cls.marks = {cls.today: True, cls.today - timedelta(days=1): False, cls.today - timedelta(days=20): True}
+        for day, present in cls.marks.items():
+            AttendanceRecord.objects.create(school=cls.school, student=cls.student, date=day, present=present)
+        AttendanceRecord.objects.create(school=cls.school, student=other, date=cls.today, present=False)
+
+    def detail(self, **params):
+        return APIClient().get(f'/api/academics/students/{self.student.id}/detail/', params, secure=True)
+
+    def test_term_and_month_totals(self):
+        term_start = self.today - timedelta(days=10)
+        response = self.detail(term_start=term_start.isoformat(), days=3)
+
+        self.assertEqual(response.status_code, 200)
+        attendance = response.data['attendance']
+        self.assertEqual(
+            (attendance['total_days'], attendance['present_days'], attendance['absent_days'], attendance['percentage']),
+            (2, 1, 1, 50.0),
+        )
+        # A school without a calendar works every day
+        self.assertEqual((attendance['term']['start'], attendance['term']['working_days']), (term_start, 11))
+
+        month_marks = [present for day, present in self.marks.items() if day >= self.today.replace(day=1)]
+        month = attendance['month']
+        self.assertEqual((month['total_days'], month['present_days']), (len(month_marks), sum(month_marks)))
+
+        self.assertEqual(attendance['recent'], {'start': self.today - timedelta(days=2), 'days': [None, 0, 1]})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.detail(term_start='last year').status_code, 400)
+        self.assertEqual(self.detail(days=400).status_code, 400)
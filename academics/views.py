@@ -173,8 +173,9 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
     search_fields = ['user__username','user__first_name','user__last_name','roll_number']
     parser_classes = [MultiPartParser, FormParser]
     
-    @action(detail=True, methods=['get'])
-    def detail(self, request, pk=None):
+    # Not named detail(): DRF sets self.detail on every viewset instance
+    @action(detail=True, methods=['get'], url_path='detail', url_name='detail')
+    def student_detail(self, request, pk=None):
         """Get detailed student information including results and attendance"""
         student = self.get_object()
         
@@ -199,13 +200,15 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
                 'is_passed': result.is_passed
             })
         
-        # Get attendance summary (placeholder - implement when attendance app is ready)
-        attendance_summary = {
-            'total_days': 0,
-            'present_days': 0,
-            'absent_days': 0,
-            'percentage': 0
-        }
+        # Attendance: term (1 January, or ?term_start=, to today) and current month
+        # totals from one aggregate, plus ?days=N compact day-by-day marks
+        try:
+            attendance_summary = self._attendance_summary(student, request.query_params)
+        except ValueError:
+            return Response(
+                {"detail": "term_start must be YYYY-MM-DD and days a number up to 366"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return Response({
             'id': student.id,
@@ -219,6 +222,73 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
             'attendance': attendance_summary
         })
     
+    def _attendance_summary(self, student, params):
+        from datetime import date, datetime, timedelta
+        from django.db.models import Count, Q
+        from attendance.models import AttendanceRecord, AttendanceMonth
+        from attendance.months import month_start
+        from schools.calendar import working_days
+        
+        today = datetime.now().date()
+        term_start = date.fromisoformat(params['term_start']) if params.get('term_start') else date(today.year, 1, 1)
+        this_month = month_start(today)
+        
+        def period(prefix, start):
+            in_range = Q(date__gte=start, date__lte=today)
+            return {
+                f'{prefix}_total': Count('id', filter=in_range),
+                f'{prefix}_present': Count('id', filter=in_range & Q(present=True)),
+            }
+        
+        totals = AttendanceRecord.objects.filter(student=student).aggregate(
+            **period('term', term_start), **period('month', this_month)
+        )
+        
+        def summary(prefix, start):
+            total = totals[f'{prefix}_total']
+            present = totals[f'{prefix}_present']
+            return {
+                'start': start,
+                'end': today,
+                'working_days': working_days(student.school_id, start, today),
+                'total_days': total,
+                'present_days': present,
+                'absent_days': total - present,
+                'percentage': round(present / total * 100, 2) if total else 0,
+            }
+        
+        term = summary('term', term_start)
+        attendance = {
+            # Top-level totals are the term's, as before
+            'total_days': term['total_days'],
+            'present_days': term['present_days'],
+            'absent_days': term['absent_days'],
+            'percentage': term['percentage'],
+            'term': term,
+            'month': summary('month', this_month),
+        }
+        
+        days = int(params.get('days') or 0)
+        if not 0 <= days <= 366:
+            raise ValueError('days out of range')
+        if days:
+            # 1 present, 0 absent, null unmarked; oldest first, from the month bitmaps
+            first = today - timedelta(days=days - 1)
+            masks = {
+                month: (present_mask, absent_mask)
+                for month, present_mask, absent_mask in AttendanceMonth.objects.filter(
+                    student=student, month__gte=month_start(first), month__lte=today
+                ).values_list('month', 'present_mask', 'absent_mask')
+            }
+            recent = []
+            for offset in range(days):
+                day = first + timedelta(days=offset)
+                present_mask, absent_mask = masks.get(month_start(day), (0, 0))
+                bit = 1 << (day.day - 1)
+                recent.append(1 if present_mask & bit else 0 if absent_mask & bit else None)
+            attendance['recent'] = {'start': first, 'days': recent}
+        return attendance
+    
     @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
     def upload_photo(self, request, pk=None):
         """Upload photo for a student"""
@@ -238,32 +308,28 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        """Export students to CSV"""
-        import csv
-        from django.http import HttpResponse
-        
-        school_id = request.query_params.get('school')
-        classroom_id = request.query_params.get('classroom')
+        """Export students to CSV (or XLSX with ?file_format=xlsx), streamed"""
+        from schools.exports import stream_export, full_name
         
         qs = self.filter_queryset(self.get_queryset())
         
-        response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-        response['Content-Disposition'] = 'attachment; filename="students_export.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Serial', 'Student Name', 'Username', 'Class', 'Section', 'Roll Number', 'Parent Name', 'Parent Username'])
+        fields = [
+            'user__first_name', 'user__last_name', 'user__username', 'classroom__name',
+            'section__name', 'roll_number', 'guardian_name', 'guardian__username',
+        ]
         
-        for idx, sp in enumerate(qs, start=1):
-            user = sp.user
-            student_name = f"{user.first_name} {user.last_name}".strip() or user.username
-            classroom = sp.classroom.name if sp.classroom else ''
-            section = sp.section.name if sp.section else ''
-            parent_name = sp.guardian_name or ''
-            parent_username = sp.guardian.username if sp.guardian else ''
-            
-            writer.writerow([idx, student_name, user.username, classroom, section, sp.roll_number or '', parent_name, parent_username])
+        def build_row(idx, row):
+            first, last, username, classroom, section, roll, parent_name, parent_username = row
+            return [
+                idx, full_name(first, last, username), username, classroom or '', section or '',
+                roll or '', parent_name or '', parent_username or ''
+            ]
         
-        return response
+        return stream_export(
+            request, qs, fields,
+            ['Serial', 'Student Name', 'Username', 'Class', 'Section', 'Roll Number', 'Parent Name', 'Parent Username'],
+            build_row, 'students_export'
+        )
 
 
 class TeacherAssignmentViewSet(viewsets.ModelViewSet):
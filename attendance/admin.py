@@ -1,7 +1,23 @@
 from django.contrib import admin
-from .models import AttendanceRecord
+from .models import AttendanceRecord, AttendanceMonth, AttendanceDailyRollup, StudentAttendanceRisk
 
 @admin.register(AttendanceRecord)
 class AttendanceRecordAdmin(admin.ModelAdmin):
     list_display = ['id','school','student','date','present']
     list_filter = ['date','present']
+
+@admin.register(AttendanceMonth)
+class AttendanceMonthAdmin(admin.ModelAdmin):
+    list_display = ['id','school','student','month','present_days','absent_days','marked_days']
+    list_filter = ['month']
+    readonly_fields = ['present_mask','absent_mask','marked_mask']
+
+@admin.register(AttendanceDailyRollup)
+class AttendanceDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['id','school','classroom','section','date','present','absent','total']
+    list_filter = ['date']
+
+@admin.register(StudentAttendanceRisk)
+class StudentAttendanceRiskAdmin(admin.ModelAdmin):
+    list_display = ['id','school','student','as_of','absent_streak','window_absent','month_percentage','is_at_risk']
+    list_filter = ['is_at_risk','school']
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage academic-year partitions of the attendance table (PostgreSQL only): "
+        "status, convert (one-off, needs a maintenance window), create, detach, archive"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('step', choices=['status', 'convert', 'create', 'detach', 'archive'])
+        parser.add_argument('--ahead', type=int, default=1, help='Academic years ahead to create partitions for (default 1)')
+        parser.add_argument('--before', type=int, help='detach/archive: academic years before this one')
+        parser.add_argument('--output-dir', help='archive: directory of the .csv.gz files (default ATTENDANCE_ARCHIVE_DIR)')
+
+    def handle(self, *args, **options):
+        step = options['step']
+        if step in ('detach', 'archive') and options.get('before') is None:
+            raise CommandError(f"{step} needs --before YEAR")
+        try:
+            if step == 'status':
+                self._status()
+            elif step == 'convert':
+                years = partitions.convert_to_partitioned(ahead=options['ahead'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Partitioned the attendance table into {len(years)} academic years ({years[0]}-{years[-1]}) plus a default partition"
+                ))
+            elif step == 'create':
+                years = partitions.create_partitions(ahead=options['ahead'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Created partitions for {', '.join(map(str, years))}" if years else "All partitions already exist"
+                ))
+            elif step == 'detach':
+                years = partitions.detach_partitions(options['before'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Detached partitions for {', '.join(map(str, years))}" if years else "Nothing to detach"
+                ))
+            else:
+                archived = partitions.archive_partitions(options['before'], options.get('output_dir'))
+                for year, path, rows in archived:
+                    self.stdout.write(f"{year}: {rows} records -> {path}")
+                self.stdout.write(self.style.SUCCESS(f"Archived {len(archived)} partitions"))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+    def _status(self):
+        tables = partitions.list_partitions()
+        if not partitions.is_partitioned():
+            self.stdout.write("The attendance table is not partitioned")
+        for name, year, attached, rows in tables:
+            label = 'default' if year is None else f'{year}'
+            state = 'attached' if attached else 'detached'
+            self.stdout.write(f"{label:>8}  {name}  {state}  ~{rows} rows")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from attendance.months import rebuild_attendance_months
+
+
+class Command(BaseCommand):
+    help = "Backfill the monthly attendance bitmaps (AttendanceMonth) from AttendanceRecord rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only rebuild this school')
+
+    def handle(self, *args, **options):
+        written = rebuild_attendance_months(school_id=options.get('school'))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} student-month attendance rows"))
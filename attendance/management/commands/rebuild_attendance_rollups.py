@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from attendance.rollups import rebuild_attendance_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily attendance rollups (AttendanceDailyRollup) from AttendanceRecord rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only rebuild this school')
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First day, YYYY-MM-DD')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last day, YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        written = rebuild_attendance_rollups(
+            school_id=options.get('school'),
+            start=options.get('start'),
+            end=options.get('end'),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily attendance rollups"))
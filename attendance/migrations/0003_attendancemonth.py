@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_attendance_months(apps, schema_editor):
+    """
+    Build the monthly bitmaps of records saved before this migration: bit
+    d - 1 of a month's masks stands for day d.
+    """
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceMonth = apps.get_model('attendance', 'AttendanceMonth')
+    masks = {}
+    for school_id, student_id, day, present in (
+        AttendanceRecord.objects.order_by().values_list('school_id', 'student_id', 'date', 'present')
+        .iterator(chunk_size=5000)
+    ):
+        entry = masks.setdefault((student_id, day.replace(day=1)), [school_id, 0, 0])
+        entry[1 if present else 2] |= 1 << (day.day - 1)
+    AttendanceMonth.objects.bulk_create([
+        AttendanceMonth(
+            school_id=school_id, student_id=student_id, month=month,
+            present_mask=present_mask, absent_mask=absent_mask, marked_mask=present_mask | absent_mask,
+        )
+        for (student_id, month), (school_id, present_mask, absent_mask) in masks.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0007_alter_teacherassignment_teacher'),
+        ('schools', '0003_remove_school_cover_remove_school_slug_and_more'),
+        ('attendance', '0002_attendancerecord_attendance__school__8edf1d_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('present_mask', models.PositiveIntegerField(default=0)),
+                ('absent_mask', models.PositiveIntegerField(default=0)),
+                ('marked_mask', models.PositiveIntegerField(default=0)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to='schools.school')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to='academics.studentprofile')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['school', 'month'], name='attendance__school__5cf9fd_idx')],
+                'unique_together': {('student', 'month')},
+            },
+        ),
+        migrations.RunPython(build_attendance_months, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:13
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def build_daily_rollups(apps, schema_editor):
+    """Count the records saved before this migration into daily rollups"""
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceDailyRollup = apps.get_model('attendance', 'AttendanceDailyRollup')
+    groups = (
+        AttendanceRecord.objects.values('school_id', 'student__classroom_id', 'student__section_id', 'date')
+        .annotate(present=Count('id', filter=Q(present=True)), total=Count('id'))
+        .order_by()
+    )
+    AttendanceDailyRollup.objects.bulk_create([
+        AttendanceDailyRollup(
+            school_id=group['school_id'],
+            classroom_id=group['student__classroom_id'],
+            section_id=group['student__section_id'],
+            date=group['date'],
+            present=group['present'],
+            absent=group['total'] - group['present'],
+            total=group['total'],
+        )
+        for group in groups.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0007_alter_teacherassignment_teacher'),
+        ('schools', '0004_schoolcalendar'),
+        ('attendance', '0003_attendancemonth'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('classroom', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='academics.classroom')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='schools.school')),
+                ('section', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='academics.section')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['school', 'date'], name='attendance__school__fe4778_idx')],
+                'unique_together': {('school', 'classroom', 'section', 'date')},
+            },
+        ),
+        migrations.RunPython(build_daily_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:15
+
+from django.db import migrations, models
+
+
+def number_existing_records(apps, schema_editor):
+    """Give existing records increasing sequences per school so feeds can page through them"""
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceSequence = apps.get_model('attendance', 'AttendanceSequence')
+    counters = {}
+    batch = []
+    for record in AttendanceRecord.objects.order_by('school_id', 'id').only('id', 'school_id').iterator(chunk_size=2000):
+        counters[record.school_id] = counters.get(record.school_id, 0) + 1
+        record.sequence = counters[record.school_id]
+        batch.append(record)
+        if len(batch) >= 1000:
+            AttendanceRecord.objects.bulk_update(batch, ['sequence'])
+            batch = []
+    if batch:
+        AttendanceRecord.objects.bulk_update(batch, ['sequence'])
+    AttendanceSequence.objects.bulk_create([
+        AttendanceSequence(school_id=school_id, value=value) for school_id, value in counters.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendancerecord_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('school_id', models.BigIntegerField(unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AttendanceTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('school_id', models.BigIntegerField()),
+                ('record_id', models.BigIntegerField()),
+                ('student_id', models.BigIntegerField()),
+                ('date', models.DateField()),
+                ('sequence', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['sequence'],
+            },
+        ),
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='sequence',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['school', 'sequence'], name='attendance__school__322e8b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancetombstone',
+            index=models.Index(fields=['school_id', 'sequence'], name='attendance__school__99a6d2_idx'),
+        ),
+        migrations.RunPython(number_existing_records, migrations.RunPython.noop),
+    ]
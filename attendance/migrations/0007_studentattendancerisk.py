@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0004_schoolcalendar'),
+        ('academics', '0007_alter_teacherassignment_teacher'),
+        ('attendance', '0006_attendance_sync_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceRisk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('absent_streak', models.PositiveIntegerField(default=0)),
+                ('last_marked', models.DateField(blank=True, null=True)),
+                ('window_absent', models.PositiveIntegerField(default=0)),
+                ('window_marked', models.PositiveIntegerField(default=0)),
+                ('month_present', models.PositiveIntegerField(default=0)),
+                ('month_counted', models.PositiveIntegerField(default=0)),
+                ('month_percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('reasons', models.JSONField(blank=True, default=list)),
+                ('is_at_risk', models.BooleanField(default=False)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_risks', to='schools.school')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_risk', to='academics.studentprofile')),
+            ],
+            options={
+                'ordering': ['-absent_streak', 'month_percentage'],
+                'indexes': [models.Index(fields=['school', 'is_at_risk'], name='attendance__school__3ce70b_idx')],
+            },
+        ),
+    ]
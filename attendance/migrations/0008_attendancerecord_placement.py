@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:54
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+import django.db.models.deletion
+
+
+def place_existing_records(apps, schema_editor):
+    """
+    Give existing records their student's current class and section, the
+    best record of where they sat, and recount the rollups to match.
+    """
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceDailyRollup = apps.get_model('attendance', 'AttendanceDailyRollup')
+    StudentProfile = apps.get_model('academics', 'StudentProfile')
+    student = StudentProfile.objects.filter(pk=OuterRef('student_id'))
+    AttendanceRecord.objects.update(
+        classroom_id=Subquery(student.values('classroom_id')[:1]),
+        section_id=Subquery(student.values('section_id')[:1]),
+    )
+    AttendanceDailyRollup.objects.all().delete()
+    groups = (
+        AttendanceRecord.objects.values('school_id', 'classroom_id', 'section_id', 'date')
+        .annotate(present=Count('id', filter=Q(present=True)), total=Count('id'))
+        .order_by()
+    )
+    AttendanceDailyRollup.objects.bulk_create([
+        AttendanceDailyRollup(
+            school_id=group['school_id'],
+            classroom_id=group['classroom_id'],
+            section_id=group['section_id'],
+            date=group['date'],
+            present=group['present'],
+            absent=group['total'] - group['present'],
+            total=group['total'],
+        )
+        for group in groups.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0007_alter_teacherassignment_teacher'),
+        ('attendance', '0007_studentattendancerisk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='classroom',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_records', to='academics.classroom'),
+        ),
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='section',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_records', to='academics.section'),
+        ),
+        migrations.RunPython(place_existing_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:09
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    """Fold rollup rows of the same place and day, which NULL classrooms or sections let through"""
+    AttendanceDailyRollup = apps.get_model('attendance', 'AttendanceDailyRollup')
+    kept = {}
+    duplicates = []
+    for row in AttendanceDailyRollup.objects.filter(models.Q(classroom__isnull=True) | models.Q(section__isnull=True)).order_by('id'):
+        key = (row.school_id, row.classroom_id, row.section_id, row.date)
+        first = kept.setdefault(key, row)
+        if first is not row:
+            first.present += row.present
+            first.absent += row.absent
+            first.total += row.total
+            duplicates.append(row.id)
+    if duplicates:
+        AttendanceDailyRollup.objects.bulk_update(kept.values(), ['present', 'absent', 'total'], batch_size=1000)
+        AttendanceDailyRollup.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_attendancerecord_placement'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='attendancedailyrollup',
+            unique_together=set(),
+        ),
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendancedailyrollup',
+            constraint=models.UniqueConstraint(models.F('school'), django.db.models.functions.comparison.Coalesce('classroom', models.Value(0)), django.db.models.functions.comparison.Coalesce('section', models.Value(0)), models.F('date'), name='attendance_rollup_unique_place_day'),
+        ),
+    ]
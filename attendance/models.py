@@ -1,13 +1,21 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from schools.models import School
-from academics.models import StudentProfile
+from academics.models import StudentProfile, ClassRoom, Section
 
 class AttendanceRecord(models.Model):
     school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='attendance_records')
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendances')
+    # Where the student sat when the record was created; the daily rollups
+    # keep counting it there after the student moves
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.SET_NULL, null=True, blank=True, related_name='attendance_records')
+    section = models.ForeignKey(Section, on_delete=models.SET_NULL, null=True, blank=True, related_name='attendance_records')
     date = models.DateField()
     present = models.BooleanField(default=True)
     note = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Per-school change sequence for the sync feed (see sync.allocate_sequences)
+    sequence = models.BigIntegerField(default=0)
 
     class Meta:
         unique_together = ('student', 'date')
@@ -16,7 +24,154 @@ class AttendanceRecord(models.Model):
             models.Index(fields=['school', 'date']),
             models.Index(fields=['school']),
             models.Index(fields=['date']),
+            models.Index(fields=['school', 'sequence']),
         ]
 
+    def save(self, *args, **kwargs):
+        from .sync import allocate_sequences
+
+        # Signal handlers update the bitmaps and rollups in the same transaction
+        with transaction.atomic():
+            if self._state.adding and self.classroom_id is None and self.section_id is None:
+                self.classroom_id, self.section_id = (
+                    StudentProfile.objects.filter(pk=self.student_id)
+                    .values_list('classroom_id', 'section_id').first() or (None, None)
+                )
+            self.sequence = allocate_sequences(self.school_id, 1).start
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'sequence', 'updated_at'}
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"{self.student.user.username} - {self.date} - {'P' if self.present else 'A'}"
+
+
+class AttendanceMonth(models.Model):
+    """
+    One student's attendance for one month as day bitmasks (bit 0 = day 1).
+    Kept in sync with AttendanceRecord; counts are popcounts of the masks.
+    """
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='attendance_months')
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='attendance_months')
+    month = models.DateField()  # first day of the month
+    present_mask = models.PositiveIntegerField(default=0)
+    absent_mask = models.PositiveIntegerField(default=0)
+    marked_mask = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'month')
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['school', 'month']),
+        ]
+
+    @property
+    def present_days(self):
+        return self.present_mask.bit_count()
+
+    @property
+    def absent_days(self):
+        return self.absent_mask.bit_count()
+
+    @property
+    def marked_days(self):
+        return self.marked_mask.bit_count()
+
+    def __str__(self):
+        return f"{self.student.user.username} - {self.month:%Y-%m} - {self.present_days}/{self.marked_days}"
+
+
+class AttendanceDailyRollup(models.Model):
+    """
+    Marked attendance per school, classroom, section and day.
+    Maintained incrementally from AttendanceRecord writes; classroom and
+    section are the ones stored on each record.
+    """
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='attendance_rollups')
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_rollups')
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_rollups')
+    date = models.DateField()
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['school', 'date']),
+        ]
+        constraints = [
+            # NULLs are distinct in a plain unique index; 0 stands in for "no classroom/section"
+            models.UniqueConstraint(
+                'school', Coalesce('classroom', models.Value(0)), Coalesce('section', models.Value(0)), 'date',
+                name='attendance_rollup_unique_place_day',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.school_id} - {self.classroom_id}/{self.section_id} - {self.date}: {self.present}/{self.total}"
+
+
+class AttendanceSequence(models.Model):
+    """
+    Last change sequence handed out for a school's attendance records.
+    Plain ids instead of foreign keys: deletes cascading from a school or
+    student still write here while their parents are being removed.
+    """
+    school_id = models.BigIntegerField(unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.school_id}: {self.value}"
+
+
+class AttendanceTombstone(models.Model):
+    """A deleted AttendanceRecord, kept so sync clients can drop it too"""
+    school_id = models.BigIntegerField()
+    record_id = models.BigIntegerField()
+    student_id = models.BigIntegerField()
+    date = models.DateField()
+    sequence = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['sequence']
+        indexes = [
+            models.Index(fields=['school_id', 'sequence']),
+        ]
+
+    def __str__(self):
+        return f"{self.record_id} deleted at #{self.sequence}"
+
+
+class StudentAttendanceRisk(models.Model):
+    """
+    Current absence streak and rolling absence counts of a student, kept up
+    to date from attendance writes so at-risk lists are an indexed lookup.
+    """
+    student = models.OneToOneField(StudentProfile, on_delete=models.CASCADE, related_name='attendance_risk')
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='attendance_risks')
+    as_of = models.DateField()
+    absent_streak = models.PositiveIntegerField(default=0)  # consecutive absences up to the last marked day
+    last_marked = models.DateField(null=True, blank=True)
+    window_absent = models.PositiveIntegerField(default=0)  # absences in the last ATTENDANCE_RISK_WINDOW_DAYS
+    window_marked = models.PositiveIntegerField(default=0)
+    month_present = models.PositiveIntegerField(default=0)
+    month_counted = models.PositiveIntegerField(default=0)  # days marked for the student or their class and section
+    month_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    reasons = models.JSONField(default=list, blank=True)
+    is_at_risk = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-absent_streak', 'month_percentage']
+        indexes = [
+            models.Index(fields=['school', 'is_at_risk']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.user.username} - streak {self.absent_streak}, {self.month_percentage}%"
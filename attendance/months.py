@@ -0,0 +1,170 @@
+"""
+Monthly attendance bitmaps.
+
+AttendanceMonth keeps one row per student per month with the days marked
+present/absent as bits (bit 0 = day 1), so monthly and yearly totals are
+popcounts over ~1/30th of the AttendanceRecord rows.
+"""
+from datetime import date
+
+from django.db import transaction
+
+from .models import AttendanceRecord, AttendanceMonth
+
+MASK_FIELDS = ['present_mask', 'absent_mask', 'marked_mask']
+
+
+def as_date(day):
+    # Records created with ISO strings keep them until reloaded
+    return date.fromisoformat(day) if isinstance(day, str) else day
+
+
+def month_start(day):
+    return as_date(day).replace(day=1)
+
+
+def day_bit(day):
+    return 1 << (as_date(day).day - 1)
+
+
+def range_mask(month, start=None, end=None):
+    """Bits of the days of month that fall within [start, end]"""
+    first = 1
+    last = 31
+    if start is not None and month_start(start) == month:
+        first = start.day
+    if end is not None and month_start(end) == month:
+        last = end.day
+    if last < first:
+        return 0
+    return ((1 << last) - 1) ^ ((1 << (first - 1)) - 1)
+
+
+def iter_months(start, end):
+    """First days of every month from start to end, inclusive"""
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def apply_attendance_marks(marks=(), cleared=()):
+    """
+    Update AttendanceMonth bitmaps in place.
+
+    marks is an iterable of (school_id, student_id, date, present) that were
+    written; cleared is an iterable of (student_id, date) whose record was
+    removed. Touched month rows are locked, updated in memory and written
+    back with one upsert; months left without any marked day are deleted.
+    """
+    changes = {}
+    for school_id, student_id, day, present in marks:
+        entry = changes.setdefault((student_id, month_start(day)), [school_id, []])
+        entry[0] = entry[0] or school_id
+        entry[1].append((day_bit(day), present))
+    for student_id, day in cleared:
+        changes.setdefault((student_id, month_start(day)), [None, []])[1].append((day_bit(day), None))
+    if not changes:
+        return
+
+    with transaction.atomic():
+        existing = {
+            (row.student_id, row.month): row
+            for row in AttendanceMonth.objects.select_for_update().filter(
+                student_id__in={student_id for student_id, _ in changes},
+                month__in={month for _, month in changes},
+            )
+        }
+
+        rows = []
+        emptied = []
+        for (student_id, month), (school_id, bits) in changes.items():
+            row = existing.get((student_id, month))
+            if row is None:
+                if school_id is None:
+                    continue
+                row = AttendanceMonth(school_id=school_id, student_id=student_id, month=month)
+            for bit, present in bits:
+                row.present_mask &= ~bit
+                row.absent_mask &= ~bit
+                if present is True:
+                    row.present_mask |= bit
+                elif present is False:
+                    row.absent_mask |= bit
+            row.marked_mask = row.present_mask | row.absent_mask
+            if row.marked_mask:
+                rows.append(row)
+            elif row.pk:
+                emptied.append(row.pk)
+
+        if emptied:
+            AttendanceMonth.objects.filter(pk__in=emptied).delete()
+        if rows:
+            AttendanceMonth.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['student', 'month'],
+                update_fields=MASK_FIELDS,
+            )
+
+
+def month_rows(model, records):
+    """
+    Unsaved month rows of `model` (AttendanceMonth) for (school_id,
+    student_id, date, present) records.
+    """
+    masks = {}
+    for school_id, student_id, day, present in records:
+        entry = masks.setdefault((student_id, month_start(day)), [school_id, 0, 0])
+        entry[1 if present else 2] |= day_bit(day)
+    return [
+        model(
+            school_id=school_id, student_id=student_id, month=month,
+            present_mask=present_mask, absent_mask=absent_mask,
+            marked_mask=present_mask | absent_mask,
+        )
+        for (student_id, month), (school_id, present_mask, absent_mask) in masks.items()
+    ]
+
+
+def rebuild_attendance_months(school_id=None, chunk_size=5000):
+    """
+    Rebuild AttendanceMonth rows from AttendanceRecord, for one school or
+    all of them. Existing month rows of that scope are replaced; returns
+    the number of month rows written.
+    """
+    records = AttendanceRecord.objects.all()
+    months = AttendanceMonth.objects.all()
+    if school_id is not None:
+        records = records.filter(school_id=school_id)
+        months = months.filter(school_id=school_id)
+
+    rows = month_rows(
+        AttendanceMonth,
+        records.order_by().values_list('school_id', 'student_id', 'date', 'present')
+        .iterator(chunk_size=chunk_size),
+    )
+    with transaction.atomic():
+        months.delete()
+        AttendanceMonth.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def attendance_totals(student_ids, start, end):
+    """
+    Present/absent day counts per student between start and end (inclusive),
+    as {student_id: (present, absent)}. Partial months are masked to the range.
+    """
+    totals = {}
+    rows = AttendanceMonth.objects.filter(
+        student_id__in=student_ids, month__gte=month_start(start), month__lte=end
+    ).values_list('student_id', 'month', 'present_mask', 'absent_mask')
+    for student_id, month, present_mask, absent_mask in rows:
+        window = range_mask(month, start, end)
+        present, absent = totals.get(student_id, (0, 0))
+        totals[student_id] = (
+            present + (present_mask & window).bit_count(),
+            absent + (absent_mask & window).bit_count(),
+        )
+    return totals
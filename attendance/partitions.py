@@ -0,0 +1,287 @@
+"""
+Optional PostgreSQL range partitioning of AttendanceRecord by academic year.
+
+convert_to_partitioned() swaps the attendance table for one partitioned
+BY RANGE (date) with one partition per academic year plus a default
+partition for anything outside them. The Django model does not change, so
+SQLite development databases keep the plain table. Queries filtered by date
+only touch the partitions they need, and old years can be detached, or
+archived to gzipped CSV and dropped, without a bulk DELETE.
+
+Postgres needs the partition key in every unique constraint, so the primary
+key of the partitioned table is (id, date); (student, date) already
+includes it. Ids keep coming from the same sequence.
+
+Archiving removes rows without the record signals firing: the monthly
+bitmaps and daily rollups of archived years stay in place, but a full
+rebuild_attendance_months/rebuild_attendance_rollups afterwards only sees
+the rows still in the table. An archive can be loaded back with
+    \\copy attendance_attendancerecord FROM PROGRAM 'gunzip -c FILE' CSV HEADER
+"""
+from datetime import date
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AttendanceRecord
+
+TABLE = AttendanceRecord._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+UNPARTITIONED_TABLE = f'{TABLE}_unpartitioned'
+PARTITION_NAME = re.compile(rf'^{TABLE}_y(\d{{4}})$')
+
+
+def _start_month():
+    return getattr(settings, 'ATTENDANCE_ACADEMIC_YEAR_START_MONTH', 1)
+
+
+def academic_year(day):
+    """Academic year (the calendar year it starts in) of a date"""
+    return day.year if day.month >= _start_month() else day.year - 1
+
+
+def academic_year_range(year):
+    """[start, end) dates of an academic year"""
+    month = _start_month()
+    return date(year, month, 1), date(year + 1, month, 1)
+
+
+def partition_name(year):
+    return f'{TABLE}_y{year}'
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _check_postgres():
+    if connection.vendor != 'postgresql':
+        raise ValueError(f"Attendance partitioning needs PostgreSQL, this database is {connection.vendor}")
+
+
+def _relkind(cursor, name):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [name])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def is_partitioned():
+    """True when the attendance table is a partitioned table"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        return _relkind(cursor, TABLE) == 'p'
+
+
+def _require_partitioned(cursor):
+    _check_postgres()
+    if _relkind(cursor, TABLE) != 'p':
+        raise ValueError("The attendance table is not partitioned yet; run the 'convert' step first")
+
+
+def _year_tables(cursor):
+    """{year: attached} for every yearly attendance table, attached or detached"""
+    cursor.execute(
+        """
+        SELECT c.relname, EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+        FROM pg_class c
+        WHERE c.relkind = 'r' AND c.relnamespace = current_schema()::regnamespace
+          AND c.relname LIKE %s
+        """,
+        [f'{TABLE}_y%'],
+    )
+    tables = {}
+    for name, attached in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match:
+            tables[int(match.group(1))] = attached
+    return tables
+
+
+def _bounds(year):
+    start, end = academic_year_range(year)
+    return f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+
+def _create_partition(cursor, year):
+    """
+    Create the partition of one academic year. Rows of that year already
+    sitting in the default partition are moved into it first, since
+    Postgres refuses a new partition that overlaps rows in the default.
+    """
+    table, name = _quote(TABLE), _quote(partition_name(year))
+    start, end = academic_year_range(year)
+    default = _quote(DEFAULT_PARTITION)
+    if _relkind(cursor, DEFAULT_PARTITION) is not None:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {default} WHERE date >= %s AND date < %s)", [start, end]
+        )
+        if cursor.fetchone()[0]:
+            cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {default} WHERE date >= %s AND date < %s RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved",
+                [start, end],
+            )
+            # Indexes, keys and foreign keys are cloned from the parent on attach
+            cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {_bounds(year)}")
+            return
+    cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {_bounds(year)}")
+
+
+def _planned_years(first_year, ahead):
+    current = academic_year(timezone.localdate())
+    return range(min(first_year, current), current + ahead + 1)
+
+
+def convert_to_partitioned(ahead=1):
+    """
+    Replace the plain attendance table with a partitioned one holding the
+    same rows, ids, constraints and indexes. Creates a partition for every
+    academic year from the oldest record up to `ahead` years from now.
+    Runs in one transaction with the table locked; returns the years created.
+    """
+    _check_postgres()
+    table, legacy = _quote(TABLE), _quote(UNPARTITIONED_TABLE)
+    with transaction.atomic(), connection.cursor() as cursor:
+        if _relkind(cursor, TABLE) == 'p':
+            raise ValueError("The attendance table is already partitioned")
+        cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+        # Constraints and plain indexes are recreated on the new table under their old names
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c')",
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+            [TABLE],
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        old_sequence = cursor.fetchone()[0]
+        cursor.execute(f"SELECT last_value, is_called FROM {old_sequence}")
+        last_id, id_used = cursor.fetchone()
+        cursor.execute(f"SELECT min(date) FROM {table}")
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        cursor.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (date)")
+        years = _planned_years(academic_year(oldest) if oldest else academic_year(timezone.localdate()), ahead)
+        for year in years:
+            cursor.execute(f"CREATE TABLE {_quote(partition_name(year))} PARTITION OF {table} FOR VALUES {_bounds(year)}")
+        cursor.execute(f"CREATE TABLE {_quote(DEFAULT_PARTITION)} PARTITION OF {table} DEFAULT")
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+        # Also drops the old identity sequence and every old index name
+        cursor.execute(f"DROP TABLE {legacy}")
+
+        # Identity columns on partitioned tables need Postgres 17; use an owned sequence instead
+        sequence = _quote(f'{TABLE}_id_seq')
+        cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {table}.id")
+        cursor.execute("SELECT setval(%s, %s, %s)", [f'{TABLE}_id_seq', last_id, id_used])
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq'::regclass)")
+
+        for name, kind, definition in constraints:
+            if kind == 'p':
+                definition = 'PRIMARY KEY (id, date)'
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {_quote(name)} {definition}")
+        for definition in indexes:
+            cursor.execute(definition)
+    return list(years)
+
+
+def create_partitions(ahead=1):
+    """
+    Make sure every academic year from the current one up to `ahead` years
+    from now has a partition. Safe to run repeatedly (e.g. from cron);
+    returns the years created.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        _require_partitioned(cursor)
+        existing = _year_tables(cursor)
+        created = []
+        for year in _planned_years(academic_year(timezone.localdate()), ahead):
+            if year not in existing:
+                _create_partition(cursor, year)
+                created.append(year)
+    return created
+
+
+def list_partitions():
+    """[(table name, year or None for the default, attached, row estimate)]"""
+    _check_postgres()
+    with connection.cursor() as cursor:
+        years = _year_tables(cursor)
+        partitions = [(partition_name(year), year, attached) for year, attached in sorted(years.items())]
+        if _relkind(cursor, DEFAULT_PARTITION) is not None:
+            partitions.append((DEFAULT_PARTITION, None, True))
+        result = []
+        for name, year, attached in partitions:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [name])
+            result.append((name, year, attached, max(cursor.fetchone()[0], 0)))
+    return result
+
+
+def detach_partitions(before_year):
+    """
+    Detach the partitions of academic years before `before_year`. Their
+    rows leave AttendanceRecord but stay in standalone tables of the same
+    name. Returns the years detached.
+    """
+    detached = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        _require_partitioned(cursor)
+        for year, attached in sorted(_year_tables(cursor).items()):
+            if year < before_year and attached:
+                cursor.execute(
+                    f"ALTER TABLE {_quote(TABLE)} DETACH PARTITION {_quote(partition_name(year))}"
+                )
+                detached.append(year)
+    return detached
+
+
+def _copy_out(cursor, sql, out):
+    if hasattr(cursor.cursor, 'copy'):  # psycopg 3
+        with cursor.copy(sql) as copy:
+            for chunk in copy:
+                out.write(chunk)
+    else:
+        cursor.copy_expert(sql, out)
+
+
+def archive_partitions(before_year, directory=None):
+    """
+    Detach the partitions of academic years before `before_year`, write
+    each to <directory>/<table>.csv.gz (ATTENDANCE_ARCHIVE_DIR by default)
+    and drop it. A table is only dropped once its file is complete.
+    Returns [(year, path, rows)].
+    """
+    directory = directory or settings.ATTENDANCE_ARCHIVE_DIR
+    os.makedirs(directory, exist_ok=True)
+    detach_partitions(before_year)
+
+    archived = []
+    with connection.cursor() as cursor:
+        years = [year for year, attached in sorted(_year_tables(cursor).items()) if year < before_year]
+    for year in years:
+        name = partition_name(year)
+        path = os.path.join(directory, f'{name}.csv.gz')
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {_quote(name)} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(f"SELECT count(*) FROM {_quote(name)}")
+            rows = cursor.fetchone()[0]
+            partial = f'{path}.partial'
+            with gzip.open(partial, 'wb') as out:
+                _copy_out(cursor, f"COPY {_quote(name)} TO STDOUT WITH (FORMAT csv, HEADER)", out)
+            os.replace(partial, path)
+            cursor.execute(f"DROP TABLE {_quote(name)}")
+        archived.append((year, path, rows))
+    return archived
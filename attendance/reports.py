@@ -0,0 +1,61 @@
+"""
+Attendance totals against the school calendar.
+
+Days counted for a student are the school's working days in the range plus
+any other day that was marked anyway, so unmarked school days lower the
+percentage while off-days and holidays do not.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from schools.calendar import get_calendar_month
+from .models import AttendanceMonth
+from .months import month_start, range_mask, iter_months
+
+AttendanceRate = namedtuple('AttendanceRate', 'present absent unmarked counted working percentage')
+
+
+def elapsed_end(end):
+    """Clip a range end to today; future days are not missed yet"""
+    return min(end, datetime.now().date())
+
+
+def attendance_rates(school_id, students, start, end):
+    """
+    Return ({student_id: AttendanceRate}, working_days) for the given student
+    queryset between start and end (inclusive), from the monthly bitmaps.
+    Students without any record get every working day as unmarked.
+    """
+    windows = {}
+    working_days = 0
+    for month in iter_months(start, end):
+        window = range_mask(month, start, end)
+        working = get_calendar_month(school_id, month).working_mask & window
+        windows[month] = (window, working)
+        working_days += working.bit_count()
+
+    # Every working day starts out unmarked; month rows then fill in the marks
+    totals = {
+        student_id: [0, 0, working_days, working_days]
+        for student_id in students.values_list('id', flat=True)
+    }
+    rows = AttendanceMonth.objects.filter(
+        student__in=students, month__gte=month_start(start), month__lte=end
+    ).values_list('student_id', 'month', 'present_mask', 'absent_mask')
+    for student_id, month, present_mask, absent_mask in rows:
+        window, working = windows[month]
+        marked = (present_mask | absent_mask) & window
+        entry = totals[student_id]
+        entry[0] += (present_mask & window).bit_count()
+        entry[1] += (absent_mask & window).bit_count()
+        entry[2] -= (marked & working).bit_count()
+        entry[3] += (marked & ~working).bit_count()
+
+    rates = {
+        student_id: AttendanceRate(
+            present, absent, unmarked, counted, working_days,
+            round(present / counted * 100, 2) if counted else 0,
+        )
+        for student_id, (present, absent, unmarked, counted) in totals.items()
+    }
+    return rates, working_days
@@ -0,0 +1,170 @@
+"""
+Chronic-absence and streak detection.
+
+StudentAttendanceRisk keeps, per student, the current absence streak, the
+absences of the last ATTENDANCE_RISK_WINDOW_DAYS and this month's
+attendance percentage. They are recomputed from the AttendanceMonth
+bitmaps in one NumPy pass over a lookback of a few months: the masks are
+unpacked into a students x days matrix and every statistic is a row-wise
+reduction.
+
+The month percentage counts only days that were taken: days the student
+has a record, and days attendance was marked for the student's classroom
+and section (an unmarked student there counts as absent). Days nobody
+entered yet do not count, so a partly entered month is not flagged.
+"""
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from academics.models import StudentProfile
+from .models import AttendanceDailyRollup, AttendanceMonth, StudentAttendanceRisk
+from .months import month_start, iter_months
+
+RISK_FIELDS = [
+    'school', 'as_of', 'absent_streak', 'last_marked', 'window_absent', 'window_marked',
+    'month_present', 'month_counted', 'month_percentage', 'reasons', 'is_at_risk',
+]
+
+
+def risk_settings():
+    return (
+        getattr(settings, 'ATTENDANCE_RISK_STREAK_DAYS', 3),
+        getattr(settings, 'ATTENDANCE_RISK_MIN_PERCENTAGE', 75),
+        getattr(settings, 'ATTENDANCE_RISK_WINDOW_DAYS', 30),
+        getattr(settings, 'ATTENDANCE_RISK_LOOKBACK_MONTHS', 3),
+    )
+
+
+def _unpack(masks):
+    """uint32 masks -> (n, 32) bool matrix, column d = day d + 1"""
+    as_bytes = np.asarray(masks, dtype='<u4').view(np.uint8).reshape(-1, 4)
+    return np.unpackbits(as_bytes, axis=1, bitorder='little').astype(bool)
+
+
+def refresh_attendance_risk(school_id=None, student_ids=None, today=None):
+    """
+    Recompute StudentAttendanceRisk for a school and/or a set of students.
+    Students without any marked day in the lookback lose their row.
+    Returns the number of rows written.
+    """
+    streak_days, min_percentage, window_days, lookback_months = risk_settings()
+    today = today or date.today()
+    first_month = month_start(today)
+    for _ in range(lookback_months - 1):
+        first_month = month_start(first_month - timedelta(days=1))
+    months = list(iter_months(first_month, today))
+    days = (today - first_month).days + 1
+
+    rows = AttendanceMonth.objects.filter(month__gte=first_month, month__lte=today)
+    scope = StudentAttendanceRisk.objects.all()
+    if school_id is not None:
+        rows = rows.filter(school_id=school_id)
+        scope = scope.filter(school_id=school_id)
+    if student_ids is not None:
+        rows = rows.filter(student_id__in=student_ids)
+        scope = scope.filter(student_id__in=student_ids)
+    rows = list(rows.values_list('student_id', 'school_id', 'month', 'present_mask', 'absent_mask'))
+
+    written = 0
+    with transaction.atomic():
+        if not rows:
+            scope.delete()
+            return 0
+
+        students = sorted({row[0] for row in rows})
+        index = {student_id: i for i, student_id in enumerate(students)}
+        offsets = {month: (month - first_month).days for month in months}
+        schools = {}
+
+        # students x days matrices of the lookback, one pass over the month rows
+        present = np.zeros((len(students), days + 31), dtype=bool)
+        absent = np.zeros_like(present)
+        row_idx = np.array([index[row[0]] for row in rows])[:, None]
+        cols = np.array([offsets[row[2]] for row in rows])[:, None] + np.arange(31)[None, :]
+        # Short months spill zero bits into the next month's columns, hence OR
+        np.logical_or.at(present, (row_idx, cols), _unpack([row[3] for row in rows])[:, :31])
+        np.logical_or.at(absent, (row_idx, cols), _unpack([row[4] for row in rows])[:, :31])
+        present = present[:, :days]
+        absent = absent[:, :days]
+        for row in rows:
+            schools[row[0]] = row[1]
+        marked = present | absent
+
+        # Current streak: absences after the last present mark
+        any_present = present.any(axis=1)
+        last_present = np.where(any_present, days - 1 - np.argmax(present[:, ::-1], axis=1), -1)
+        absent_cum = np.concatenate([np.zeros((len(students), 1), dtype=int), absent.cumsum(axis=1)], axis=1)
+        streak = absent_cum[:, -1] - absent_cum[np.arange(len(students)), last_present + 1]
+        any_marked = marked.any(axis=1)
+        last_marked = np.where(any_marked, days - 1 - np.argmax(marked[:, ::-1], axis=1), -1)
+
+        # Rolling window and this month
+        window = slice(max(0, days - window_days), days)
+        window_absent = absent[:, window].sum(axis=1)
+        window_marked = marked[:, window].sum(axis=1)
+        month_cols = slice(offsets[months[-1]], days)
+        month_present = present[:, month_cols].sum(axis=1)
+        month_marked = marked[:, month_cols].sum(axis=1)
+
+        # Counted days: days marked for the student's classroom and section
+        # this month, plus any other day the student was marked
+        school_of = [schools[student_id] for student_id in students]
+        places = {
+            student_id: (classroom_id, section_id)
+            for student_id, classroom_id, section_id in StudentProfile.objects.filter(id__in=students)
+            .values_list('id', 'classroom_id', 'section_id')
+        }
+        taken = {}
+        for classroom_id, section_id, day in (
+            AttendanceDailyRollup.objects.filter(
+                school_id__in=set(school_of), date__gte=months[-1], date__lte=today,
+                classroom_id__in={place[0] for place in places.values()},
+            )
+            .values_list('classroom_id', 'section_id', 'date')
+        ):
+            taken.setdefault((classroom_id, section_id), np.zeros(today.day, dtype=bool))[day.day - 1] = True
+        not_taken = np.zeros(today.day, dtype=bool)
+        class_matrix = np.array([taken.get(places.get(student_id), not_taken) for student_id in students])
+        month_counted = (class_matrix | marked[:, month_cols]).sum(axis=1)
+
+        statuses = []
+        for i, student_id in enumerate(students):
+            counted = int(month_counted[i])
+            percentage = Decimal(int(month_present[i]) * 100 / counted if counted else 0).quantize(
+                Decimal('0.01'), ROUND_HALF_UP
+            )
+            reasons = []
+            if streak[i] >= streak_days:
+                reasons.append('absent_streak')
+            # Only once the month has marks, so an unmarked class is not flagged wholesale
+            if month_marked[i] and percentage < min_percentage:
+                reasons.append('low_attendance')
+            statuses.append(StudentAttendanceRisk(
+                student_id=student_id,
+                school_id=school_of[i],
+                as_of=today,
+                absent_streak=int(streak[i]),
+                last_marked=first_month + timedelta(days=int(last_marked[i])) if last_marked[i] >= 0 else None,
+                window_absent=int(window_absent[i]),
+                window_marked=int(window_marked[i]),
+                month_present=int(month_present[i]),
+                month_counted=counted,
+                month_percentage=percentage,
+                reasons=reasons,
+                is_at_risk=bool(reasons),
+            ))
+
+        scope.exclude(student_id__in=students).delete()
+        StudentAttendanceRisk.objects.bulk_create(
+            statuses,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['student'],
+            update_fields=RISK_FIELDS,
+        )
+        written = len(statuses)
+    return written
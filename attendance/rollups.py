@@ -0,0 +1,120 @@
+"""
+Daily attendance rollups.
+
+AttendanceDailyRollup holds present/absent/total counts per school,
+classroom, section and day, by the classroom and section stored on each
+record. Record writes apply +/- deltas to the touched rows so dashboards
+read a few hundred rollup rows instead of scanning AttendanceRecord.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import AttendanceRecord, AttendanceDailyRollup
+from .months import as_date
+
+ROLLUP_FIELDS = ['present', 'absent', 'total']
+
+
+def apply_rollup_deltas(changes):
+    """
+    Apply record changes to the rollups.
+
+    changes is an iterable of (school_id, classroom_id, section_id,
+    student_id, date, old_present, new_present) where None means "no
+    record" (a create has no old value, a delete no new one). Touched rollup
+    rows are locked and updated with one bulk_update/bulk_create; rows left
+    at zero are deleted.
+    """
+    changes = [change for change in changes if change[5] != change[6]]
+    if not changes:
+        return
+
+    deltas = {}
+    for school_id, classroom_id, section_id, _, day, old_present, new_present in changes:
+        key = (school_id, classroom_id, section_id, as_date(day))
+        delta = deltas.setdefault(key, [0, 0, 0])
+        for present, sign in ((old_present, -1), (new_present, 1)):
+            if present is None:
+                continue
+            delta[0 if present else 1] += sign
+            delta[2] += sign
+
+    with transaction.atomic():
+        existing = {
+            (row.school_id, row.classroom_id, row.section_id, row.date): row
+            for row in AttendanceDailyRollup.objects.select_for_update().filter(
+                school_id__in={key[0] for key in deltas},
+                date__in={key[3] for key in deltas},
+            )
+        }
+
+        to_create, to_update, emptied = [], [], []
+        for key, (present, absent, total) in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                row = AttendanceDailyRollup(school_id=key[0], classroom_id=key[1], section_id=key[2], date=key[3])
+            row.present += present
+            row.absent += absent
+            row.total += total
+            if row.pk is None:
+                if row.total:
+                    to_create.append(row)
+            elif row.total:
+                to_update.append(row)
+            else:
+                emptied.append(row.pk)
+
+        if emptied:
+            AttendanceDailyRollup.objects.filter(pk__in=emptied).delete()
+        if to_update:
+            AttendanceDailyRollup.objects.bulk_update(to_update, ROLLUP_FIELDS, batch_size=500)
+        if to_create:
+            AttendanceDailyRollup.objects.bulk_create(to_create, batch_size=500)
+
+
+def rollup_rows(model, records):
+    """
+    Unsaved rollup rows of `model` (AttendanceDailyRollup) counting a
+    queryset of records with one grouped query.
+    """
+    groups = (
+        records.values('school_id', 'classroom_id', 'section_id', 'date')
+        .annotate(present=Count('id', filter=Q(present=True)), total=Count('id'))
+        .order_by()
+    )
+    return [
+        model(
+            school_id=group['school_id'],
+            classroom_id=group['classroom_id'],
+            section_id=group['section_id'],
+            date=group['date'],
+            present=group['present'],
+            absent=group['total'] - group['present'],
+            total=group['total'],
+        )
+        for group in groups.iterator()
+    ]
+
+
+def rebuild_attendance_rollups(school_id=None, start=None, end=None):
+    """
+    Recompute rollups from AttendanceRecord with one grouped query, for one
+    school and/or date range or everything. Returns the number of rows written.
+    """
+    records = AttendanceRecord.objects.all()
+    rollups = AttendanceDailyRollup.objects.all()
+    if school_id is not None:
+        records = records.filter(school_id=school_id)
+        rollups = rollups.filter(school_id=school_id)
+    if start is not None:
+        records = records.filter(date__gte=start)
+        rollups = rollups.filter(date__gte=start)
+    if end is not None:
+        records = records.filter(date__lte=end)
+        rollups = rollups.filter(date__lte=end)
+
+    rows = rollup_rows(AttendanceDailyRollup, records)
+    with transaction.atomic():
+        rollups.delete()
+        AttendanceDailyRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import AttendanceRecord
+from .models import AttendanceRecord, StudentAttendanceRisk
 from academics.models import StudentProfile
 from django.db.models import Count, Q
 
@@ -37,7 +37,41 @@ class MonthlyAttendanceSerializer(serializers.Serializer):
     student_name = serializers.CharField()
     classroom = serializers.CharField()
     section = serializers.CharField()
-    total_days = serializers.IntegerField()
+    total_days = serializers.IntegerField()  # working days so far plus any other marked day
+    working_days = serializers.IntegerField()
     present_days = serializers.IntegerField()
     absent_days = serializers.IntegerField()
+    unmarked_days = serializers.IntegerField()  # working days without a record
     attendance_percentage = serializers.FloatField()
+
+class DefaulterSerializer(serializers.Serializer):
+    """Serializer for students below the attendance threshold"""
+    student_id = serializers.IntegerField()
+    student_name = serializers.CharField()
+    roll_number = serializers.CharField(allow_null=True)
+    classroom = serializers.CharField()
+    section = serializers.CharField()
+    working_days = serializers.IntegerField()
+    present_days = serializers.IntegerField()
+    absent_days = serializers.IntegerField()
+    unmarked_days = serializers.IntegerField()
+    attendance_percentage = serializers.FloatField()
+
+class AttendanceRiskSerializer(serializers.ModelSerializer):
+    student_name = serializers.SerializerMethodField()
+    roll_number = serializers.CharField(source='student.roll_number', read_only=True)
+    classroom_name = serializers.SerializerMethodField()
+    section_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = StudentAttendanceRisk
+        fields = ['student','student_name','roll_number','classroom_name','section_name','as_of','absent_streak','last_marked','window_absent','window_marked','month_present','month_counted','month_percentage','reasons']
+    
+    def get_student_name(self, obj):
+        return f"{obj.student.user.first_name} {obj.student.user.last_name}".strip() or obj.student.user.username
+    
+    def get_classroom_name(self, obj):
+        return obj.student.classroom.name if obj.student.classroom else 'N/A'
+    
+    def get_section_name(self, obj):
+        return obj.student.section.name if obj.student.section else 'N/A'
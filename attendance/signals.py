@@ -0,0 +1,68 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from academics.models import ClassRoom, Section
+from schools.models import School
+from .models import AttendanceRecord
+from .months import as_date
+from .rollups import rebuild_attendance_rollups
+from .sync import attendance_changed, record_tombstones
+
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver(pre_save, sender=AttendanceRecord)
+def remember_previous_state(sender, instance, **kwargs):
+    """Remember the stored record so its old place and status can be replaced"""
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = (
+            AttendanceRecord.objects.filter(pk=instance.pk)
+            .values_list('school_id', 'classroom_id', 'section_id', 'student_id', 'date', 'present').first()
+        )
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def sync_on_save(sender, instance, **kwargs):
+    """Keep the month bitmaps and daily rollups in sync with a saved record"""
+    previous = getattr(instance, '_previous_state', None)
+    place = (instance.school_id, instance.classroom_id, instance.section_id, instance.student_id, as_date(instance.date))
+    changes = []
+    if previous and previous[:5] != place:
+        # Moved to another day, student, school or class: remove it from the old place
+        changes.append((*previous, None))
+        if previous[0] != instance.school_id:
+            # Gone from the old school's sync feed
+            record_tombstones([(instance.pk, previous[0], previous[3], previous[4])])
+        previous = None
+    changes.append((*place, previous[5] if previous else None, instance.present))
+    attendance_changed(changes)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def sync_on_delete(sender, instance, origin=None, **kwargs):
+    """Remove a deleted record from the month bitmaps and daily rollups"""
+    # A school being deleted takes its bitmaps and rollups with it
+    if _origin_model(origin) is not School:
+        attendance_changed([(
+            instance.school_id, instance.classroom_id, instance.section_id,
+            instance.student_id, instance.date, instance.present, None,
+        )])
+    record_tombstones([(instance.pk, instance.school_id, instance.student_id, instance.date)])
+
+
+@receiver(post_delete, sender=ClassRoom)
+@receiver(post_delete, sender=Section)
+def recount_rollups_on_class_delete(sender, instance, origin=None, **kwargs):
+    """
+    Deleting a class or section drops its rollups and leaves its records
+    without one; count those records again under the school.
+    """
+    # A school takes its rollups along; a classroom's handler covers its sections
+    origin_model = _origin_model(origin)
+    if origin_model is School or (sender is Section and origin_model is ClassRoom):
+        return
+    school_id = instance.school_id if sender is ClassRoom else instance.classroom.school_id
+    rebuild_attendance_rollups(school_id=school_id)
@@ -0,0 +1,87 @@
+"""
+Keeps the derived attendance tables in step with AttendanceRecord writes.
+
+Every write path (bulk_save, single record save/delete) reports its
+changes here as (school_id, classroom_id, section_id, student_id, date,
+old_present, new_present) tuples, with the classroom and section stored on
+the record and None for "no record"; callers run this inside the write's
+transaction.
+
+Writes also take numbers from a per-school change sequence. The counter
+row stays locked until the writing transaction commits, so sequence
+numbers of a school become visible in order and a sync client reading
+"everything after N" never skips a change that commits late.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import AttendanceSequence, AttendanceTombstone
+from .months import apply_attendance_marks, as_date
+from .rollups import apply_rollup_deltas
+from .risk import refresh_attendance_risk
+
+
+def allocate_sequences(school_id, count):
+    """
+    Reserve `count` consecutive change sequence numbers for a school and
+    return them as a range. Must run inside the write's transaction.
+    """
+    if count <= 0:
+        return range(0)
+    with transaction.atomic():
+        AttendanceSequence.objects.bulk_create(
+            [AttendanceSequence(school_id=school_id)], ignore_conflicts=True
+        )
+        AttendanceSequence.objects.filter(school_id=school_id).update(value=F('value') + count)
+        last = AttendanceSequence.objects.filter(school_id=school_id).values_list('value', flat=True).get()
+    return range(last - count + 1, last + 1)
+
+
+def lock_sequences(school_ids):
+    """
+    Lock the change sequence rows of these schools (creating missing ones),
+    in id order so concurrent writers cannot deadlock. Must run inside the
+    write's transaction; writers of a school then run one after the other.
+    """
+    school_ids = sorted(set(school_ids))
+    AttendanceSequence.objects.bulk_create(
+        [AttendanceSequence(school_id=school_id) for school_id in school_ids], ignore_conflicts=True
+    )
+    list(AttendanceSequence.objects.select_for_update().filter(school_id__in=school_ids).order_by('school_id'))
+
+
+def record_tombstones(records):
+    """Leave tombstones for deleted records: iterable of (record_id, school_id, student_id, date)"""
+    by_school = {}
+    for record in records:
+        by_school.setdefault(record[1], []).append(record)
+    tombstones = []
+    for school_id, deleted in by_school.items():
+        for sequence, (record_id, _, student_id, day) in zip(allocate_sequences(school_id, len(deleted)), deleted):
+            tombstones.append(AttendanceTombstone(
+                school_id=school_id, record_id=record_id, student_id=student_id, date=day, sequence=sequence,
+            ))
+    AttendanceTombstone.objects.bulk_create(tombstones, batch_size=1000)
+
+
+def attendance_changed(changes):
+    """Update the monthly bitmaps, daily rollups and absence risk for a batch of record changes"""
+    changes = list(changes)
+    if not changes:
+        return
+    marks = []
+    cleared = []
+    for school_id, _, _, student_id, day, old_present, new_present in changes:
+        if new_present is not None:
+            marks.append((school_id, student_id, day, new_present))
+        elif old_present is not None:
+            cleared.append((student_id, as_date(day)))
+    # A record moved to another class or school stays marked on its day
+    marked = {(student_id, as_date(day)) for _, student_id, day, _ in marks}
+    apply_attendance_marks(marks, [key for key in cleared if key not in marked])
+    apply_rollup_deltas(changes)
+
+    # Streaks read the committed bitmaps; after commit, rows of students
+    # deleted in the same transaction are gone as well
+    student_ids = {change[3] for change in changes}
+    transaction.on_commit(lambda: refresh_attendance_risk(student_ids=student_ids))
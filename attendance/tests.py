@@ -0,0 +1,319 @@
+from datetime import date
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from academics.models import ClassRoom, Section, StudentProfile
+from schools.models import School
+from .models import AttendanceDailyRollup, AttendanceRecord, StudentAttendanceRisk
+from .risk import refresh_attendance_risk
+
+
+class BulkSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        cls.other_school = School.objects.create(name='Other school')
+        classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        section = Section.objects.create(classroom=classroom, name='A')
+        cls.students = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{i}'),
+                school=cls.school, classroom=classroom, section=section, roll_number=str(i),
+            )
+            for i in range(1, 3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def bulk_save(self, records):
+        return self.client.post(
+            '/api/attendance/records/bulk_save/', {'records': records}, format='json', secure=True,
+        )
+
+    def test_invalid_rows_are_reported_and_the_rest_saved(self):
+        first, second = self.students
+        response = self.bulk_save([
+            {'student': first.id, 'date': '2026-03-01', 'present': True},
+            {'student': 0, 'date': '2026-03-01', 'present': True},
+            {'student': first.id, 'date': 'not a date', 'present': True},
+            {'student': first.id, 'school': self.other_school.id, 'date': '2026-03-02', 'present': False},
+            {'student': second.id, 'school': 999999, 'date': '2026-03-01', 'present': False},
+            {'student': second.id, 'school': str(self.school.id), 'date': '2026-03-02', 'present': False},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['success'])
+        self.assertEqual(response.data['saved'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3, 4])
+        self.assertIn('does not belong to school', response.data['errors'][2]['error'])
+        self.assertEqual(
+            sorted(AttendanceRecord.objects.values_list('student_id', 'date', 'school_id', 'present')),
+            [
+                (first.id, date(2026, 3, 1), self.school.id, True),
+                (second.id, date(2026, 3, 2), self.school.id, False),
+            ],
+        )
+
+    def test_resaving_updates_records(self):
+        student = self.students[0]
+        self.bulk_save([{'student': student.id, 'date': '2026-03-01', 'present': True}])
+        response = self.bulk_save([{'student': student.id, 'date': '2026-03-01', 'present': False, 'note': 'Sick'}])
+
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+        record = AttendanceRecord.objects.get(student=student)
+        self.assertEqual((record.present, record.note), (False, 'Sick'))
+
+    def test_rollups_stay_with_the_record_class_after_a_move(self):
+        student = self.students[0]
+        old_section = student.section
+        self.bulk_save([{'student': student.id, 'date': '2026-03-01', 'present': True}])
+        student.section = Section.objects.create(classroom=student.classroom, name='B')
+        student.save()
+
+        self.bulk_save([
+            {'student': student.id, 'date': '2026-03-01', 'present': False},
+            {'student': student.id, 'date': '2026-03-02', 'present': True},
+        ])
+
+        self.assertEqual(AttendanceRecord.objects.get(date='2026-03-01').section, old_section)
+        self.assertEqual(
+            sorted(AttendanceDailyRollup.objects.values_list('section_id', 'date', 'present', 'absent', 'total')),
+            [
+                (old_section.id, date(2026, 3, 1), 0, 1, 1),
+                (student.section_id, date(2026, 3, 2), 1, 0, 1),
+            ],
+        )
+
+
+class AttendanceRiskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        cls.student = StudentProfile.objects.create(
+            user=get_user_model().objects.create(username='student'),
+            school=cls.school, classroom=classroom, roll_number='1',
+        )
+        for day in (2, 3, 4):
+            AttendanceRecord.objects.create(school=cls.school, student=cls.student, date=date(2026, 3, day), present=False)
+        refresh_attendance_risk(school_id=cls.school.id, today=date(2026, 3, 4))
+
+    def test_list_is_read_only(self):
+        with self.assertNumQueries(1):
+            response = APIClient().get('/api/attendance/at-risk/', {'school': self.school.id}, secure=True)
+
+        self.assertEqual([row['student'] for row in response.data], [self.student.id])
+        self.assertEqual(StudentAttendanceRisk.objects.get(student=self.student).as_of, date(2026, 3, 4))
+
+    def test_command_moves_the_window_on(self):
+        call_command('refresh_attendance_risk', '--date', '2026-03-05', stdout=open(os.devnull, 'w'))
+
+        risk = StudentAttendanceRisk.objects.get(student=self.student)
+        self.assertEqual((risk.as_of, risk.absent_streak, risk.is_at_risk), (date(2026, 3, 5), 3, True))
+
+    def test_only_taken_days_count_for_the_month(self):
+        classroom = ClassRoom.objects.create(school=self.school, name='Class 7')
+        section_a = Section.objects.create(classroom=classroom, name='A')
+        section_b = Section.objects.create(classroom=classroom, name='B')
+        regular, missed, partly_entered = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'class7-{i}'),
+                school=self.school, classroom=classroom, section=section, roll_number=str(i),
+            )
+            for i, section in enumerate([section_a, section_a, section_b], 1)
+        ]
+        for day in (2, 3, 4):
+            AttendanceRecord.objects.create(school=self.school, student=regular, date=date(2026, 3, day), present=True)
+        # Not marked on the 4th although the section was: an absence
+        for day, present in ((2, True), (3, False)):
+            AttendanceRecord.objects.create(school=self.school, student=missed, date=date(2026, 3, day), present=present)
+        # Section B only entered the 4th so far
+        AttendanceRecord.objects.create(school=self.school, student=partly_entered, date=date(2026, 3, 4), present=True)
+
+        refresh_attendance_risk(school_id=self.school.id, today=date(2026, 3, 4))
+
+        risks = {
+            risk.student_id: (risk.month_present, risk.month_counted, risk.is_at_risk)
+            for risk in StudentAttendanceRisk.objects.filter(student__classroom=classroom)
+        }
+        self.assertEqual(risks, {
+            regular.id: (3, 3, False),
+            missed.id: (1, 3, True),
+            partly_entered.id: (1, 1, False),
+        })
+
+
+class AttendanceChangesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        cls.other_school = School.objects.create(name='Other school')
+        cls.student, cls.other_student = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{school.id}'),
+                school=school, classroom=ClassRoom.objects.create(school=school, name='Class 6'), roll_number='1',
+            )
+            for school in (cls.school, cls.other_school)
+        ]
+
+    def changes(self, since, limit=2):
+        return APIClient().get(
+            '/api/attendance/changes/', {'school': self.school.id, 'since': since, 'limit': limit}, secure=True,
+        ).data
+
+    def mark(self, student, day, present=True):
+        return AttendanceRecord.objects.create(school=student.school, student=student, date=date(2026, 3, day), present=present)
+
+    def test_pages_follow_the_cursor_without_gaps(self):
+        # Writes of another school interleave with this school's
+        records = []
+        for day in range(1, 6):
+            records.append(self.mark(self.student, day))
+            self.mark(self.other_student, day)
+        APIClient().post('/api/attendance/records/bulk_save/', {'records': [
+            {'student': self.student.id, 'date': '2026-03-06', 'present': False},
+            {'student': self.other_student.id, 'date': '2026-03-06', 'present': False},
+        ]}, format='json', secure=True)
+
+        seen, cursors, since = [], [], 0
+        while True:
+            page = self.changes(since)
+            seen += [row[0] for row in page['upserts']]
+            cursors.append(page['cursor'])
+            since = page['cursor']
+            if not page['has_more']:
+                break
+
+        self.assertEqual(seen, [record.id for record in records] + [AttendanceRecord.objects.get(student=self.student, date='2026-03-06').id])
+        self.assertEqual(cursors, [2, 4, 6])
+        self.assertEqual(
+            list(AttendanceRecord.objects.filter(school=self.school).order_by('sequence').values_list('sequence', flat=True)),
+            [1, 2, 3, 4, 5, 6],
+        )
+        page = self.changes(since)
+        self.assertEqual((page['cursor'], page['has_more'], page['upserts'], page['deletes']), (6, False, [], []))
+
+    def test_deletes_show_up_as_tombstones(self):
+        kept, deleted = self.mark(self.student, 1), self.mark(self.student, 2)
+        since = self.changes(0, limit=10)['cursor']
+
+        deleted_id = deleted.id
+        deleted.delete()
+        kept.present = False
+        kept.save()
+
+        page = self.changes(since, limit=10)
+        self.assertEqual(page['deletes'], [[deleted_id, self.student.id, date(2026, 3, 2)]])
+        self.assertEqual([(row[0], row[3]) for row in page['upserts']], [(kept.id, False)])
+        self.assertEqual(page['cursor'], since + 2)
+        self.assertFalse(page['has_more'])
+
+
+class DailySummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        cls.class_six = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        class_seven = ClassRoom.objects.create(school=cls.school, name='Class 7')
+        section_a = Section.objects.create(classroom=cls.class_six, name='A')
+        section_b = Section.objects.create(classroom=cls.class_six, name='B')
+        places = [
+            (cls.class_six, section_a), (cls.class_six, section_a), (cls.class_six, section_b),
+            (class_seven, None), (class_seven, None),
+        ]
+        cls.students = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{i}'),
+                school=cls.school, classroom=classroom, section=section, roll_number=str(i),
+            )
+            for i, (classroom, section) in enumerate(places, 1)
+        ]
+        for student, present in zip(cls.students, [True, False, True, True]):
+            AttendanceRecord.objects.create(school=cls.school, student=student, date=date(2026, 3, 2), present=present)
+        # Another day's record does not count
+        AttendanceRecord.objects.create(school=cls.school, student=cls.students[1], date=date(2026, 3, 3), present=True)
+
+    def summary(self, **params):
+        return APIClient().get(
+            '/api/attendance/records/daily_summary/', {'school': self.school.id, 'date': '2026-03-02', **params}, secure=True,
+        )
+
+    def test_groups_by_classroom_and_section(self):
+        with self.assertNumQueries(1):
+            response = self.summary()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (row['classroom'], row['section'], row['total_students'], row['present_count'], row['absent_count'], row['attendance_percentage'])
+                for row in response.data
+            ],
+            [
+                ('Class 6', 'A', 2, 1, 1, 50.0),
+                ('Class 6', 'B', 1, 1, 0, 100.0),
+                # Students without a record count as absent
+                ('Class 7', 'No Section', 2, 1, 1, 50.0),
+            ],
+        )
+
+    def test_filters_and_validation(self):
+        response = self.summary(classroom=self.class_six.id, section=self.students[0].section_id)
+        self.assertEqual([(row['section'], row['total_students']) for row in response.data], [('A', 2)])
+
+        self.assertEqual(self.summary(date='02/03/2026').status_code, 400)
+        self.assertEqual(APIClient().get('/api/attendance/records/daily_summary/', secure=True).status_code, 400)
+
+
+class RosterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        cls.classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        cls.students = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{roll}', first_name=f'Student {roll}'),
+                school=cls.school, classroom=cls.classroom, roll_number=roll,
+            )
+            for roll in ('10', '2')
+        ]
+        cls.record = AttendanceRecord.objects.create(
+            school=cls.school, student=cls.students[0], date=date(2026, 3, 2), present=False, note='Sick',
+        )
+
+    def roster(self, **headers):
+        return APIClient().get(
+            '/api/attendance/records/roster/', {'classroom': self.classroom.id, 'date': '2026-03-02'}, secure=True, **headers,
+        )
+
+    def test_rows_in_roll_order(self):
+        response = self.roster()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rows'], [
+            [self.students[1].id, '2', 'Student 2', None, ''],
+            [self.students[0].id, '10', 'Student 10', False, 'Sick'],
+        ])
+        self.assertIn('Last-Modified', response)
+
+    def test_unchanged_roster_returns_304(self):
+        etag = self.roster()['ETag']
+
+        response = self.roster(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Marking a student or renaming one both change the roster
+        self.record.present = True
+        self.record.save()
+        response = self.roster(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        get_user_model().objects.filter(pk=self.students[1].user_id).update(first_name='Renamed')
+        response = self.roster(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rows'][0][2], 'Renamed')
@@ -1,8 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AttendanceRecordViewSet
+from .views import AttendanceRecordViewSet, attendance_changes, at_risk_students
 
 router = DefaultRouter()
 router.register('records', AttendanceRecordViewSet)
 
-urlpatterns = [path('', include(router.urls))]
+urlpatterns = [
+    path('changes/', attendance_changes, name='attendance-changes'),
+    path('at-risk/', at_risk_students, name='attendance-at-risk'),
+    path('', include(router.urls)),
+]
@@ -1,14 +1,27 @@
 from rest_framework import viewsets, filters, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from .models import AttendanceRecord
-from .serializers import AttendanceRecordSerializer, AttendanceSummarySerializer, MonthlyAttendanceSerializer
+from .models import AttendanceRecord, AttendanceDailyRollup, AttendanceTombstone, StudentAttendanceRisk
+from .sync import attendance_changed, allocate_sequences, lock_sequences
+from .reports import attendance_rates, elapsed_end
+from .serializers import AttendanceRecordSerializer, AttendanceSummarySerializer, MonthlyAttendanceSerializer, DefaulterSerializer, AttendanceRiskSerializer
 from rest_framework.permissions import AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum, FilteredRelation
+from django.db.models.functions import Length
 from academics.models import StudentProfile, ClassRoom, Section
 from datetime import datetime, timedelta
+from calendar import monthrange
 from collections import defaultdict
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from schools.exports import full_name
+
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
 
 class AttendanceRecordViewSet(viewsets.ModelViewSet):
     queryset = AttendanceRecord.objects.select_related('student__user','student__classroom','student__section','school').all()
@@ -25,97 +38,250 @@ class AttendanceRecordViewSet(viewsets.ModelViewSet):
         if not records_data:
             return Response({'error': 'No records provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        saved_records = []
+        from django.db import transaction
+        from rest_framework import serializers as drf_serializers
+        
         errors = []
+        date_field = drf_serializers.DateField()
+        present_field = drf_serializers.BooleanField()
         
-        for record_data in records_data:
+        def as_id(value):
             try:
-                # Try to get existing record
-                existing = AttendanceRecord.objects.filter(
-                    student_id=record_data['student'],
-                    date=record_data['date']
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    existing.present = record_data['present']
-                    existing.note = record_data.get('note', '')
-                    existing.save()
-                    saved_records.append(existing)
-                else:
-                    # Create new record - use _id suffix for foreign keys
-                    record = AttendanceRecord.objects.create(
-                        school_id=record_data['school'],
-                        student_id=record_data['student'],
-                        date=record_data['date'],
-                        present=record_data['present'],
-                        note=record_data.get('note', '')
-                    )
-                    saved_records.append(record)
-            except Exception as e:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+        
+        # Resolve every student with one IN query
+        student_ids = {as_id(item.get('student')) for item in records_data if isinstance(item, dict)}
+        students = {
+            student_id: (school_id, classroom_id, section_id)
+            for student_id, school_id, classroom_id, section_id in StudentProfile.objects.filter(
+                id__in=student_ids - {None}
+            ).values_list('id', 'school_id', 'classroom_id', 'section_id')
+        }
+        
+        # Validate in memory; a later row for the same student and date wins
+        rows = {}
+        for idx, record_data in enumerate(records_data):
+            if not isinstance(record_data, dict):
+                errors.append({'index': idx, 'student': None, 'error': 'Each record must be an object'})
+                continue
+            
+            student_id = as_id(record_data.get('student'))
+            if student_id not in students:
                 errors.append({
+                    'index': idx,
                     'student': record_data.get('student'),
-                    'error': str(e)
+                    'error': f"Student with id {record_data.get('student')} not found"
                 })
+                continue
+            
+            try:
+                date = date_field.to_internal_value(record_data.get('date'))
+            except drf_serializers.ValidationError as e:
+                errors.append({'index': idx, 'student': student_id, 'error': f"date: {' '.join(e.detail)}"})
+                continue
+            try:
+                present = present_field.to_internal_value(record_data.get('present'))
+            except drf_serializers.ValidationError as e:
+                errors.append({'index': idx, 'student': student_id, 'error': f"present: {' '.join(e.detail)}"})
+                continue
+            
+            # The school is optional, but must be the student's when given
+            school_id, classroom_id, section_id = students[student_id]
+            if record_data.get('school') not in (None, '') and as_id(record_data.get('school')) != school_id:
+                errors.append({
+                    'index': idx,
+                    'student': student_id,
+                    'error': f"Student does not belong to school {record_data.get('school')}"
+                })
+                continue
+            rows[(student_id, date)] = AttendanceRecord(
+                school_id=school_id,
+                classroom_id=classroom_id,
+                section_id=section_id,
+                student_id=student_id,
+                date=date,
+                present=present,
+                note=record_data.get('note') or '',
+            )
+        
+        created = updated = 0
+        if rows:
+            try:
+                with transaction.atomic():
+                    # Another save creating the same records waits here, so the rows
+                    # read below include its inserts and nothing is counted as created twice
+                    lock_sequences({record.school_id for record in rows.values()})
+                    # Existing records with one locked IN query: counts and old statuses for the rollups
+                    existing = {
+                        (student_id, date): (school_id, classroom_id, section_id, present)
+                        for student_id, date, school_id, classroom_id, section_id, present in (
+                            AttendanceRecord.objects.select_for_update().filter(
+                                student_id__in={student_id for student_id, _ in rows},
+                                date__in={date for _, date in rows},
+                            ).values_list('student_id', 'date', 'school_id', 'classroom_id', 'section_id', 'present')
+                        )
+                    }
+                    updated = len(existing.keys() & rows.keys())
+                    created = len(rows) - updated
+                    
+                    # The upsert keeps the school, class and section of an existing record
+                    changes = []
+                    by_school = defaultdict(list)
+                    for key, record in rows.items():
+                        school_id, classroom_id, section_id, old_present = existing.get(
+                            key, (record.school_id, record.classroom_id, record.section_id, None)
+                        )
+                        changes.append((
+                            school_id, classroom_id, section_id, record.student_id, record.date, old_present, record.present,
+                        ))
+                        by_school[school_id].append(record)
+                    # One block of sync feed sequences per school
+                    for school_id, records in by_school.items():
+                        for record, sequence in zip(records, allocate_sequences(school_id, len(records))):
+                            record.sequence = sequence
+                    
+                    AttendanceRecord.objects.bulk_create(
+                        list(rows.values()),
+                        batch_size=1000,
+                        update_conflicts=True,
+                        unique_fields=['student', 'date'],
+                        update_fields=['present', 'note', 'updated_at', 'sequence'],
+                    )
+                    
+                    # bulk_create sends no signals; keep the bitmaps and rollups in sync
+                    attendance_changed(changes)
+            except Exception as e:
+                return Response({
+                    'success': False,
+                    'saved': 0,
+                    'errors': errors + [{'index': None, 'student': None, 'error': str(e)}]
+                }, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'success': True,
-            'saved': len(saved_records),
+            'saved': len(rows),
+            'created': created,
+            'updated': updated,
             'errors': errors
         }, status=status.HTTP_200_OK)
     
+    @action(detail=False, methods=['get'])
+    def roster(self, request):
+        """
+        Roll-call sheet of a ?classroom= (and optional ?section=) for ?date=:
+        compact [student_id, roll, name, present, note] rows from one query.
+        present is null for students not marked yet. Supports conditional GET
+        (ETag / Last-Modified) so unchanged rosters return 304.
+        """
+        classroom_id = request.query_params.get('classroom')
+        section_id = request.query_params.get('section')
+        date = request.query_params.get('date')
+        
+        if not classroom_id or not date:
+            return Response({'error': 'classroom and date parameters are required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            day = datetime.strptime(date, '%Y-%m-%d').date()
+            classroom_id = int(classroom_id)
+            section_id = int(section_id) if section_id else None
+        except ValueError:
+            return Response({'error': 'Invalid date (YYYY-MM-DD), classroom or section'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        students = StudentProfile.objects.filter(classroom_id=classroom_id)
+        if section_id:
+            students = students.filter(section_id=section_id)
+        rows = (
+            students
+            .annotate(day_record=FilteredRelation('attendances', condition=Q(attendances__date=day)))
+            # Numeric rolls in natural order: '2' before '10'
+            .order_by(Length('roll_number'), 'roll_number', 'id')
+            .values_list(
+                'id', 'roll_number', 'user__first_name', 'user__last_name', 'user__username',
+                'day_record__present', 'day_record__note', 'day_record__updated_at',
+            )
+        )
+        
+        roster = []
+        last_modified = None
+        for student_id, roll, first_name, last_name, username, present, note, updated_at in rows:
+            roster.append([student_id, roll, full_name(first_name, last_name, username), present, note or ''])
+            if updated_at and (last_modified is None or updated_at > last_modified):
+                last_modified = updated_at
+        
+        data = {
+            'date': day,
+            'classroom': classroom_id,
+            'section': section_id,
+            'fields': ['student_id', 'roll', 'name', 'present', 'note'],
+            'rows': roster,
+        }
+        # The ETag covers the whole roster, so renames, transfers and deleted
+        # records change it even when Last-Modified does not move
+        etag = quote_etag(hashlib.md5(json.dumps(data, cls=DjangoJSONEncoder).encode()).hexdigest())
+        last_modified_ts = last_modified.timestamp() if last_modified else None
+        
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+        if not_modified is not None:
+            return not_modified
+        
+        response = Response(data)
+        response['ETag'] = etag
+        if last_modified_ts:
+            response['Last-Modified'] = http_date(last_modified_ts)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    
     @action(detail=False, methods=['get'])
     def daily_summary(self, request):
-        """Get attendance summary by date, classroom, and section"""
+        """Get attendance summary by date, classroom, and section (optional ?classroom=, ?section=)"""
         school_id = request.query_params.get('school')
         date = request.query_params.get('date')
         
         if not school_id or not date:
             return Response({'error': 'school and date parameters are required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get all students grouped by classroom and section
-        students = StudentProfile.objects.filter(
-            classroom__school_id=school_id
-        ).select_related('classroom', 'section')
-        
-        # Get attendance records for the date
-        attendance_records = AttendanceRecord.objects.filter(
-            school_id=school_id,
-            date=date
-        ).select_related('student__classroom', 'student__section')
+        try:
+            day = datetime.strptime(date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create a map of student attendance
-        attendance_map = {record.student_id: record.present for record in attendance_records}
+        students = StudentProfile.objects.filter(classroom__school_id=school_id)
+        classroom_id = request.query_params.get('classroom')
+        section_id = request.query_params.get('section')
+        if classroom_id:
+            students = students.filter(classroom_id=classroom_id)
+        if section_id:
+            students = students.filter(section_id=section_id)
         
-        # Group by classroom and section
-        summary_data = defaultdict(lambda: {'total': 0, 'present': 0, 'absent': 0})
+        # One grouped query: students LEFT JOIN that day's records (at most one
+        # per student); a student without a record counts as absent
+        groups = (
+            students
+            .annotate(day_record=FilteredRelation(
+                'attendances',
+                condition=Q(attendances__date=day, attendances__school_id=school_id),
+            ))
+            .values('classroom_id', 'classroom__name', 'section_id', 'section__name')
+            .annotate(
+                total=Count('id'),
+                present=Count('id', filter=Q(day_record__present=True)),
+            )
+            .order_by('classroom__name', 'classroom_id', 'section__name', 'section_id')
+        )
         
-        for student in students:
-            classroom_name = student.classroom.name if student.classroom else 'No Class'
-            section_name = student.section.name if student.section else 'No Section'
-            key = (classroom_name, section_name)
-            
-            summary_data[key]['total'] += 1
-            if student.id in attendance_map:
-                if attendance_map[student.id]:
-                    summary_data[key]['present'] += 1
-                else:
-                    summary_data[key]['absent'] += 1
-            # If no record, count as absent
-            else:
-                summary_data[key]['absent'] += 1
-        
-        # Format the response
         summaries = []
-        for (classroom, section), data in summary_data.items():
-            percentage = (data['present'] / data['total'] * 100) if data['total'] > 0 else 0
+        for group in groups:
+            total = group['total']
+            present = group['present']
+            percentage = (present / total * 100) if total > 0 else 0
             summaries.append({
-                'date': date,
-                'classroom': classroom,
-                'section': section,
-                'total_students': data['total'],
-                'present_count': data['present'],
-                'absent_count': data['absent'],
+                'date': day,
+                'classroom': group['classroom__name'] or 'No Class',
+                'section': group['section__name'] or 'No Section',
+                'total_students': total,
+                'present_count': present,
+                'absent_count': total - present,
                 'attendance_percentage': round(percentage, 2)
             })
         
@@ -136,10 +302,6 @@ class AttendanceRecordViewSet(viewsets.ModelViewSet):
         try:
             year, month_num = map(int, month.split('-'))
             start_date = datetime(year, month_num, 1).date()
-            if month_num == 12:
-                end_date = datetime(year + 1, 1, 1).date()
-            else:
-                end_date = datetime(year, month_num + 1, 1).date()
         except ValueError:
             return Response({'error': 'Invalid month format. Use YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
         
@@ -152,47 +314,194 @@ class AttendanceRecordViewSet(viewsets.ModelViewSet):
         
         students = students_query.select_related('user', 'classroom', 'section')
         
-        # Get student IDs for filtering attendance records
-        student_ids = list(students.values_list('id', flat=True))
-        
-        # Get attendance records for the month
-        attendance_records = AttendanceRecord.objects.filter(
-            school_id=school_id,
-            student_id__in=student_ids,
-            date__gte=start_date,
-            date__lt=end_date
-        )
-        
-        # Create attendance map
-        attendance_map = defaultdict(lambda: {'present': 0, 'absent': 0})
-        for record in attendance_records:
-            student_id = record.student_id
-            if record.present:
-                attendance_map[student_id]['present'] += 1
-            else:
-                attendance_map[student_id]['absent'] += 1
-        
-        # Calculate total working days (you might want to exclude weekends/holidays)
-        total_days = (end_date - start_date).days
+        # Month bitmaps against the school's working days, up to today
+        last_day = datetime(year, month_num, monthrange(year, month_num)[1]).date()
+        rates, working_days = attendance_rates(school_id, students_query, start_date, elapsed_end(last_day))
         
         # Format response
         reports = []
         for student in students:
-            present = attendance_map[student.id]['present']
-            absent = attendance_map[student.id]['absent']
-            total_marked = present + absent
-            percentage = (present / total_marked * 100) if total_marked > 0 else 0
-            
+            rate = rates[student.id]
             reports.append({
                 'student_id': student.id,
                 'student_name': f"{student.user.first_name} {student.user.last_name}".strip() or student.user.username,
                 'classroom': student.classroom.name if student.classroom else 'N/A',
                 'section': student.section.name if student.section else 'N/A',
-                'total_days': total_marked,
-                'present_days': present,
-                'absent_days': absent,
-                'attendance_percentage': round(percentage, 2)
+                'total_days': rate.counted,
+                'working_days': working_days,
+                'present_days': rate.present,
+                'absent_days': rate.absent,
+                'unmarked_days': rate.unmarked,
+                'attendance_percentage': rate.percentage
             })
         
         serializer = MonthlyAttendanceSerializer(reports, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def defaulters(self, request):
+        """
+        Students whose attendance is below ?threshold= percent (default 75)
+        of the school's working days between ?from= and ?to= (default: this month so far)
+        """
+        school_id = request.query_params.get('school')
+        if not school_id:
+            return Response({'error': 'school parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        today = datetime.now().date()
+        try:
+            start_date = datetime.strptime(request.query_params.get('from') or today.replace(day=1).isoformat(), '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.query_params.get('to') or today.isoformat(), '%Y-%m-%d').date()
+            threshold = float(request.query_params.get('threshold', 75))
+        except ValueError:
+            return Response({'error': 'Invalid from/to (YYYY-MM-DD) or threshold'}, status=status.HTTP_400_BAD_REQUEST)
+        if end_date < start_date:
+            return Response({'error': 'to cannot be before from'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        students_query = StudentProfile.objects.filter(classroom__school_id=school_id)
+        if request.query_params.get('classroom'):
+            students_query = students_query.filter(classroom_id=request.query_params['classroom'])
+        if request.query_params.get('section'):
+            students_query = students_query.filter(section_id=request.query_params['section'])
+        
+        rates, working_days = attendance_rates(school_id, students_query, start_date, elapsed_end(end_date))
+        below = {student_id: rate for student_id, rate in rates.items() if rate.counted and rate.percentage < threshold}
+        
+        students = students_query.filter(id__in=below).select_related('user', 'classroom', 'section')
+        defaulters = []
+        for student in students:
+            rate = below[student.id]
+            defaulters.append({
+                'student_id': student.id,
+                'student_name': f"{student.user.first_name} {student.user.last_name}".strip() or student.user.username,
+                'roll_number': student.roll_number,
+                'classroom': student.classroom.name if student.classroom else 'N/A',
+                'section': student.section.name if student.section else 'N/A',
+                'working_days': working_days,
+                'present_days': rate.present,
+                'absent_days': rate.absent,
+                'unmarked_days': rate.unmarked,
+                'attendance_percentage': rate.percentage
+            })
+        defaulters.sort(key=lambda row: (row['attendance_percentage'], row['student_id']))
+        
+        serializer = DefaulterSerializer(defaulters, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def trend(self, request):
+        """
+        Daily present/absent totals between ?from= and ?to= (default: last 30 days)
+        from the rollup table, optionally for one ?classroom= / ?section=
+        """
+        school_id = request.query_params.get('school')
+        if not school_id:
+            return Response({'error': 'school parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        today = datetime.now().date()
+        try:
+            start_date = datetime.strptime(request.query_params.get('from') or (today - timedelta(days=30)).isoformat(), '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.query_params.get('to') or today.isoformat(), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'Invalid from/to. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rollups = AttendanceDailyRollup.objects.filter(school_id=school_id, date__range=(start_date, end_date))
+        if request.query_params.get('classroom'):
+            rollups = rollups.filter(classroom_id=request.query_params['classroom'])
+        if request.query_params.get('section'):
+            rollups = rollups.filter(section_id=request.query_params['section'])
+        
+        days = rollups.values('date').annotate(
+            present=Sum('present'),
+            absent=Sum('absent'),
+            total=Sum('total'),
+        ).order_by('date')
+        return Response([
+            {
+                'date': day['date'],
+                'present': day['present'],
+                'absent': day['absent'],
+                'total': day['total'],
+                'attendance_percentage': round(day['present'] / day['total'] * 100, 2) if day['total'] else 0,
+            }
+            for day in days
+        ])
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])  # TEMP: dev-only open access
+def attendance_changes(request):
+    """
+    Change feed for offline clients: records of ?school= written after
+    ?since=<cursor> (optionally one ?classroom=), plus tombstones of deleted
+    records, in sequence order. Pass the returned cursor as the next since;
+    has_more means another page is waiting. Start with since=0.
+    """
+    school_id = request.query_params.get('school')
+    if not school_id:
+        return Response({'error': 'school parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        school_id = int(school_id)
+        since = int(request.query_params.get('since') or 0)
+        limit = min(max(int(request.query_params.get('limit') or CHANGES_PAGE_SIZE), 1), CHANGES_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'error': 'school, since and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    records = AttendanceRecord.objects.filter(school_id=school_id, sequence__gt=since)
+    tombstones = AttendanceTombstone.objects.filter(school_id=school_id, sequence__gt=since)
+    classroom_id = request.query_params.get('classroom')
+    if classroom_id:
+        records = records.filter(student__classroom_id=classroom_id)
+        tombstones = tombstones.filter(student_id__in=StudentProfile.objects.filter(classroom_id=classroom_id).values('id'))
+    
+    # Both feeds are read one row past the page to know whether more follow
+    upserts = list(
+        records.order_by('sequence')
+        .values_list('sequence', 'id', 'student_id', 'date', 'present', 'note')[:limit + 1]
+    )
+    deletes = list(
+        tombstones.order_by('sequence')
+        .values_list('sequence', 'record_id', 'student_id', 'date')[:limit + 1]
+    )
+    merged = sorted(
+        [(row[0], 'upsert', row) for row in upserts] + [(row[0], 'delete', row) for row in deletes]
+    )
+    page = merged[:limit]
+    
+    return Response({
+        'cursor': page[-1][0] if page else since,
+        'has_more': len(merged) > limit,
+        'fields': ['id', 'student', 'date', 'present', 'note'],
+        'upserts': [list(row[1:]) for _, kind, row in page if kind == 'upsert'],
+        'deletes': [[row[1], row[2], row[3]] for _, kind, row in page if kind == 'delete'],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])  # TEMP: dev-only open access
+def at_risk_students(request):
+    """
+    Students of ?school= with an absence streak of ATTENDANCE_RISK_STREAK_DAYS+
+    or a monthly attendance below ATTENDANCE_RISK_MIN_PERCENTAGE, read from
+    the StudentAttendanceRisk rows (optional ?classroom=, ?section=). Writes
+    keep them current; the nightly refresh_attendance_risk command moves the
+    streaks and windows on with the calendar.
+    """
+    school_id = request.query_params.get('school')
+    if not school_id:
+        return Response({'error': 'school parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        school_id = int(school_id)
+    except ValueError:
+        return Response({'error': 'Invalid school'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    risks = StudentAttendanceRisk.objects.filter(school_id=school_id, is_at_risk=True)
+    if request.query_params.get('classroom'):
+        risks = risks.filter(student__classroom_id=request.query_params['classroom'])
+    if request.query_params.get('section'):
+        risks = risks.filter(student__section_id=request.query_params['section'])
+    
+    serializer = AttendanceRiskSerializer(
+        risks.select_related('student__user', 'student__classroom', 'student__section'), many=True
+    )
+    return Response(serializer.data)
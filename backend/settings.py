@@ -173,3 +173,25 @@ SMS_API_KEY = ''  # Your SMS API key
 SMS_API_SECRET = ''  # Your SMS API secret (for Twilio)
 SMS_SENDER_ID = 'School'  # Sender ID/Name
 SMS_CUSTOM_API_URL = ''  # For custom API provider
+
+# School calendar settings
+SCHOOL_WEEKLY_OFF_DAYS = [4]  # Weekdays without classes of schools whose calendar sets use_default_off_days (0 = Monday, 4 = Friday)
+SCHOOL_CALENDAR_CACHE_SECONDS = 300  # In-memory cache lifetime of per-school working-day bitmaps
+
+# Attendance risk settings
+ATTENDANCE_RISK_STREAK_DAYS = 3  # Consecutive absences that flag a student
+ATTENDANCE_RISK_MIN_PERCENTAGE = 75  # Monthly attendance below this flags a student
+ATTENDANCE_RISK_WINDOW_DAYS = 30  # Rolling window of the absence counts
+ATTENDANCE_RISK_LOOKBACK_MONTHS = 3  # Months of bitmaps read to find streaks
+
+# Attendance partitioning settings (PostgreSQL only, see attendance/partitions.py)
+ATTENDANCE_ACADEMIC_YEAR_START_MONTH = 1  # Month each academic year (and attendance partition) starts in
+ATTENDANCE_ARCHIVE_DIR = BASE_DIR / 'archive' / 'attendance'  # Where archived partitions are written
+
+# Fees settings
+FEE_YEAR_START_MONTH = 1  # Month each fee year starts in; billing periods are counted from it
+
+# Results settings
+GRADING_SCALE_CACHE_SECONDS = 300  # In-memory cache lifetime of per-school grading scales
+RESULT_RANK_METHOD = 'ordinal'  # Tie handling: 'competition' (1,2,2,4), 'dense' (1,2,2,3), 'ordinal' (1,2,3,4)
+REPORT_CARD_WORKERS = None  # Processes rendering report card PDFs (None: every core)
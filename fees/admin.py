@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import FeeCategory, FeeStructure, StudentFeeAssignment, Payment, FeeCollection
+from .models import FeeCategory, FeeStructure, StudentFeeAssignment, Payment, FeeCollection, ReceiptSequence
 
 
 @admin.register(FeeCategory)
@@ -24,14 +24,19 @@ class StudentFeeAssignmentAdmin(admin.ModelAdmin):
     list_display = ['id', 'student_name', 'fee_structure', 'payable_amount', 'discount_percentage', 'is_waived']
     list_filter = ['fee_structure__category', 'is_waived']
     search_fields = ['student__user__first_name', 'student__user__last_name', 'student__roll_number']
+    list_select_related = ['student__user', 'fee_structure__category', 'fee_structure__classroom']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_payable()
     
     def student_name(self, obj):
         return obj.student.user.get_full_name() or obj.student.user.username
     student_name.short_description = 'Student'
     
     def payable_amount(self, obj):
-        return obj.get_payable_amount()
+        return obj.payable
     payable_amount.short_description = 'Payable Amount'
+    payable_amount.admin_order_field = 'payable'
 
 
 @admin.register(Payment)
@@ -58,3 +63,10 @@ class FeeCollectionAdmin(admin.ModelAdmin):
     list_display = ['id', 'school', 'classroom', 'month', 'year', 'total_expected', 'total_collected', 'total_pending', 'collection_percentage']
     list_filter = ['school', 'classroom', 'year', 'month']
     readonly_fields = ['total_expected', 'total_collected', 'total_pending', 'collection_percentage']
+
+
+@admin.register(ReceiptSequence)
+class ReceiptSequenceAdmin(admin.ModelAdmin):
+    list_display = ['id', 'school', 'date', 'value']
+    list_filter = ['school']
+    date_hierarchy = 'date'
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class FeesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fees'
+
+    def ready(self):
+        """Import signals when the app is ready"""
+        import fees.signals
@@ -0,0 +1,211 @@
+"""
+Student dues.
+
+Each fee assignment of a school is expanded into billing periods by its
+structure's frequency (monthly, quarterly, half yearly, yearly or once)
+within a window, by default the fee year up to the as-of date. Waivers,
+custom amounts and discounts set the per-period charge. Completed payments
+of the window pay a student's charges oldest due date first, and a charge
+still unpaid late_fee_after_days after its due date adds the late fee.
+
+Everything after the two bulk queries is NumPy over integer cents, so a
+whole school is computed in one pass.
+"""
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Payment, StudentFeeAssignment
+
+# Months between periods and periods per fee year, by frequency
+PERIODS = {
+    'monthly': (1, 12),
+    'quarterly': (3, 4),
+    'half_yearly': (6, 2),
+    'yearly': (12, 1),
+    'one_time': (12, 1),
+}
+
+BilledPeriods = namedtuple('BilledPeriods', 'student month due deadline charge late_fee')
+
+StudentDues = namedtuple(
+    'StudentDues',
+    'charged late_fees paid outstanding overdue periods overdue_periods',
+)
+
+CENTS = Decimal('0.01')
+
+
+def fee_year_start(day):
+    """First day of the fee year (FEE_YEAR_START_MONTH) containing a date"""
+    month = getattr(settings, 'FEE_YEAR_START_MONTH', 1)
+    return date(day.year if day.month >= month else day.year - 1, month, 1)
+
+
+def _cents(values):
+    return np.array([int((value or 0) * 100) for value in values], dtype=np.int64)
+
+
+def _grouped_cumsum(values, groups):
+    """Running sum of values restarting at each new group (groups sorted)"""
+    total = np.cumsum(values)
+    if not len(values):
+        return total
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    before = total[starts] - values[starts]
+    return total - np.repeat(before, np.diff(np.r_[starts, len(values)]))
+
+
+def _to_decimal(cents):
+    return (Decimal(int(cents)) * CENTS).quantize(CENTS)
+
+
+def billed_periods(school_id, start, end, student_ids=None):
+    """
+    Expand the school's active fee assignments into the periods billed
+    between `start` and `end` with one query. Returns BilledPeriods of
+    parallel arrays ordered by student, due date and assignment; amounts
+    are integer cents.
+
+    A period is billed once it has started, if the student was assigned
+    before it ended. One-time fees are billed in the month they were
+    assigned, when that falls in the window. Due dates are due_day of the
+    period's first month, capped at the month's last day.
+    """
+    assignments = StudentFeeAssignment.objects.filter(
+        fee_structure__school_id=school_id, fee_structure__is_active=True,
+    )
+    if student_ids is not None:
+        assignments = assignments.filter(student_id__in=student_ids)
+    rows = list(assignments.values_list(
+        'student_id', 'assigned_date', 'custom_amount', 'discount_percentage', 'is_waived',
+        'fee_structure__amount', 'fee_structure__frequency', 'fee_structure__due_day',
+        'fee_structure__late_fee_amount', 'fee_structure__late_fee_after_days',
+    ).order_by('id'))
+    (a_student, a_assigned, a_custom, a_discount, a_waived, a_amount, a_frequency,
+     a_due_day, a_late_fee, a_late_days) = zip(*rows) if rows else ((),) * 10
+
+    # Per-period charge, mirroring StudentFeeAssignment.get_payable_amount()
+    amount = _cents(a_amount)
+    custom = _cents(a_custom)
+    # Discounts in hundredths of a percent, so the cents round half up exactly
+    discount = np.array([int(Decimal(d or 0) * 100) for d in a_discount], dtype=np.int64)
+    charge = np.where(custom > 0, custom, (amount * (10000 - discount) + 5000) // 10000)
+    charge = np.where(np.array(a_waived, dtype=bool), 0, charge)
+
+    # Expand assignments into periods, aligned to the fee years the window touches
+    years = (end - fee_year_start(start)).days // 365 + 1
+    step = np.array([PERIODS.get(f, PERIODS['monthly'])[0] for f in a_frequency], dtype=np.int64)
+    count = np.array([PERIODS.get(f, PERIODS['monthly'])[1] for f in a_frequency], dtype=np.int64) * years
+    assigned = np.array(a_assigned, dtype='datetime64[D]')
+    first_month = np.full(len(rows), np.datetime64(fee_year_start(start), 'M'))
+    one_time = np.array([f == 'one_time' for f in a_frequency], dtype=bool)
+    first_month[one_time] = assigned[one_time].astype('datetime64[M]')
+    count[one_time] = 1
+    row = np.repeat(np.arange(len(rows)), count)
+    k = np.arange(len(row)) - np.repeat(np.cumsum(count) - count, count)
+    period_month = first_month[row] + (k * step[row]).astype('timedelta64[M]')
+    period_start = period_month.astype('datetime64[D]')
+    period_end = (period_month + step[row].astype('timedelta64[M]')).astype('datetime64[D]') - 1
+    month_end = (period_month + 1).astype('datetime64[D]') - 1
+    due_day = np.maximum(np.array(a_due_day, dtype=np.int64), 1)[row]
+    due = np.minimum(period_start + (due_day - 1).astype('timedelta64[D]'), month_end)
+
+    billed = (
+        (period_month >= np.datetime64(start, 'M')) & (period_start <= np.datetime64(end, 'D'))
+        & (period_end >= assigned[row]) & (charge[row] > 0)
+    )
+    row, due, period_month = row[billed], due[billed], period_month[billed]
+    student = np.array(a_student, dtype=np.int64)[row]
+    order = np.lexsort((row, due, student))
+    row = row[order]
+    due = due[order]
+    return BilledPeriods(
+        student=student[order],
+        month=period_month[order],
+        due=due,
+        deadline=due + np.array(a_late_days, dtype=np.int64)[row].astype('timedelta64[D]'),
+        charge=charge[row],
+        late_fee=_cents(a_late_fee)[row],
+    )
+
+
+def compute_dues(school_id, as_of=None, start=None, student_ids=None):
+    """
+    Return {student_id: StudentDues} for a school as of a date (today by
+    default) over the window [start, as_of]; start defaults to the start of
+    the fee year. Amounts are Decimals, periods counts of billed periods
+    (see billed_periods). Charges are overdue once their due date has passed.
+    """
+    as_of = as_of or timezone.localdate()
+    start = start or fee_year_start(as_of)
+
+    periods = billed_periods(school_id, start, as_of, student_ids)
+    payments = Payment.objects.filter(
+        student__school_id=school_id, payment_status='completed',
+        payment_date__gte=start, payment_date__lte=as_of,
+    )
+    if student_ids is not None:
+        payments = payments.filter(student_id__in=student_ids)
+    paid_rows = list(payments.values_list('student_id', 'payment_date', 'amount'))
+    p_student, p_date, p_amount = zip(*paid_rows) if paid_rows else ((),) * 3
+
+    # Dense student indexes; sorted like the student ids, so periods stay grouped
+    students, student_index = np.unique(
+        np.concatenate([periods.student, np.array(p_student, dtype=np.int64)]), return_inverse=True,
+    )
+    period_student = student_index[:len(periods.student)]
+    p_index = student_index[len(periods.student):]
+    n = len(students)
+    period_charge, due = periods.charge, periods.due
+    charged_through = _grouped_cumsum(period_charge, period_student)
+
+    # Payments made up to a date, per student, by binary search over (student, day) keys
+    paid = _cents(p_amount)
+    p_day = np.array(p_date, dtype='datetime64[D]').astype(np.int64)
+    p_key = (p_index.astype(np.int64) << 32) + p_day
+    p_order = np.argsort(p_key, kind='stable')
+    p_key, p_cum = p_key[p_order], _grouped_cumsum(paid[p_order], p_index[p_order])
+
+    def paid_by(day):
+        if not len(p_key):
+            return np.zeros(len(day), dtype=np.int64)
+        keys = (period_student.astype(np.int64) << 32) + day.astype(np.int64)
+        pos = np.maximum(np.searchsorted(p_key, keys, side='right') - 1, 0)
+        same = (p_key[pos] >> 32) == period_student
+        return np.where(same & (p_key[pos] <= keys), p_cum[pos], 0)
+
+    as_of_day = np.datetime64(as_of, 'D')
+    late = (periods.deadline < as_of_day) & (paid_by(periods.deadline) < charged_through)
+    overdue = (due < as_of_day) & (paid_by(np.full(len(due), as_of_day)) < charged_through)
+    late_fee = np.where(late, periods.late_fee, 0)
+
+    def per_student(values, index=period_student):
+        return np.bincount(index, weights=values, minlength=n).astype(np.int64)
+
+    charged = per_student(period_charge)
+    late_fees = per_student(late_fee)
+    total_paid = per_student(paid, p_index)
+    # Charges of a student not covered by the payments, oldest first
+    uncovered = np.clip(charged_through - total_paid[period_student], 0, period_charge)
+    overdue_amount = per_student(np.where(overdue, uncovered, 0))
+    period_count = np.bincount(period_student, minlength=n)
+    overdue_periods = np.bincount(period_student, weights=overdue.astype(float), minlength=n).astype(np.int64)
+    outstanding = charged + late_fees - total_paid
+
+    return {
+        int(student_id): StudentDues(
+            charged=_to_decimal(charged[i]),
+            late_fees=_to_decimal(late_fees[i]),
+            paid=_to_decimal(total_paid[i]),
+            outstanding=_to_decimal(outstanding[i]),
+            overdue=_to_decimal(overdue_amount[i]),
+            periods=int(period_count[i]),
+            overdue_periods=int(overdue_periods[i]),
+        )
+        for i, student_id in enumerate(students)
+    }
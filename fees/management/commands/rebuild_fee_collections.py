@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from fees.summaries import rebuild_fee_collections
+
+
+class Command(BaseCommand):
+    help = "Recompute the FeeCollection summaries (expected, collected, pending) from fee assignments and payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only rebuild this school')
+        parser.add_argument('--year', type=int, help='Calendar year to rebuild (default this year)')
+
+    def handle(self, *args, **options):
+        written = rebuild_fee_collections(school_id=options.get('school'), year=options.get('year'))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} fee collection summaries"))
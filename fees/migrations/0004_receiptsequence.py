@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0005_school_receipt_prefix'),
+        ('fees', '0003_feecategory_feecollection_studentfeeassignment_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('value', models.PositiveIntegerField(default=0)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipt_sequences', to='schools.school')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('school', 'date')},
+            },
+        ),
+    ]
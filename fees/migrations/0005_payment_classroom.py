@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:57
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+import django.db.models.deletion
+
+ZERO = Decimal('0.00')
+
+
+def update_totals(row):
+    """Pending and collection percentage (capped at 100) from expected and collected"""
+    row.total_pending = max(row.total_expected - row.total_collected, ZERO)
+    if row.total_expected > 0:
+        percentage = min(row.total_collected * 100 / row.total_expected, Decimal('100'))
+        row.collection_percentage = max(percentage, ZERO).quantize(Decimal('0.01'))
+    else:
+        row.collection_percentage = ZERO
+    return row
+
+
+def place_existing_payments(apps, schema_editor):
+    """
+    Give existing payments their student's current class, the best record
+    of where they paid, and recount the collected totals to match.
+    """
+    Payment = apps.get_model('fees', 'Payment')
+    FeeCollection = apps.get_model('fees', 'FeeCollection')
+    StudentProfile = apps.get_model('academics', 'StudentProfile')
+    student = StudentProfile.objects.filter(pk=OuterRef('student_id'))
+    Payment.objects.update(classroom_id=Subquery(student.values('classroom_id')[:1]))
+
+    collected = {
+        (group['student__school_id'], group['classroom_id'], group['month'], group['year']): group['total']
+        for group in Payment.objects.filter(payment_status='completed')
+        .annotate(month=ExtractMonth('payment_date'), year=ExtractYear('payment_date'))
+        .values('student__school_id', 'classroom_id', 'month', 'year')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    }
+    rows = list(FeeCollection.objects.all())
+    for row in rows:
+        row.total_collected = collected.pop((row.school_id, row.classroom_id, row.month, row.year), ZERO)
+        update_totals(row)
+    FeeCollection.objects.bulk_update(
+        rows, ['total_collected', 'total_pending', 'collection_percentage'], batch_size=1000,
+    )
+    FeeCollection.objects.bulk_create([
+        update_totals(FeeCollection(
+            school_id=school_id, classroom_id=classroom_id, month=month, year=year, total_collected=total,
+        ))
+        for (school_id, classroom_id, month, year), total in collected.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0007_alter_teacherassignment_teacher'),
+        ('fees', '0004_receiptsequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='classroom',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='academics.classroom'),
+        ),
+        migrations.RunPython(place_existing_payments, migrations.RunPython.noop),
+    ]
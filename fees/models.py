@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Round
 from django.utils import timezone
 from academics.models import StudentProfile, ClassRoom
 from schools.models import School
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 
 
 class FeeCategory(models.Model):
@@ -69,6 +70,22 @@ class FeeStructure(models.Model):
         ]
 
 
+class StudentFeeAssignmentQuerySet(models.QuerySet):
+    def with_payable(self):
+        """Annotate `payable`, computed in SQL the same way as get_payable_amount()"""
+        amount = models.F('fee_structure__amount')
+        return self.annotate(payable=models.Case(
+            models.When(is_waived=True, then=models.Value(Decimal('0.00'))),
+            models.When(
+                models.Q(custom_amount__isnull=False) & ~models.Q(custom_amount=0),
+                then=models.F('custom_amount'),
+            ),
+            models.When(discount_percentage__gt=0, then=Round(amount - amount * models.F('discount_percentage') / 100, 2)),
+            default=amount,
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        ))
+
+
 class StudentFeeAssignment(models.Model):
     """Assign fees to individual students with custom amounts if needed"""
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='fee_assignments')
@@ -83,16 +100,19 @@ class StudentFeeAssignment(models.Model):
     waiver_reason = models.TextField(blank=True)
     
     assigned_date = models.DateField(auto_now_add=True)
+
+    objects = StudentFeeAssignmentQuerySet.as_manager()
     
     def get_payable_amount(self):
+        # Rounded half up to the cent, like with_payable() in SQL
         if self.is_waived:
             return Decimal('0.00')
         if self.custom_amount:
             return self.custom_amount
         base = self.fee_structure.amount
         if self.discount_percentage > 0:
-            discount = base * (self.discount_percentage / 100)
-            return base - discount
+            discount = base * (Decimal(self.discount_percentage) / 100)
+            return (base - discount).quantize(Decimal('0.01'), ROUND_HALF_UP)
         return base
     
     class Meta:
@@ -122,6 +142,9 @@ class Payment(models.Model):
     
     student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='payments')
     fee_assignment = models.ForeignKey(StudentFeeAssignment, on_delete=models.SET_NULL, null=True, blank=True, related_name='payments')
+    # The student's class when paying; the FeeCollection summaries keep the
+    # payment there after the student moves
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.SET_NULL, null=True, blank=True, related_name='payments')
     
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='cash')
@@ -144,13 +167,20 @@ class Payment(models.Model):
     created_by = models.CharField(max_length=100, blank=True)
 
     def save(self, *args, **kwargs):
-        if not self.receipt_number:
-            # Auto-generate receipt number
-            import datetime
-            today = datetime.date.today()
-            count = Payment.objects.filter(payment_date=today).count() + 1
-            self.receipt_number = f"RCP-{today.strftime('%Y%m%d')}-{count:04d}"
-        super().save(*args, **kwargs)
+        from .receipts import allocate_receipt_numbers
+
+        # The day's receipt counter row stays locked until the payment is
+        # written; signal handlers update FeeCollection in the same transaction
+        with transaction.atomic():
+            if self._state.adding and self.classroom_id is None:
+                self.classroom_id = self.student.classroom_id
+            if not self.receipt_number:
+                self.receipt_number = allocate_receipt_numbers(self.student.school_id)[0]
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"{self.student.user.get_full_name()} - {self.amount} - {self.receipt_number}"
@@ -185,3 +215,17 @@ class FeeCollection(models.Model):
     
     def __str__(self):
         return f"{self.school.name} - {self.month}/{self.year}"
+
+
+class ReceiptSequence(models.Model):
+    """Last receipt number issued by a school on a day (see receipts.allocate_receipt_numbers)"""
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='receipt_sequences')
+    date = models.DateField()
+    value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('school', 'date')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.school_id} - {self.date}: {self.value}"
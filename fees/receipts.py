@@ -0,0 +1,70 @@
+"""
+Payment receipt numbers.
+
+Numbers look like <prefix>-<YYYYMMDD>-<NNNN>, counted per school and day in
+a ReceiptSequence row. Allocating is one UPDATE ... value = value + n on
+that row, whose lock serialises cashiers saving at the same time, so no
+two payments get the same number and nothing counts the day's payments.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from academics.models import StudentProfile
+from schools.models import School
+from .models import Payment, ReceiptSequence
+
+DEFAULT_PREFIX = 'RCP'
+
+
+def receipt_prefix(school_id):
+    prefix = School.objects.filter(pk=school_id).values_list('receipt_prefix', flat=True).first()
+    return prefix or f'{DEFAULT_PREFIX}{school_id}'
+
+
+def allocate_receipt_numbers(school_id, count=1, day=None):
+    """
+    Reserve `count` consecutive receipt numbers of a school for `day`
+    (today by default) and return them in order. Run it inside the
+    transaction that saves the payments so the counter row stays locked
+    until they are written.
+    """
+    if count <= 0:
+        return []
+    day = day or timezone.localdate()
+    stem = f"{receipt_prefix(school_id)}-{day:%Y%m%d}-"
+    sequence = ReceiptSequence.objects.filter(school_id=school_id, date=day)
+    with transaction.atomic():
+        if not sequence.update(value=F('value') + count):
+            # First receipt of the day; start after any numbers already issued
+            # under this prefix (e.g. before the prefix was changed back)
+            issued = Payment.objects.filter(receipt_number__startswith=stem).count()
+            try:
+                with transaction.atomic():
+                    ReceiptSequence.objects.create(school_id=school_id, date=day, value=issued + count)
+            except IntegrityError:
+                # Another cashier created the row first
+                sequence.update(value=F('value') + count)
+        last = sequence.values_list('value', flat=True).get()
+    return [f'{stem}{number:04d}' for number in range(last - count + 1, last + 1)]
+
+
+def assign_receipt_numbers(payments, day=None):
+    """
+    Give unsaved Payment instances without a receipt number one each,
+    with one allocation per school, e.g. before a bulk_create import.
+    Call it inside the import's transaction.
+    """
+    pending = [payment for payment in payments if not payment.receipt_number]
+    schools = dict(
+        StudentProfile.objects.filter(id__in={payment.student_id for payment in pending})
+        .values_list('id', 'school_id')
+    )
+    by_school = {}
+    for payment in pending:
+        by_school.setdefault(schools[payment.student_id], []).append(payment)
+    with transaction.atomic():
+        for school_id, school_payments in by_school.items():
+            for payment, number in zip(school_payments, allocate_receipt_numbers(school_id, len(school_payments), day)):
+                payment.receipt_number = number
+    return payments
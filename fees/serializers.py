@@ -33,10 +33,10 @@ class PaymentSerializer(serializers.ModelSerializer):
             'id', 'student', 'student_id',
             'fee_assignment', 'fee_assignment_id',
             'amount', 'payment_method', 'payment_status', 'payment_date',
-            'reference', 'transaction_id', 'receipt_number',
+            'reference', 'transaction_id', 'receipt_number', 'classroom',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'receipt_number', 'created_at', 'updated_at', 'student', 'fee_assignment']
+        read_only_fields = ['id', 'receipt_number', 'classroom', 'created_at', 'updated_at', 'student', 'fee_assignment']
 
 
 class FeeCategorySerializer(serializers.ModelSerializer):
@@ -53,15 +53,23 @@ class StudentFeeAssignmentSerializer(serializers.ModelSerializer):
     student_id = serializers.PrimaryKeyRelatedField(source='student', queryset=StudentProfile.objects.all(), write_only=True)
     fee_structure = FeeStructureSerializer(read_only=True)
     fee_structure_id = serializers.PrimaryKeyRelatedField(source='fee_structure', queryset=FeeStructure.objects.all(), write_only=True)
+    payable_amount = serializers.SerializerMethodField()
 
     class Meta:
         model = StudentFeeAssignment
         fields = [
             'id', 'student', 'student_id', 'fee_structure', 'fee_structure_id',
             'custom_amount', 'discount_percentage', 'discount_reason',
-            'is_waived', 'waiver_reason', 'assigned_date'
+            'is_waived', 'waiver_reason', 'assigned_date', 'payable_amount'
         ]
 
+    def get_payable_amount(self, obj):
+        # Listings annotate it with with_payable(); freshly saved instances are not annotated
+        payable = getattr(obj, 'payable', None)
+        if payable is None:
+            payable = obj.get_payable_amount()
+        return serializers.DecimalField(max_digits=10, decimal_places=2).to_representation(payable)
+
 
 class FeeCollectionSerializer(serializers.ModelSerializer):
     school = SchoolSerializer(read_only=True)
@@ -73,3 +81,21 @@ class FeeCollectionSerializer(serializers.ModelSerializer):
             'id', 'school', 'school_id', 'classroom', 'month', 'year',
             'total_expected', 'total_collected', 'total_pending', 'collection_percentage'
         ]
+        # Maintained from payments, fee assignments and structures (see fees.summaries)
+        read_only_fields = ['total_expected', 'total_collected', 'total_pending', 'collection_percentage']
+
+
+class StudentDuesSerializer(serializers.Serializer):
+    """Serializer for a student's computed dues (see fees.dues)"""
+    student_id = serializers.IntegerField()
+    student_name = serializers.CharField()
+    roll_number = serializers.CharField(allow_null=True)
+    classroom = serializers.CharField()
+    section = serializers.CharField()
+    charged = serializers.DecimalField(max_digits=12, decimal_places=2)
+    late_fees = serializers.DecimalField(max_digits=12, decimal_places=2)
+    paid = serializers.DecimalField(max_digits=12, decimal_places=2)
+    outstanding = serializers.DecimalField(max_digits=12, decimal_places=2)
+    overdue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    periods = serializers.IntegerField()
+    overdue_periods = serializers.IntegerField()
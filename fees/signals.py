@@ -0,0 +1,109 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from academics.models import ClassRoom, StudentProfile
+from schools.models import School
+from .models import FeeStructure, Payment, StudentFeeAssignment
+from .summaries import apply_collection_deltas, rebuild_fee_collections, refresh_expected_on_commit
+
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _collected(school_id, classroom_id, day, amount, status):
+    """The payment's contribution to the summaries, if it counts as collected"""
+    if status != 'completed':
+        return []
+    return [(school_id, classroom_id, day, amount)]
+
+
+@receiver(pre_save, sender=Payment)
+def remember_previous_payment(sender, instance, **kwargs):
+    """Remember what the stored payment contributed, to take it back out"""
+    instance._previous_collection = []
+    if instance.pk:
+        previous = (
+            Payment.objects.filter(pk=instance.pk)
+            .values_list('student__school_id', 'classroom_id', 'payment_date', 'amount', 'payment_status')
+            .first()
+        )
+        if previous:
+            instance._previous_collection = _collected(*previous)
+
+
+@receiver(post_save, sender=Payment)
+def update_collections_on_save(sender, instance, **kwargs):
+    """Move a created, edited or refunded payment into the FeeCollection summaries"""
+    student = instance.student
+    changes = [
+        (school_id, classroom_id, day, -amount)
+        for school_id, classroom_id, day, amount in getattr(instance, '_previous_collection', [])
+    ]
+    changes += _collected(student.school_id, instance.classroom_id, instance.payment_date, instance.amount, instance.payment_status)
+    apply_collection_deltas(changes)
+
+
+@receiver(post_delete, sender=Payment)
+def update_collections_on_delete(sender, instance, origin=None, **kwargs):
+    """Take a deleted payment out of the summaries"""
+    # A school being deleted takes its summaries with it
+    if _origin_model(origin) is School:
+        return
+    student = instance.student
+    apply_collection_deltas([
+        (school_id, classroom_id, day, -amount)
+        for school_id, classroom_id, day, amount in _collected(
+            student.school_id, instance.classroom_id, instance.payment_date, instance.amount, instance.payment_status,
+        )
+    ])
+
+
+@receiver(post_delete, sender=ClassRoom)
+def recount_collections_on_classroom_delete(sender, instance, origin=None, **kwargs):
+    """
+    Deleting a classroom drops its summaries and leaves its payments without
+    one; count those payments again under the school.
+    """
+    if _origin_model(origin) is School:
+        return
+    years = Payment.objects.filter(student__school_id=instance.school_id, classroom__isnull=True).dates('payment_date', 'year')
+    for year in years:
+        rebuild_fee_collections(school_id=instance.school_id, year=year.year)
+
+
+@receiver(post_save, sender=FeeStructure)
+@receiver(post_delete, sender=FeeStructure)
+def refresh_expected_on_structure_change(sender, instance, origin=None, **kwargs):
+    """A structure's amount, frequency or active flag changes what its school expects"""
+    if _origin_model(origin) is not School:
+        refresh_expected_on_commit(instance.school_id)
+
+
+@receiver(post_save, sender=StudentFeeAssignment)
+@receiver(post_delete, sender=StudentFeeAssignment)
+def refresh_expected_on_assignment_change(sender, instance, origin=None, **kwargs):
+    """Assigning, changing or removing a student's fee changes what the school expects"""
+    if _origin_model(origin) is School:
+        return
+    school_id = FeeStructure.objects.filter(pk=instance.fee_structure_id).values_list('school_id', flat=True).first()
+    # Deleted along with its structure, whose own handler refreshes the school
+    if school_id is not None:
+        refresh_expected_on_commit(school_id)
+
+
+@receiver(pre_save, sender=StudentProfile)
+def remember_previous_classroom(sender, instance, **kwargs):
+    instance._previous_fee_classroom = (
+        StudentProfile.objects.filter(pk=instance.pk).values_list('classroom_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=StudentProfile)
+def refresh_expected_on_student_move(sender, instance, created=False, **kwargs):
+    """A student's expected fees are counted under their current classroom"""
+    if created or getattr(instance, '_previous_fee_classroom', None) == instance.classroom_id:
+        return
+    if StudentFeeAssignment.objects.filter(student=instance).exists():
+        refresh_expected_on_commit(instance.school_id)
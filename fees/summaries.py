@@ -0,0 +1,232 @@
+"""
+FeeCollection summaries.
+
+One row per school, classroom and calendar month. total_expected is what
+the active fee assignments bill in that month (see dues.billed_periods),
+total_collected the completed payments dated in it, under the classroom
+stored on each payment. Payment writes apply +/- deltas to total_collected in the
+payment's transaction. Expected amounts depend on every assignment of the
+school, so changes to assignments, structures or a student's classroom
+recompute the school's expected totals once their transaction commits
+(refresh_expected_on_commit). rebuild_fee_collections recomputes both.
+"""
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from academics.models import StudentProfile
+from .dues import billed_periods
+from .models import FeeCollection, FeeStructure, Payment
+
+SUMMARY_FIELDS = ['total_expected', 'total_collected', 'total_pending', 'collection_percentage']
+
+ZERO = Decimal('0.00')
+CENTS = Decimal('0.01')
+
+
+def update_totals(row):
+    """Derive total_pending and collection_percentage (capped at 100) from expected and collected"""
+    row.total_pending = max(row.total_expected - row.total_collected, ZERO)
+    if row.total_expected > 0:
+        percentage = min(row.total_collected * 100 / row.total_expected, Decimal('100'))
+        row.collection_percentage = max(percentage, ZERO).quantize(CENTS)
+    else:
+        row.collection_percentage = ZERO
+    return row
+
+
+def _as_date(day):
+    # Payments created with ISO strings keep them until reloaded
+    return date.fromisoformat(day) if isinstance(day, str) else day
+
+
+def apply_collection_deltas(changes):
+    """
+    Apply payment changes to the summaries: an iterable of (school_id,
+    classroom_id, payment_date, amount) where amount is negative for money
+    taken back out. Touched rows are locked and updated in one
+    bulk_update/bulk_create.
+    """
+    deltas = {}
+    for school_id, classroom_id, day, amount in changes:
+        day = _as_date(day)
+        key = (school_id, classroom_id, day.month, day.year)
+        deltas[key] = deltas.get(key, ZERO) + Decimal(str(amount))
+    deltas = {key: amount for key, amount in deltas.items() if amount}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        existing = {
+            (row.school_id, row.classroom_id, row.month, row.year): row
+            for row in FeeCollection.objects.select_for_update().filter(
+                school_id__in={key[0] for key in deltas},
+                year__in={key[3] for key in deltas},
+                month__in={key[2] for key in deltas},
+            )
+        }
+        to_create, to_update = [], []
+        for key, amount in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                row = FeeCollection(school_id=key[0], classroom_id=key[1], month=key[2], year=key[3])
+                to_create.append(row)
+            else:
+                to_update.append(row)
+            row.total_collected += amount
+            update_totals(row)
+        if to_update:
+            FeeCollection.objects.bulk_update(to_update, SUMMARY_FIELDS, batch_size=500)
+        if to_create:
+            FeeCollection.objects.bulk_create(to_create, batch_size=500)
+
+
+def collected_totals(payments):
+    """
+    {(school_id, classroom_id, month, year): Decimal} of the completed
+    payments of a Payment queryset
+    """
+    return {
+        (group['student__school_id'], group['classroom_id'], group['month'], group['year']): group['total']
+        for group in payments.filter(payment_status='completed')
+        .annotate(month=ExtractMonth('payment_date'), year=ExtractYear('payment_date'))
+        .values('student__school_id', 'classroom_id', 'month', 'year')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    }
+
+
+def _expected_by_classroom(school_id, year):
+    """{(classroom_id, month): Decimal} billed by the school's assignments in a calendar year"""
+    periods = billed_periods(school_id, date(year, 1, 1), date(year, 12, 31))
+    if not len(periods.student):
+        return {}
+    placement = dict(
+        StudentProfile.objects.filter(id__in=np.unique(periods.student).tolist())
+        .values_list('id', 'classroom_id')
+    )
+    # Classroom ids with 0 standing in for "no classroom"
+    classroom = np.array([placement.get(int(s)) or 0 for s in periods.student], dtype=np.int64)
+    month = periods.month.astype(np.int64) % 12 + 1
+    keys, inverse = np.unique(np.stack([classroom, month]), axis=1, return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=periods.charge)
+    return {
+        (int(classroom_id) or None, int(month_number)): (Decimal(int(round(total))) * CENTS).quantize(CENTS)
+        for (classroom_id, month_number), total in zip(keys.T, totals)
+    }
+
+
+def refresh_expected_totals(school_id, years=None):
+    """
+    Recompute total_expected of a school's summaries for `years` (default
+    every year the school has rows for, and this one), keeping
+    total_collected. Returns the number of rows written.
+    """
+    if years is None:
+        years = set(FeeCollection.objects.filter(school_id=school_id).values_list('year', flat=True))
+        years.add(timezone.localdate().year)
+
+    written = 0
+    with transaction.atomic():
+        for year in sorted(years):
+            expected = _expected_by_classroom(school_id, year)
+            to_create, to_update = [], []
+            for row in FeeCollection.objects.select_for_update().filter(school_id=school_id, year=year):
+                amount = expected.pop((row.classroom_id, row.month), ZERO)
+                if row.total_expected != amount:
+                    row.total_expected = amount
+                    to_update.append(update_totals(row))
+            for (classroom_id, month), amount in expected.items():
+                if amount:
+                    to_create.append(update_totals(FeeCollection(
+                        school_id=school_id, classroom_id=classroom_id, month=month, year=year, total_expected=amount,
+                    )))
+            if to_update:
+                FeeCollection.objects.bulk_update(to_update, SUMMARY_FIELDS, batch_size=500)
+            if to_create:
+                FeeCollection.objects.bulk_create(to_create, batch_size=500)
+            written += len(to_update) + len(to_create)
+    return written
+
+
+def refresh_expected_on_commit(school_id):
+    """
+    Refresh a school's expected totals after the current transaction commits,
+    once per school however many assignments the transaction touched.
+    """
+    connection = transaction.get_connection()
+    # Schools refreshed by this transaction's callbacks; a rolled back
+    # transaction leaves an empty set behind for the next one to reuse
+    refreshed = getattr(connection, 'fee_expected_refreshed', None)
+    if refreshed is None:
+        refreshed = connection.fee_expected_refreshed = set()
+
+    def refresh():
+        if getattr(connection, 'fee_expected_refreshed', None) is refreshed:
+            connection.fee_expected_refreshed = None
+        if school_id not in refreshed:
+            refreshed.add(school_id)
+            refresh_expected_totals(school_id)
+
+    transaction.on_commit(refresh)
+
+
+def rebuild_fee_collections(school_id=None, year=None):
+    """
+    Recompute the summaries of one school, or of every school with fees or
+    payments, for a calendar year (default this one). Existing rows of that
+    scope are replaced; returns the number of rows written.
+    """
+    year = year or timezone.localdate().year
+    if school_id is not None:
+        school_ids = [school_id]
+    else:
+        school_ids = sorted(
+            set(FeeStructure.objects.values_list('school_id', flat=True))
+            | set(Payment.objects.filter(payment_date__year=year).values_list('student__school_id', flat=True))
+        )
+
+    rows = []
+    for current_school in school_ids:
+        collected = {
+            (classroom_id, month): total
+            for (_, classroom_id, month, _), total in collected_totals(
+                Payment.objects.filter(student__school_id=current_school, payment_date__year=year)
+            ).items()
+        }
+        expected = _expected_by_classroom(current_school, year)
+        for classroom_id, month in sorted(set(collected) | set(expected), key=lambda key: (key[1], key[0] or 0)):
+            rows.append(update_totals(FeeCollection(
+                school_id=current_school, classroom_id=classroom_id, month=month, year=year,
+                total_expected=expected.get((classroom_id, month), ZERO),
+                total_collected=collected.get((classroom_id, month)) or ZERO,
+            )))
+
+    with transaction.atomic():
+        FeeCollection.objects.filter(school_id__in=school_ids, year=year).delete()
+        FeeCollection.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def collection_totals(school_id, year, month=None):
+    """Summed expected/collected/pending and percentage of a school's summary rows"""
+    rows = FeeCollection.objects.filter(school_id=school_id, year=year)
+    if month is not None:
+        rows = rows.filter(month=month)
+    totals = rows.aggregate(*[Sum(field) for field in ('total_expected', 'total_collected', 'total_pending')])
+    summary = update_totals(FeeCollection(
+        total_expected=totals['total_expected__sum'] or ZERO,
+        total_collected=totals['total_collected__sum'] or ZERO,
+    ))
+    return {
+        'expected': summary.total_expected,
+        'collected': summary.total_collected,
+        # Per classroom: one class paying ahead does not cover another
+        'pending': totals['total_pending__sum'] or ZERO,
+        'collection_percentage': summary.collection_percentage,
+    }
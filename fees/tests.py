@@ -0,0 +1,327 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from academics.models import ClassRoom, Section, StudentProfile
+from schools.models import School
+from .models import FeeCollection, Payment, StudentFeeAssignment, FeeStructure
+from .dues import compute_dues
+from .receipts import allocate_receipt_numbers
+
+
+class FeeCollectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        cls.classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        cls.next_classroom = ClassRoom.objects.create(school=cls.school, name='Class 7')
+        cls.student = StudentProfile.objects.create(
+            user=get_user_model().objects.create(username='student'),
+            school=cls.school, classroom=cls.classroom, roll_number='1',
+        )
+
+    def collected(self):
+        return sorted(
+            FeeCollection.objects.filter(school=self.school)
+            .values_list('classroom_id', 'month', 'year', 'total_collected')
+        )
+
+    def pay(self, amount, day=date(2026, 3, 5), **kwargs):
+        return Payment.objects.create(student=self.student, amount=Decimal(amount), payment_date=day, **kwargs)
+
+    def test_payments_add_up_per_month(self):
+        self.pay('100.50')
+        self.pay('20')
+        self.pay('30', day=date(2026, 4, 1))
+        self.pay('999', payment_status='pending')
+
+        self.assertEqual(self.collected(), [
+            (self.classroom.id, 3, 2026, Decimal('120.50')),
+            (self.classroom.id, 4, 2026, Decimal('30.00')),
+        ])
+
+    def test_edits_and_deletes_after_a_move_stay_with_the_paid_class(self):
+        payment = self.pay('100')
+        self.student.classroom = self.next_classroom
+        self.student.save()
+
+        payment.amount = Decimal('60')
+        payment.save()
+        self.pay('10')
+        self.assertEqual(self.collected(), [
+            (self.classroom.id, 3, 2026, Decimal('60.00')),
+            (self.next_classroom.id, 3, 2026, Decimal('10.00')),
+        ])
+
+        payment.payment_status = 'refunded'
+        payment.save()
+        Payment.objects.get(amount=10).delete()
+        self.assertEqual(self.collected(), [
+            (self.classroom.id, 3, 2026, Decimal('0.00')),
+            (self.next_classroom.id, 3, 2026, Decimal('0.00')),
+        ])
+
+
+    def march(self):
+        return FeeCollection.objects.filter(school=self.school, classroom=self.classroom, month=3, year=2026).values_list(
+            'total_expected', 'total_collected', 'total_pending', 'collection_percentage',
+        ).get()
+
+    def test_expected_follows_assignments_and_structures(self):
+        self.pay('250')
+        structure = FeeStructure.objects.create(school=self.school, classroom=self.classroom, amount=Decimal('1000'))
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment = StudentFeeAssignment.objects.create(student=self.student, fee_structure=structure)
+            # assigned_date is auto_now_add
+            StudentFeeAssignment.objects.filter(pk=assignment.pk).update(assigned_date=date(2026, 1, 1))
+        self.assertEqual(self.march(), (Decimal('1000.00'), Decimal('250.00'), Decimal('750.00'), Decimal('25.00')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            structure.amount = Decimal('500')
+            structure.save()
+        self.assertEqual(self.march(), (Decimal('500.00'), Decimal('250.00'), Decimal('250.00'), Decimal('50.00')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.delete()
+        self.assertEqual(self.march(), (Decimal('0.00'), Decimal('250.00'), Decimal('0.00'), Decimal('0.00')))
+
+    def test_assign_to_classroom_bills_the_class(self):
+        self.pay('250')
+        structure = FeeStructure.objects.create(school=self.school, classroom=self.classroom, amount=Decimal('1000'))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = APIClient().post(f'/api/fees/fees/{structure.id}/assign_to_classroom/', secure=True)
+            StudentFeeAssignment.objects.update(assigned_date=date(2026, 1, 1))
+
+        self.assertEqual(response.data['total_assigned'], 1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.march()[0], Decimal('1000.00'))
+
+class ReceiptNumberTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School', receipt_prefix='ABC')
+        cls.classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        cls.students = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{i}'),
+                school=cls.school, classroom=cls.classroom, roll_number=str(i),
+            )
+            for i in range(1, 3)
+        ]
+        structure = FeeStructure.objects.create(school=cls.school, classroom=cls.classroom, amount=Decimal('500'))
+        cls.assignment = StudentFeeAssignment.objects.create(student=cls.students[0], fee_structure=structure)
+
+    def bulk_save(self, payments):
+        return APIClient().post('/api/fees/payments/bulk_save/', {'payments': payments}, format='json', secure=True)
+
+    def test_numbers_are_consecutive_per_day(self):
+        day = date(2026, 3, 5)
+        self.assertEqual(allocate_receipt_numbers(self.school.id, 2, day), ['ABC-20260305-0001', 'ABC-20260305-0002'])
+        self.assertEqual(allocate_receipt_numbers(self.school.id, 1, day), ['ABC-20260305-0003'])
+        self.assertEqual(allocate_receipt_numbers(self.school.id, 1, date(2026, 3, 6)), ['ABC-20260306-0001'])
+
+    def test_default_prefixes_are_reserved(self):
+        other = School.objects.create(name='Other school')
+        response = APIClient().patch(
+            f'/api/schools/{other.id}/', {'receipt_prefix': f'RCP{self.school.id}'}, format='json', secure=True,
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('receipt_prefix', response.data)
+        other.refresh_from_db()
+        self.assertIsNone(other.receipt_prefix)
+        self.assertEqual(allocate_receipt_numbers(other.id, 1, date(2026, 3, 5)), [f'RCP{other.id}-20260305-0001'])
+
+    def test_bulk_save_numbers_payments_and_updates_collections(self):
+        first, second = self.students
+        single = Payment.objects.create(student=first, amount=Decimal('5'), payment_date=date(2026, 3, 1))
+
+        response = self.bulk_save([
+            {'student': first.id, 'amount': '100', 'payment_date': '2026-03-02', 'fee_assignment': self.assignment.id},
+            {'student': 0, 'amount': '100'},
+            {'student': first.id, 'amount': '-1'},
+            {'student': second.id, 'amount': '10', 'fee_assignment': self.assignment.id},
+            {'student': second.id, 'amount': '20.50', 'payment_date': '2026-03-02', 'payment_method': 'card'},
+            {'student': second.id, 'amount': '40', 'payment_date': '2026-03-02', 'payment_status': 'pending'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['saved'], 3)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        stem = single.receipt_number.rsplit('-', 1)[0]
+        self.assertEqual(response.data['receipt_numbers'], [f'{stem}-0002', f'{stem}-0003', f'{stem}-0004'])
+        self.assertEqual(
+            list(Payment.objects.filter(receipt_number__in=response.data['receipt_numbers'])
+                 .order_by('receipt_number').values_list('student_id', 'classroom_id', 'fee_assignment_id', 'amount')),
+            [
+                (first.id, self.classroom.id, self.assignment.id, Decimal('100.00')),
+                (second.id, self.classroom.id, None, Decimal('20.50')),
+                (second.id, self.classroom.id, None, Decimal('40.00')),
+            ],
+        )
+        self.assertEqual(
+            FeeCollection.objects.get(school=self.school, classroom=self.classroom, month=3, year=2026).total_collected,
+            Decimal('125.50'),
+        )
+
+
+class PayableAmountTests(TestCase):
+    def test_sql_payable_matches_get_payable_amount(self):
+        school = School.objects.create(name='School')
+        classroom = ClassRoom.objects.create(school=school, name='Class 6')
+        cases = [
+            ('10.01', {}),
+            ('10.01', {'is_waived': True, 'custom_amount': Decimal('5')}),
+            ('10.01', {'custom_amount': Decimal('7.50')}),
+            ('10.01', {'custom_amount': Decimal('0'), 'discount_percentage': Decimal('50')}),
+            ('10.01', {'discount_percentage': Decimal('50')}),
+            ('1.15', {'discount_percentage': Decimal('50')}),
+            ('100.05', {'discount_percentage': Decimal('10')}),
+            ('999.99', {'discount_percentage': Decimal('12.5')}),
+            ('0.03', {'discount_percentage': Decimal('33.33')}),
+        ]
+        for i, (amount, overrides) in enumerate(cases):
+            structure = FeeStructure.objects.create(school=school, classroom=classroom, amount=Decimal(amount))
+            StudentFeeAssignment.objects.create(
+                student=StudentProfile.objects.create(
+                    user=get_user_model().objects.create(username=f'student{i}'), school=school, roll_number=str(i),
+                ),
+                fee_structure=structure, **overrides,
+            )
+
+        for assignment in StudentFeeAssignment.objects.with_payable().select_related('fee_structure'):
+            with self.subTest(amount=assignment.fee_structure.amount, discount=assignment.discount_percentage):
+                self.assertEqual(assignment.payable, assignment.get_payable_amount())
+        # Half a cent rounds up
+        self.assertEqual(
+            sorted(StudentFeeAssignment.objects.with_payable().filter(discount_percentage=50).values_list('payable', flat=True)),
+            [Decimal('0.58'), Decimal('5.01'), Decimal('5.01')],
+        )
+
+class DuesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        cls.paying, cls.discounted, cls.waived = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{i}'),
+                school=cls.school, classroom=classroom, roll_number=str(i),
+            )
+            for i in range(1, 4)
+        ]
+        tuition = FeeStructure.objects.create(
+            school=cls.school, classroom=classroom, amount=Decimal('1000'), frequency='monthly',
+            due_day=10, late_fee_amount=Decimal('50'), late_fee_after_days=7,
+        )
+        admission = FeeStructure.objects.create(
+            school=cls.school, classroom=classroom, amount=Decimal('500'), frequency='one_time', due_day=10,
+        )
+        StudentFeeAssignment.objects.create(student=cls.paying, fee_structure=tuition)
+        StudentFeeAssignment.objects.create(student=cls.discounted, fee_structure=tuition, discount_percentage=10)
+        StudentFeeAssignment.objects.create(student=cls.waived, fee_structure=tuition, is_waived=True)
+        StudentFeeAssignment.objects.create(student=cls.discounted, fee_structure=admission)
+        # assigned_date is auto_now_add
+        StudentFeeAssignment.objects.update(assigned_date=date(2026, 1, 1))
+        StudentFeeAssignment.objects.filter(fee_structure=admission).update(assigned_date=date(2026, 2, 15))
+        for day in (date(2026, 1, 5), date(2026, 2, 20)):
+            Payment.objects.create(student=cls.paying, amount=Decimal('1000'), payment_date=day)
+        Payment.objects.create(student=cls.paying, amount=Decimal('300'), payment_date=day, payment_status='failed')
+
+    def test_charges_payments_and_late_fees(self):
+        dues = compute_dues(self.school.id, as_of=date(2026, 3, 20))
+
+        # January was paid in time, February late and March not at all
+        self.assertEqual(dues[self.paying.id]._asdict(), {
+            'charged': Decimal('3000.00'), 'late_fees': Decimal('100.00'), 'paid': Decimal('2000.00'),
+            'outstanding': Decimal('1100.00'), 'overdue': Decimal('1000.00'), 'periods': 3, 'overdue_periods': 1,
+        })
+        # Three discounted months and the one-time admission fee, nothing paid
+        self.assertEqual(dues[self.discounted.id]._asdict(), {
+            'charged': Decimal('3200.00'), 'late_fees': Decimal('150.00'), 'paid': Decimal('0.00'),
+            'outstanding': Decimal('3350.00'), 'overdue': Decimal('3200.00'), 'periods': 4, 'overdue_periods': 4,
+        })
+        self.assertNotIn(self.waived.id, dues)
+
+    def test_window_and_due_dates(self):
+        dues = compute_dues(self.school.id, as_of=date(2026, 3, 5), start=date(2026, 2, 1))
+
+        # February and the not yet due March; January and its payment are outside the window
+        self.assertEqual(
+            (dues[self.paying.id].charged, dues[self.paying.id].paid, dues[self.paying.id].overdue),
+            (Decimal('2000.00'), Decimal('1000.00'), Decimal('0.00')),
+        )
+        self.assertEqual(dues[self.paying.id].late_fees, Decimal('50.00'))
+
+    def test_discounted_charges_match_the_payable_amount(self):
+        assignment = StudentFeeAssignment.objects.get(student=self.discounted, fee_structure__frequency='monthly')
+        FeeStructure.objects.filter(pk=assignment.fee_structure_id).update(amount=Decimal('10.01'))
+        StudentFeeAssignment.objects.filter(pk=assignment.pk).update(discount_percentage=50)
+        assignment.refresh_from_db()
+
+        dues = compute_dues(self.school.id, as_of=date(2026, 1, 31), student_ids=[self.discounted.id])
+
+        self.assertEqual(dues[self.discounted.id].charged, assignment.get_payable_amount())
+        self.assertEqual(dues[self.discounted.id].charged, Decimal('5.01'))
+
+    def test_outstanding_endpoint(self):
+        response = APIClient().get('/api/fees/assignments/dues/', {
+            'school': self.school.id, 'as_of': '2026-03-20', 'outstanding': 'true',
+        }, secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['student_id'], Decimal(row['outstanding'])) for row in response.data],
+            [(self.discounted.id, Decimal('3350.00')), (self.paying.id, Decimal('1100.00'))],
+        )
+
+
+class AssignToClassroomTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        cls.classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        other_classroom = ClassRoom.objects.create(school=cls.school, name='Class 7')
+        cls.section_a = Section.objects.create(classroom=cls.classroom, name='A')
+        section_b = Section.objects.create(classroom=cls.classroom, name='B')
+        places = [(cls.classroom, cls.section_a), (cls.classroom, cls.section_a), (cls.classroom, section_b), (other_classroom, None)]
+        cls.students = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{i}'),
+                school=cls.school, classroom=classroom, section=section, roll_number=str(i),
+            )
+            for i, (classroom, section) in enumerate(places, 1)
+        ]
+        cls.structure = FeeStructure.objects.create(school=cls.school, classroom=cls.classroom, amount=Decimal('500'))
+
+    def assign(self, structure=None, **data):
+        structure = structure or self.structure
+        return APIClient().post(f'/api/fees/fees/{structure.id}/assign_to_classroom/', data, format='json', secure=True)
+
+    def assigned(self):
+        return sorted(self.structure.assignments.values_list('student_id', flat=True))
+
+    def test_assigns_a_section_then_the_rest_of_the_class(self):
+        first, second, third, _ = self.students
+        existing = StudentFeeAssignment.objects.create(student=first, fee_structure=self.structure, discount_percentage=Decimal('10'))
+
+        response = self.assign(section=self.section_a.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['students'], response.data['total_assigned']), (2, 2))
+        self.assertEqual(self.assigned(), [first.id, second.id])
+
+        response = self.assign()
+        self.assertEqual((response.data['section'], response.data['students'], response.data['total_assigned']), (None, 3, 3))
+        self.assertEqual(self.assigned(), [first.id, second.id, third.id])
+        # Existing assignments are left as they were
+        existing.refresh_from_db()
+        self.assertEqual(existing.discount_percentage, Decimal('10.00'))
+
+    def test_structure_without_classroom_or_bad_section(self):
+        school_wide = FeeStructure.objects.create(school=self.school, amount=Decimal('100'))
+        self.assertEqual(self.assign(school_wide).status_code, 400)
+        self.assertEqual(self.assign(section='A').status_code, 400)
+        self.assertFalse(StudentFeeAssignment.objects.exists())
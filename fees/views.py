@@ -1,11 +1,17 @@
-from rest_framework import viewsets
+from datetime import datetime
+from decimal import Decimal
+
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import FeeStructure, Payment, FeeCategory, StudentFeeAssignment, FeeCollection
 from .serializers import (
     FeeStructureSerializer, PaymentSerializer,
-    FeeCategorySerializer, StudentFeeAssignmentSerializer, FeeCollectionSerializer
+    FeeCategorySerializer, StudentFeeAssignmentSerializer, FeeCollectionSerializer,
+    StudentDuesSerializer
 )
 from rest_framework.permissions import AllowAny
-from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.rest_framework import DjangoFilterBackend, FilterSet, NumberFilter
 
 class FeeStructureViewSet(viewsets.ModelViewSet):
     queryset = FeeStructure.objects.select_related('school').all()
@@ -14,6 +20,45 @@ class FeeStructureViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['school']
 
+    @action(detail=True, methods=['post'])
+    def assign_to_classroom(self, request, pk=None):
+        """
+        Assign this fee structure to every student of its classroom (optionally
+        one `section`) in one bulk insert; students who already have it are skipped
+        """
+        from academics.models import StudentProfile
+        from .summaries import refresh_expected_on_commit
+
+        structure = self.get_object()
+        if not structure.classroom_id:
+            return Response({'error': 'This fee structure has no classroom'}, status=status.HTTP_400_BAD_REQUEST)
+        section_id = request.data.get('section') or request.query_params.get('section')
+        try:
+            section_id = int(section_id) if section_id else None
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid section'}, status=status.HTTP_400_BAD_REQUEST)
+
+        students = StudentProfile.objects.filter(school_id=structure.school_id, classroom_id=structure.classroom_id)
+        if section_id:
+            students = students.filter(section_id=section_id)
+        student_ids = list(students.values_list('id', flat=True))
+
+        # The (student, fee_structure) unique constraint skips existing pairs
+        StudentFeeAssignment.objects.bulk_create(
+            [StudentFeeAssignment(student_id=student_id, fee_structure=structure) for student_id in student_ids],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        # bulk_create sends no signals; bill the new assignments in the FeeCollection summaries
+        refresh_expected_on_commit(structure.school_id)
+        return Response({
+            'fee_structure': structure.id,
+            'classroom': structure.classroom_id,
+            'section': section_id,
+            'students': len(student_ids),
+            'total_assigned': structure.assignments.count(),
+        })
+
 class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.select_related('student__user','fee_assignment').all()
     serializer_class = PaymentSerializer
@@ -21,6 +66,125 @@ class PaymentViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['student','fee_assignment']
 
+    @action(detail=False, methods=['post'])
+    def bulk_save(self, request):
+        """
+        Record many payments at once (e.g. a day's counter sheet): invalid rows
+        are reported per index, the rest get consecutive receipt numbers and
+        are written with one bulk insert
+        """
+        from django.db import transaction
+        from rest_framework import serializers as drf_serializers
+        from academics.models import StudentProfile
+        from .receipts import assign_receipt_numbers
+        from .summaries import apply_collection_deltas
+
+        payments_data = request.data.get('payments', [])
+        if not payments_data:
+            return Response({'error': 'No payments provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = {
+            'amount': drf_serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01')),
+            'payment_method': drf_serializers.ChoiceField(Payment.PAYMENT_METHODS),
+            'payment_status': drf_serializers.ChoiceField(Payment.PAYMENT_STATUS),
+            'payment_date': drf_serializers.DateField(),
+        }
+        defaults = {'payment_method': 'cash', 'payment_status': 'completed', 'payment_date': datetime.now().date()}
+
+        def as_id(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+
+        # Resolve every student and fee assignment with one IN query each
+        rows = [item for item in payments_data if isinstance(item, dict)]
+        students = {
+            student_id: (school_id, classroom_id)
+            for student_id, school_id, classroom_id in StudentProfile.objects.filter(
+                id__in={as_id(item.get('student')) for item in rows} - {None}
+            ).values_list('id', 'school_id', 'classroom_id')
+        }
+        assignments = dict(
+            StudentFeeAssignment.objects.filter(
+                id__in={as_id(item.get('fee_assignment')) for item in rows} - {None}
+            ).values_list('id', 'student_id')
+        )
+
+        errors = []
+        payments = []
+        for idx, payment_data in enumerate(payments_data):
+            if not isinstance(payment_data, dict):
+                errors.append({'index': idx, 'student': None, 'error': 'Each payment must be an object'})
+                continue
+
+            student_id = as_id(payment_data.get('student'))
+            if student_id not in students:
+                errors.append({
+                    'index': idx,
+                    'student': payment_data.get('student'),
+                    'error': f"Student with id {payment_data.get('student')} not found"
+                })
+                continue
+
+            values = {}
+            for name, field in fields.items():
+                value = payment_data.get(name)
+                if value in (None, '') and name in defaults:
+                    values[name] = defaults[name]
+                    continue
+                try:
+                    values[name] = field.run_validation(value)
+                except drf_serializers.ValidationError as e:
+                    errors.append({'index': idx, 'student': student_id, 'error': f"{name}: {' '.join(e.detail)}"})
+                    break
+            if len(values) < len(fields):
+                continue
+
+            assignment_id = as_id(payment_data.get('fee_assignment'))
+            if payment_data.get('fee_assignment') not in (None, '') and assignments.get(assignment_id) != student_id:
+                errors.append({
+                    'index': idx,
+                    'student': student_id,
+                    'error': f"Fee assignment {payment_data.get('fee_assignment')} is not this student's"
+                })
+                continue
+
+            payments.append(Payment(
+                student_id=student_id,
+                classroom_id=students[student_id][1],
+                fee_assignment_id=assignment_id if payment_data.get('fee_assignment') not in (None, '') else None,
+                reference=payment_data.get('reference') or '',
+                transaction_id=payment_data.get('transaction_id') or '',
+                remarks=payment_data.get('remarks') or '',
+                **values,
+            ))
+
+        if payments:
+            try:
+                with transaction.atomic():
+                    # The receipt counters stay locked until the payments are written
+                    assign_receipt_numbers(payments)
+                    Payment.objects.bulk_create(payments, batch_size=500)
+                    # bulk_create sends no signals; keep the FeeCollection summaries in sync
+                    apply_collection_deltas([
+                        (students[payment.student_id][0], payment.classroom_id, payment.payment_date, payment.amount)
+                        for payment in payments if payment.payment_status == 'completed'
+                    ])
+            except Exception as e:
+                return Response({
+                    'success': False,
+                    'saved': 0,
+                    'errors': errors + [{'index': None, 'student': None, 'error': str(e)}]
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': True,
+            'saved': len(payments),
+            'receipt_numbers': [payment.receipt_number for payment in payments],
+            'errors': errors
+        }, status=status.HTTP_200_OK)
+
 
 class FeeCategoryViewSet(viewsets.ModelViewSet):
     queryset = FeeCategory.objects.select_related('school').all()
@@ -30,12 +194,70 @@ class FeeCategoryViewSet(viewsets.ModelViewSet):
     filterset_fields = ['school']
 
 
+class StudentFeeAssignmentFilter(FilterSet):
+    min_payable = NumberFilter(field_name='payable', lookup_expr='gte')
+
+    class Meta:
+        model = StudentFeeAssignment
+        fields = ['fee_structure__category', 'is_waived']
+
+
 class StudentFeeAssignmentViewSet(viewsets.ModelViewSet):
-    queryset = StudentFeeAssignment.objects.select_related('student__user','fee_structure__category').all()
+    # payable is computed in SQL so it can be sorted (?ordering=payable) and filtered (?min_payable=)
+    queryset = StudentFeeAssignment.objects.with_payable().select_related('student__user','fee_structure__school','fee_structure__category').all()
     serializer_class = StudentFeeAssignmentSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['fee_structure__category', 'is_waived']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = StudentFeeAssignmentFilter
+    ordering_fields = ['payable', 'assigned_date', 'id']
+
+    @action(detail=False, methods=['get'])
+    def dues(self, request):
+        """
+        Charged, paid and outstanding fees per student of ?school= as of ?as_of=
+        (default today) since ?from= (default the start of the fee year), optionally
+        for one ?classroom= / ?section=; ?outstanding=true keeps only students who owe
+        """
+        from academics.models import StudentProfile
+        from .dues import compute_dues
+
+        school_id = request.query_params.get('school')
+        if not school_id:
+            return Response({'error': 'school parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            school_id = int(school_id)
+            as_of = datetime.strptime(request.query_params.get('as_of') or datetime.now().date().isoformat(), '%Y-%m-%d').date()
+            start = request.query_params.get('from')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        except ValueError:
+            return Response({'error': 'Invalid school, as_of or from (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if start and start > as_of:
+            return Response({'error': 'from cannot be after as_of'}, status=status.HTTP_400_BAD_REQUEST)
+
+        students = StudentProfile.objects.filter(school_id=school_id)
+        if request.query_params.get('classroom'):
+            students = students.filter(classroom_id=request.query_params['classroom'])
+        if request.query_params.get('section'):
+            students = students.filter(section_id=request.query_params['section'])
+        filtered = 'classroom' in request.query_params or 'section' in request.query_params
+        student_ids = list(students.values_list('id', flat=True)) if filtered else None
+
+        dues = compute_dues(school_id, as_of=as_of, start=start, student_ids=student_ids)
+        if request.query_params.get('outstanding') == 'true':
+            dues = {student_id: row for student_id, row in dues.items() if row.outstanding > 0}
+
+        rows = []
+        for student in students.filter(id__in=dues).select_related('user', 'classroom', 'section'):
+            rows.append({
+                'student_id': student.id,
+                'student_name': f"{student.user.first_name} {student.user.last_name}".strip() or student.user.username,
+                'roll_number': student.roll_number,
+                'classroom': student.classroom.name if student.classroom else 'N/A',
+                'section': student.section.name if student.section else 'N/A',
+                **dues[student.id]._asdict(),
+            })
+        rows.sort(key=lambda row: (-row['outstanding'], row['student_id']))
+        return Response(StudentDuesSerializer(rows, many=True).data)
 
 
 class FeeCollectionViewSet(viewsets.ModelViewSet):
@@ -4,7 +4,9 @@ from django.utils.html import format_html
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponse, HttpResponseRedirect
 from django.contrib import messages
-from .models import Examination, Result, StudentOverallResult
+from .models import Examination, Result, StudentOverallResult, GradingScale, GradeBand, CombinedStanding, ExamSubjectStatistics
+from .grading import regrade_examination
+from .recalculation import deferred_result_recalculation, refresh_combined_standings
 import csv
 import io
 
@@ -24,6 +26,17 @@ class ExaminationAdmin(admin.ModelAdmin):
         )
     action_links.short_description = 'Actions'
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Marks changed: re-grade the existing results in one pass
+        if change and {'total_marks', 'pass_marks'} & set(form.changed_data):
+            regraded = regrade_examination(obj)
+            messages.info(request, f"Re-graded {regraded} results")
+        # Moved to another classroom or exam type: both combined standings change
+        if change and {'classroom', 'exam_type'} & set(form.changed_data):
+            old_key = (form.initial.get('classroom'), form.initial.get('exam_type'))
+            refresh_combined_standings({old_key: None, (obj.classroom_id, obj.exam_type): None})
+    
     def get_urls(self):
         urls = super().get_urls()
         custom = [
@@ -49,57 +62,59 @@ class ExaminationAdmin(admin.ModelAdmin):
                 updated_count = 0
                 errors = []
                 
-                for row_num, row in enumerate(reader, start=2):
-                    try:
-                        # Expected columns: roll_number, subject_name, written_marks, mcq_marks, practical_marks
-                        roll = row.get('roll_number', '').strip()
-                        subject_name = row.get('subject_name', '').strip()
-                        written = float(row.get('written_marks', 0) or 0)
-                        mcq = float(row.get('mcq_marks', 0) or 0)
-                        practical = float(row.get('practical_marks', 0) or 0)
-                        
-                        if not roll or not subject_name:
-                            errors.append(f"Row {row_num}: Missing roll_number or subject_name")
-                            continue
-                        
-                        # Find student
-                        from academics.models import StudentProfile, Subject
-                        student = StudentProfile.objects.filter(
-                            school=exam.school,
-                            classroom=exam.classroom,
-                            roll_number=roll
-                        ).first()
-                        
-                        if not student:
-                            errors.append(f"Row {row_num}: Student with roll {roll} not found")
-                            continue
-                        
-                        # Find subject
-                        subject = Subject.objects.filter(school=exam.school, name=subject_name).first()
-                        if not subject:
-                            errors.append(f"Row {row_num}: Subject '{subject_name}' not found")
-                            continue
+                # Overall results and ranks are recalculated once after the import
+                with deferred_result_recalculation():
+                    for row_num, row in enumerate(reader, start=2):
+                        try:
+                            # Expected columns: roll_number, subject_name, written_marks, mcq_marks, practical_marks
+                            roll = row.get('roll_number', '').strip()
+                            subject_name = row.get('subject_name', '').strip()
+                            written = float(row.get('written_marks', 0) or 0)
+                            mcq = float(row.get('mcq_marks', 0) or 0)
+                            practical = float(row.get('practical_marks', 0) or 0)
+                            
+                            if not roll or not subject_name:
+                                errors.append(f"Row {row_num}: Missing roll_number or subject_name")
+                                continue
+                            
+                            # Find student
+                            from academics.models import StudentProfile, Subject
+                            student = StudentProfile.objects.filter(
+                                school=exam.school,
+                                classroom=exam.classroom,
+                                roll_number=roll
+                            ).first()
+                            
+                            if not student:
+                                errors.append(f"Row {row_num}: Student with roll {roll} not found")
+                                continue
+                            
+                            # Find subject
+                            subject = Subject.objects.filter(school=exam.school, name=subject_name).first()
+                            if not subject:
+                                errors.append(f"Row {row_num}: Subject '{subject_name}' not found")
+                                continue
+                            
+                            # Create or update result
+                            result, created = Result.objects.update_or_create(
+                                examination=exam,
+                                student=student,
+                                subject=subject,
+                                defaults={
+                                    'written_marks': written,
+                                    'mcq_marks': mcq,
+                                    'practical_marks': practical,
+                                }
+                            )
+                            
+                            if created:
+                                created_count += 1
+                            else:
+                                updated_count += 1
                         
-                        # Create or update result
-                        result, created = Result.objects.update_or_create(
-                            examination=exam,
-                            student=student,
-                            subject=subject,
-                            defaults={
-                                'written_marks': written,
-                                'mcq_marks': mcq,
-                                'practical_marks': practical,
-                            }
-                        )
-                        
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
+                        except Exception as e:
+                            errors.append(f"Row {row_num}: {str(e)}")
                     
-                    except Exception as e:
-                        errors.append(f"Row {row_num}: {str(e)}")
-                
                 # Show summary
                 messages.success(request, f"Import complete! Created: {created_count}, Updated: {updated_count}")
                 if errors:
@@ -142,6 +157,19 @@ class ExaminationAdmin(admin.ModelAdmin):
         return HttpResponse(html)
 
 
+class GradeBandInline(admin.TabularInline):
+    model = GradeBand
+    extra = 0
+
+
+@admin.register(GradingScale)
+class GradingScaleAdmin(admin.ModelAdmin):
+    list_display = ['id', 'school', 'name', 'version', 'is_active', 'created_at']
+    list_filter = ['school', 'is_active']
+    readonly_fields = ['version', 'created_at']
+    inlines = [GradeBandInline]
+
+
 @admin.register(Result)
 class ResultAdmin(admin.ModelAdmin):
     list_display = ['id', 'examination', 'student_name', 'subject', 'written_marks', 'mcq_marks', 'practical_marks', 'total_obtained', 'grade', 'gpa', 'is_passed']
@@ -156,11 +184,30 @@ class ResultAdmin(admin.ModelAdmin):
 
 @admin.register(StudentOverallResult)
 class StudentOverallResultAdmin(admin.ModelAdmin):
-    list_display = ['id', 'examination', 'student_name', 'total_marks_obtained', 'total_marks_possible', 'percentage', 'cgpa', 'grade', 'rank', 'is_passed']
+    list_display = ['id', 'examination', 'student_name', 'total_marks_obtained', 'total_marks_possible', 'percentage', 'cgpa', 'grade', 'rank', 'section_rank', 'is_passed']
     list_filter = ['examination', 'is_passed', 'grade']
     search_fields = ['student__user__first_name', 'student__user__last_name']
-    readonly_fields = ['total_marks_obtained', 'total_marks_possible', 'percentage', 'cgpa', 'grade', 'rank']
+    readonly_fields = ['total_marks_obtained', 'total_marks_possible', 'percentage', 'cgpa', 'grade', 'rank', 'section_rank']
+    
+    def student_name(self, obj):
+        return obj.student.user.get_full_name() or obj.student.user.username
+    student_name.short_description = 'Student'
+
+
+@admin.register(CombinedStanding)
+class CombinedStandingAdmin(admin.ModelAdmin):
+    list_display = ['id', 'classroom', 'exam_type', 'student_name', 'results_count', 'total_marks_obtained', 'total_marks_possible', 'percentage', 'cgpa', 'grade', 'rank', 'is_passed']
+    list_filter = ['classroom', 'exam_type', 'is_passed', 'grade']
+    search_fields = ['student__user__first_name', 'student__user__last_name']
+    readonly_fields = ['results_count', 'total_marks_obtained', 'total_marks_possible', 'percentage', 'cgpa', 'grade', 'rank', 'is_passed']
     
     def student_name(self, obj):
         return obj.student.user.get_full_name() or obj.student.user.username
     student_name.short_description = 'Student'
+
+
+@admin.register(ExamSubjectStatistics)
+class ExamSubjectStatisticsAdmin(admin.ModelAdmin):
+    list_display = ['id', 'examination', 'subject', 'results_count', 'mean', 'median', 'std_dev', 'min_marks', 'max_marks', 'pass_rate', 'updated_at']
+    list_filter = ['examination', 'subject']
+    readonly_fields = ['results_count', 'mean', 'median', 'std_dev', 'min_marks', 'max_marks', 'passed_count', 'pass_rate', 'grade_distribution', 'updated_at']
@@ -0,0 +1,169 @@
+from decimal import Decimal, ROUND_HALF_UP
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .models import GradingScale, Result
+
+# Default scale (percentage >= min -> grade, GPA), used when a school has none
+DEFAULT_BANDS = [
+    ('A+', 80, 5.00),
+    ('A', 70, 4.00),
+    ('A-', 60, 3.50),
+    ('B', 50, 3.00),
+    ('C', 40, 2.00),
+    ('D', 33, 1.00),
+    ('F', 0, 0.00),
+]
+
+# Added below scales saved without a 0% band, so low marks fail instead of
+# taking the lowest band's grade
+FAIL_BAND = ('F', 0, 0.00)
+
+GRADED_FIELDS = ['total_obtained', 'grade', 'gpa', 'is_passed']
+
+TWO_PLACES = Decimal('0.01')
+
+# school_id -> (expires_at, CompiledScale)
+_scale_cache = {}
+
+
+class CompiledScale:
+    """
+    A grading scale held as sorted NumPy arrays.
+    Grades are looked up with searchsorted over the band boundaries, so a
+    whole exam's marks are graded in one vectorized call.
+    """
+
+    def __init__(self, bands, version=None):
+        bands = sorted(bands, key=lambda band: float(band[1]))
+        if float(bands[0][1]) > 0:
+            bands.insert(0, FAIL_BAND)
+        self.version = version
+        self.grades = np.array([band[0] for band in bands], dtype=object)
+        self.boundaries = np.array([float(band[1]) for band in bands])
+        self.gpas = np.array([float(band[2]) for band in bands])
+        # CGPA -> overall grade uses the band GPAs as thresholds
+        order = np.argsort(self.gpas, kind='stable')
+        self.gpa_boundaries = self.gpas[order]
+        self.gpa_grades = self.grades[order]
+
+    @staticmethod
+    def _lookup(boundaries, values):
+        # Round away float noise such as 79.99999999 for 56/70
+        values = np.round(np.asarray(values, dtype=float), 6)
+        idx = np.searchsorted(boundaries, values, side='right') - 1
+        return np.clip(idx, 0, len(boundaries) - 1)
+
+    def grade_many(self, percentages):
+        """Return (grades, gpas) arrays for an array of percentages"""
+        idx = self._lookup(self.boundaries, percentages)
+        return self.grades[idx], self.gpas[idx]
+
+    def grade(self, percentage):
+        """Return (grade, gpa) for a single percentage"""
+        grades, gpas = self.grade_many([percentage])
+        return grades[0], _to_decimal(gpas[0])
+
+    def overall_grade_many(self, cgpas):
+        """Return overall grades for an array of CGPAs"""
+        return self.gpa_grades[self._lookup(self.gpa_boundaries, cgpas)]
+
+    def overall_grade(self, cgpa):
+        """Return the overall grade for a single CGPA"""
+        return self.overall_grade_many([cgpa])[0]
+
+
+def _to_decimal(value):
+    return Decimal(str(value)).quantize(TWO_PLACES, ROUND_HALF_UP)
+
+
+DEFAULT_SCALE = CompiledScale(DEFAULT_BANDS)
+
+
+def _load_scale(school_id):
+    scale = (
+        GradingScale.objects.filter(school_id=school_id, is_active=True)
+        .order_by('-version')
+        .prefetch_related('bands')
+        .first()
+    )
+    if scale is None:
+        return DEFAULT_SCALE
+    bands = [(b.grade, b.min_percentage, b.gpa) for b in scale.bands.all()]
+    if not bands:
+        return DEFAULT_SCALE
+    return CompiledScale(bands, version=scale.version)
+
+
+def get_grading_scale(school_id):
+    """
+    Return the active CompiledScale for a school.
+    Scales are cached in memory for GRADING_SCALE_CACHE_SECONDS and dropped
+    as soon as a scale or band of that school changes in this process.
+    """
+    now = time.monotonic()
+    cached = _scale_cache.get(school_id)
+    if cached and cached[0] > now:
+        return cached[1]
+    scale = _load_scale(school_id)
+    ttl = getattr(settings, 'GRADING_SCALE_CACHE_SECONDS', 300)
+    _scale_cache[school_id] = (now + ttl, scale)
+    return scale
+
+
+def invalidate_grading_scale(school_id=None):
+    """Drop the cached scale of one school, or of all schools"""
+    if school_id is None:
+        _scale_cache.clear()
+    else:
+        _scale_cache.pop(school_id, None)
+
+
+def grade_results(results, examination, scale=None):
+    """
+    Fill total_obtained, grade, gpa and is_passed on Result instances of one
+    examination in a single vectorized pass. Nothing is saved.
+    """
+    if not results:
+        return results
+    scale = scale or get_grading_scale(examination.school_id)
+
+    totals = [
+        sum((Decimal(str(m or 0)) for m in (r.written_marks, r.mcq_marks, r.practical_marks)), Decimal('0'))
+        for r in results
+    ]
+    if examination.total_marks > 0:
+        percentages = np.array([float(t) for t in totals]) / examination.total_marks * 100
+    else:
+        percentages = np.zeros(len(results))
+    grades, gpas = scale.grade_many(percentages)
+
+    for result, total, grade, gpa in zip(results, totals, grades, gpas):
+        result.total_obtained = total
+        result.grade = grade
+        result.gpa = _to_decimal(gpa)
+        result.is_passed = total >= examination.pass_marks
+    return results
+
+
+def regrade_examination(examination):
+    """
+    Re-grade every Result of an examination (e.g. after a total_marks or
+    grading scale correction) with one vectorized pass and a bulk_update,
+    then recalculate the affected overall results and statistics.
+    Returns the row count.
+    """
+    from .recalculation import recalculate_for_results
+
+    results = list(
+        Result.objects.filter(examination=examination)
+        .only('id', 'student_id', 'written_marks', 'mcq_marks', 'practical_marks')
+    )
+    if not results:
+        return 0
+    grade_results(results, examination)
+    Result.objects.bulk_update(results, GRADED_FIELDS, batch_size=500)
+    recalculate_for_results({(examination.id, r.student_id, None) for r in results})
+    return len(results)
@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from results.models import Examination
+from results.report_cards import generate_report_cards, REPORT_CARD_FORMATS
+
+
+class Command(BaseCommand):
+    help = "Render the report cards of an examination to a merged PDF or a zip of PDFs under MEDIA_ROOT"
+
+    def add_arguments(self, parser):
+        parser.add_argument('examination', type=int, help='Examination id')
+        parser.add_argument('--format', dest='file_format', choices=REPORT_CARD_FORMATS, default='pdf')
+        parser.add_argument('--section', type=int, help='Only students of this section')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: every core)')
+        parser.add_argument('--attendance-start', type=date.fromisoformat, help='YYYY-MM-DD (default: 1 January of the exam year)')
+        parser.add_argument('--attendance-end', type=date.fromisoformat, help='YYYY-MM-DD (default: exam date)')
+
+    def handle(self, *args, **options):
+        try:
+            examination = Examination.objects.select_related('school', 'classroom').get(pk=options['examination'])
+        except Examination.DoesNotExist:
+            raise CommandError(f"Examination {options['examination']} does not exist")
+
+        path, count = generate_report_cards(
+            examination,
+            file_format=options['file_format'],
+            workers=options.get('workers'),
+            section=options.get('section'),
+            attendance_start=options.get('attendance_start'),
+            attendance_end=options.get('attendance_end'),
+        )
+        if not count:
+            raise CommandError(f"Examination {examination.id} has no results")
+        self.stdout.write(self.style.SUCCESS(f"Rendered {count} report cards to {path}"))
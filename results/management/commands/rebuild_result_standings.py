@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from results.models import Examination, Result
+from results.recalculation import recalculate_overall_results, refresh_combined_standings
+from results.stats import refresh_subject_statistics
+
+
+class Command(BaseCommand):
+    help = "Rebuild overall results, ranks, combined exam-type standings and subject statistics from existing Results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only rebuild this school')
+        parser.add_argument('--classroom', type=int, help='Only rebuild this classroom')
+
+    def handle(self, *args, **options):
+        examinations = Examination.objects.all()
+        if options.get('school'):
+            examinations = examinations.filter(school_id=options['school'])
+        if options.get('classroom'):
+            examinations = examinations.filter(classroom_id=options['classroom'])
+
+        pairs = set(
+            Result.objects.filter(examination__in=examinations)
+            .values_list('examination_id', 'student_id')
+            .distinct()
+            .order_by()
+        )
+        recalculate_overall_results(pairs)
+
+        # Also drops standings of classrooms/types that no longer have results
+        keys = set(examinations.values_list('classroom_id', 'exam_type').distinct().order_by())
+        refresh_combined_standings({key: None for key in keys})
+
+        exam_ids = list(examinations.values_list('id', flat=True))
+        refresh_subject_statistics({exam_id: None for exam_id in exam_ids})
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(pairs)} overall results, {len(keys)} combined standings "
+            f"and subject statistics of {len(exam_ids)} examinations"
+        ))
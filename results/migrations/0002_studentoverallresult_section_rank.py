@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentoverallresult',
+            name='section_rank',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
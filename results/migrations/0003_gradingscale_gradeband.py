@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0003_remove_school_cover_remove_school_slug_and_more'),
+        ('results', '0002_studentoverallresult_section_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingScale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='Default', max_length=100)),
+                ('version', models.PositiveIntegerField(editable=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grading_scales', to='schools.school')),
+            ],
+            options={
+                'ordering': ['school', '-version'],
+                'unique_together': {('school', 'version')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GradeBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.CharField(max_length=5)),
+                ('min_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('gpa', models.DecimalField(decimal_places=2, max_digits=3)),
+                ('scale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='results.gradingscale')),
+            ],
+            options={
+                'ordering': ['scale', '-min_percentage'],
+                'unique_together': {('scale', 'min_percentage')},
+            },
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:02
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+TWO_PLACES = Decimal('0.01')
+
+# (grade, GPA) of the default scale as of this migration, for schools without one
+DEFAULT_GPA_BANDS = [('F', 0), ('D', 1), ('C', 2), ('B', 3), ('A-', 3.5), ('A', 4), ('A+', 5)]
+
+
+def overall_grade(gpa_bands, cgpa):
+    """Grade of the highest band GPA a CGPA reaches; bands sorted by GPA"""
+    grade = gpa_bands[0][0]
+    for band_grade, gpa in gpa_bands:
+        if round(float(cgpa), 6) >= float(gpa):
+            grade = band_grade
+    return grade
+
+
+def build_combined_standings(apps, schema_editor):
+    """
+    Build and rank the standings of results entered before this migration.
+    Ties get consecutive (ordinal) ranks, the default RESULT_RANK_METHOD;
+    rebuild_result_standings re-ranks them with another configured method.
+    """
+    Result = apps.get_model('results', 'Result')
+    GradingScale = apps.get_model('results', 'GradingScale')
+    CombinedStanding = apps.get_model('results', 'CombinedStanding')
+
+    # Highest active version per school, as get_grading_scale() picks it
+    scales = {}
+    for scale in GradingScale.objects.filter(is_active=True).order_by('school_id', '-version').prefetch_related('bands'):
+        if scale.school_id not in scales:
+            bands = sorted(((b.grade, b.gpa) for b in scale.bands.all()), key=lambda band: band[1])
+            scales[scale.school_id] = bands or DEFAULT_GPA_BANDS
+
+    aggregates = (
+        Result.objects
+        .values('examination__classroom__school_id', 'examination__classroom_id', 'examination__exam_type', 'student_id')
+        .annotate(
+            results_count=Count('id'),
+            obtained=Sum('total_obtained'),
+            possible=Sum('examination__total_marks'),
+            gpa_sum=Sum('gpa'),
+            failed=Count('id', filter=Q(is_passed=False)),
+        )
+        .order_by()
+    )
+    standings = []
+    for row in aggregates:
+        count = row['results_count']
+        obtained = Decimal(row['obtained'] or 0)
+        possible = Decimal(row['possible'] or 0)
+        percentage = (obtained / possible * 100) if possible > 0 else Decimal('0')
+        cgpa = Decimal(row['gpa_sum'] or 0) / count
+        gpa_bands = scales.get(row['examination__classroom__school_id'], DEFAULT_GPA_BANDS)
+        standings.append(CombinedStanding(
+            classroom_id=row['examination__classroom_id'],
+            exam_type=row['examination__exam_type'],
+            student_id=row['student_id'],
+            results_count=count,
+            total_marks_obtained=obtained.quantize(TWO_PLACES, ROUND_HALF_UP),
+            total_marks_possible=possible.quantize(TWO_PLACES, ROUND_HALF_UP),
+            percentage=percentage.quantize(TWO_PLACES, ROUND_HALF_UP),
+            cgpa=cgpa.quantize(TWO_PLACES, ROUND_HALF_UP),
+            grade=overall_grade(gpa_bands, cgpa),
+            is_passed=row['failed'] == 0,
+        ))
+
+    standings.sort(key=lambda s: (s.classroom_id, s.exam_type, -s.cgpa, -s.percentage, s.student_id))
+    positions = {}
+    for standing in standings:
+        key = (standing.classroom_id, standing.exam_type)
+        positions[key] = standing.rank = positions.get(key, 0) + 1
+    CombinedStanding.objects.bulk_create(standings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0007_alter_teacherassignment_teacher'),
+        ('results', '0003_gradingscale_gradeband'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CombinedStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exam_type', models.CharField(choices=[('half_yearly', 'Half Yearly'), ('annual', 'Annual'), ('test', 'Class Test'), ('terminal', 'Terminal'), ('model', 'Model Test')], max_length=20)),
+                ('results_count', models.PositiveIntegerField(default=0)),
+                ('total_marks_obtained', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('total_marks_possible', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('cgpa', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('grade', models.CharField(blank=True, max_length=5)),
+                ('rank', models.IntegerField(blank=True, null=True)),
+                ('is_passed', models.BooleanField(default=False)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='combined_standings', to='academics.classroom')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='combined_standings', to='academics.studentprofile')),
+            ],
+            options={
+                'ordering': ['classroom', 'exam_type', 'rank'],
+                'indexes': [models.Index(fields=['classroom', 'exam_type', 'rank'], name='results_com_classro_8775b7_idx')],
+                'unique_together': {('classroom', 'exam_type', 'student')},
+            },
+        ),
+        migrations.RunPython(build_combined_standings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:05
+
+from collections import Counter
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import groupby
+import statistics
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TWO_PLACES = Decimal('0.01')
+
+
+def _dec(value):
+    return Decimal(str(round(float(value), 2))).quantize(TWO_PLACES, ROUND_HALF_UP)
+
+
+def build_subject_statistics(apps, schema_editor):
+    """Compute the statistics of results entered before this migration"""
+    Result = apps.get_model('results', 'Result')
+    ExamSubjectStatistics = apps.get_model('results', 'ExamSubjectStatistics')
+    rows = (
+        Result.objects.order_by('examination_id', 'subject_id')
+        .values_list('examination_id', 'subject_id', 'total_obtained', 'grade', 'is_passed')
+        .iterator(chunk_size=2000)
+    )
+    statistics_rows = []
+    for (exam_id, subject_id), group in groupby(rows, key=lambda row: (row[0], row[1])):
+        group = list(group)
+        marks = [float(row[2]) for row in group]
+        passed_count = sum(1 for row in group if row[4])
+        grades = Counter(str(row[3]) for row in group)
+        statistics_rows.append(ExamSubjectStatistics(
+            examination_id=exam_id,
+            subject_id=subject_id,
+            results_count=len(group),
+            mean=_dec(statistics.fmean(marks)),
+            median=_dec(statistics.median(marks)),
+            std_dev=_dec(statistics.pstdev(marks)),
+            min_marks=_dec(min(marks)),
+            max_marks=_dec(max(marks)),
+            passed_count=passed_count,
+            pass_rate=_dec(passed_count / len(group) * 100),
+            grade_distribution={grade: grades[grade] for grade in sorted(grades)},
+        ))
+    ExamSubjectStatistics.objects.bulk_create(statistics_rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0007_alter_teacherassignment_teacher'),
+        ('results', '0004_combinedstanding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSubjectStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('results_count', models.PositiveIntegerField(default=0)),
+                ('mean', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('median', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('std_dev', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('min_marks', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('max_marks', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('pass_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('grade_distribution', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('examination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_statistics', to='results.examination')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_statistics', to='academics.subject')),
+            ],
+            options={
+                'verbose_name_plural': 'Exam subject statistics',
+                'ordering': ['examination', 'subject'],
+                'unique_together': {('examination', 'subject')},
+            },
+        ),
+        migrations.RunPython(build_subject_statistics, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from schools.models import School
 from academics.models import ClassRoom, Section, Subject, StudentProfile
@@ -36,6 +36,47 @@ class Examination(models.Model):
         return f"{self.name} - {self.classroom.name}"
 
 
+class GradingScale(models.Model):
+    """Versioned percentage to grade/GPA scale for a school"""
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='grading_scales')
+    name = models.CharField(max_length=100, default='Default')
+    version = models.PositiveIntegerField(editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('school', 'version')
+        ordering = ['school', '-version']
+    
+    def save(self, *args, **kwargs):
+        # Each new scale becomes the next version for its school; the school
+        # row stays locked until it is saved, so concurrent edits queue up
+        with transaction.atomic():
+            if self.version is None:
+                list(School.objects.select_for_update().filter(pk=self.school_id).values_list('pk'))
+                latest = GradingScale.objects.filter(school_id=self.school_id).aggregate(v=models.Max('version'))['v']
+                self.version = (latest or 0) + 1
+            super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.school.name} - {self.name} (v{self.version})"
+
+
+class GradeBand(models.Model):
+    """One row of a grading scale: percentages >= min_percentage get this grade"""
+    scale = models.ForeignKey(GradingScale, on_delete=models.CASCADE, related_name='bands')
+    grade = models.CharField(max_length=5)
+    min_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    gpa = models.DecimalField(max_digits=3, decimal_places=2)
+    
+    class Meta:
+        unique_together = ('scale', 'min_percentage')
+        ordering = ['scale', '-min_percentage']
+    
+    def __str__(self):
+        return f"{self.grade} ({self.min_percentage}%+) - {self.gpa}"
+
+
 class Result(models.Model):
     """Individual student result for a subject in an exam"""
     GRADE_CHOICES = [
@@ -75,35 +116,9 @@ class Result(models.Model):
         ]
     
     def save(self, *args, **kwargs):
-        # Auto-calculate total
-        self.total_obtained = self.written_marks + self.mcq_marks + self.practical_marks
-        
-        # Auto-calculate grade and GPA
-        percentage = (self.total_obtained / self.examination.total_marks) * 100 if self.examination.total_marks > 0 else 0
-        
-        if percentage >= 80:
-            self.grade = 'A+'
-            self.gpa = 5.00
-        elif percentage >= 70:
-            self.grade = 'A'
-            self.gpa = 4.00
-        elif percentage >= 60:
-            self.grade = 'A-'
-            self.gpa = 3.50
-        elif percentage >= 50:
-            self.grade = 'B'
-            self.gpa = 3.00
-        elif percentage >= 40:
-            self.grade = 'C'
-            self.gpa = 2.00
-        elif percentage >= 33:
-            self.grade = 'D'
-            self.gpa = 1.00
-        else:
-            self.grade = 'F'
-            self.gpa = 0.00
-        
-        self.is_passed = self.total_obtained >= self.examination.pass_marks
+        # Auto-calculate total, grade and GPA from the school's grading scale
+        from .grading import grade_results
+        grade_results([self], self.examination)
         
         super().save(*args, **kwargs)
     
@@ -123,6 +138,7 @@ class StudentOverallResult(models.Model):
     grade = models.CharField(max_length=5, blank=True)
     
     rank = models.IntegerField(null=True, blank=True)
+    section_rank = models.IntegerField(null=True, blank=True)
     is_passed = models.BooleanField(default=False)
     
     class Meta:
@@ -134,3 +150,62 @@ class StudentOverallResult(models.Model):
     
     def __str__(self):
         return f"{self.student.user.get_full_name()} - CGPA: {self.cgpa}"
+
+
+class CombinedStanding(models.Model):
+    """
+    A student's combined result across all examinations of one type in a classroom.
+    Kept up to date by the result recalculation path.
+    """
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE, related_name='combined_standings')
+    exam_type = models.CharField(max_length=20, choices=Examination.EXAM_TYPES)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='combined_standings')
+    
+    results_count = models.PositiveIntegerField(default=0)
+    total_marks_obtained = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    total_marks_possible = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    cgpa = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    grade = models.CharField(max_length=5, blank=True)
+    
+    rank = models.IntegerField(null=True, blank=True)
+    is_passed = models.BooleanField(default=False)
+    
+    class Meta:
+        unique_together = ('classroom', 'exam_type', 'student')
+        ordering = ['classroom', 'exam_type', 'rank']
+        indexes = [
+            models.Index(fields=['classroom', 'exam_type', 'rank']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student.user.get_full_name()} - {self.get_exam_type_display()} - CGPA: {self.cgpa}"
+
+
+class ExamSubjectStatistics(models.Model):
+    """
+    Precomputed marks statistics of one subject in an examination.
+    Kept up to date by the result recalculation path.
+    """
+    examination = models.ForeignKey(Examination, on_delete=models.CASCADE, related_name='subject_statistics')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='exam_statistics')
+    
+    results_count = models.PositiveIntegerField(default=0)
+    mean = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    median = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    std_dev = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    min_marks = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    max_marks = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    pass_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    grade_distribution = models.JSONField(default=dict, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('examination', 'subject')
+        ordering = ['examination', 'subject']
+        verbose_name_plural = 'Exam subject statistics'
+    
+    def __str__(self):
+        return f"{self.examination.name} - {self.subject.name} - mean {self.mean}"
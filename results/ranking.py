@@ -0,0 +1,155 @@
+from functools import reduce
+import operator
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from academics.models import StudentProfile
+from .models import StudentOverallResult, CombinedStanding
+
+# Tie handling -> SQL window function
+RANK_METHODS = {
+    'competition': 'RANK',       # 1, 2, 2, 4
+    'dense': 'DENSE_RANK',       # 1, 2, 2, 3
+    'ordinal': 'ROW_NUMBER',     # 1, 2, 3, 4
+}
+
+
+def get_rank_method(method=None):
+    """Resolve the tie handling method, defaulting to settings.RESULT_RANK_METHOD"""
+    method = method or getattr(settings, 'RESULT_RANK_METHOD', 'ordinal')
+    if method not in RANK_METHODS:
+        raise ValueError(f"Unknown rank method '{method}'. Use one of: {', '.join(RANK_METHODS)}")
+    return method
+
+
+def supports_window_update():
+    """Whether ranks can be written with one UPDATE ... FROM (window subquery)"""
+    if not connection.features.supports_over_clause:
+        return False
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 33, 0)
+    return False
+
+
+def rank_examinations(examination_ids, method=None):
+    """
+    Assign class (examination-wide) and section ranks to every
+    StudentOverallResult of the given examinations.
+    Ranks are based on CGPA, then percentage (higher is better).
+    """
+    examination_ids = sorted({int(getattr(e, 'pk', e)) for e in examination_ids})
+    if not examination_ids:
+        return
+    method = get_rank_method(method)
+
+    if supports_window_update():
+        _rank_with_window(examination_ids, method)
+    else:
+        _rank_in_python(examination_ids, method)
+
+
+def _rank_with_window(examination_ids, method):
+    """Rank all examinations with a single UPDATE statement"""
+    qn = connection.ops.quote_name
+    overall_table = qn(StudentOverallResult._meta.db_table)
+    student_table = qn(StudentProfile._meta.db_table)
+    func = RANK_METHODS[method]
+    # ROW_NUMBER needs a deterministic tie-breaker
+    order_by = 'o.cgpa DESC, o.percentage DESC'
+    if method == 'ordinal':
+        order_by += ', o.student_id'
+    placeholders = ', '.join(['%s'] * len(examination_ids))
+
+    sql = f"""
+        UPDATE {overall_table}
+        SET {qn('rank')} = ranked.class_rank, {qn('section_rank')} = ranked.section_rank
+        FROM (
+            SELECT o.id AS id,
+                   {func}() OVER (PARTITION BY o.examination_id ORDER BY {order_by}) AS class_rank,
+                   {func}() OVER (PARTITION BY o.examination_id, s.section_id ORDER BY {order_by}) AS section_rank
+            FROM {overall_table} o
+            INNER JOIN {student_table} s ON s.id = o.student_id
+            WHERE o.examination_id IN ({placeholders})
+        ) ranked
+        WHERE {overall_table}.id = ranked.id
+          AND ({overall_table}.{qn('rank')} IS NULL
+               OR {overall_table}.{qn('rank')} <> ranked.class_rank
+               OR {overall_table}.{qn('section_rank')} IS NULL
+               OR {overall_table}.{qn('section_rank')} <> ranked.section_rank)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, examination_ids)
+
+
+class RankCounter:
+    """Assigns ranks to rows fed in score order, one sequence per partition key"""
+
+    def __init__(self, method):
+        self.method = method
+        # partition key -> (position, last score, last rank)
+        self.state = {}
+
+    def next(self, key, score):
+        position, last_score, last_rank = self.state.get(key, (0, None, 0))
+        position += 1
+        if self.method != 'ordinal' and score == last_score:
+            rank = last_rank
+        elif self.method == 'dense':
+            rank = last_rank + 1
+        else:
+            rank = position
+        self.state[key] = (position, score, rank)
+        return rank
+
+
+def _rank_in_python(examination_ids, method):
+    """Fallback for databases without window functions or UPDATE ... FROM"""
+    rows = (
+        StudentOverallResult.objects.filter(examination_id__in=examination_ids)
+        .order_by('examination_id', '-cgpa', '-percentage', 'student_id')
+        .values_list('id', 'examination_id', 'student__section_id', 'cgpa', 'percentage', 'rank', 'section_rank')
+    )
+
+    counter = RankCounter(method)
+    changed = []
+    for overall_id, exam_id, section_id, cgpa, percentage, old_rank, old_section_rank in rows:
+        score = (cgpa, percentage)
+        rank = counter.next((exam_id,), score)
+        section_rank = counter.next((exam_id, section_id), score)
+        if old_rank != rank or old_section_rank != section_rank:
+            changed.append(StudentOverallResult(id=overall_id, rank=rank, section_rank=section_rank))
+
+    if changed:
+        StudentOverallResult.objects.bulk_update(changed, ['rank', 'section_rank'], batch_size=500)
+
+
+def rank_combined_standings(keys, method=None):
+    """
+    Rank CombinedStanding rows within each given (classroom, exam_type).
+    Ranks are based on CGPA, then percentage (higher is better).
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    counter = RankCounter(get_rank_method(method))
+
+    rows = (
+        CombinedStanding.objects.filter(reduce(operator.or_, (
+            Q(classroom_id=classroom_id, exam_type=exam_type) for classroom_id, exam_type in keys
+        )))
+        .order_by('classroom_id', 'exam_type', '-cgpa', '-percentage', 'student_id')
+        .values_list('id', 'classroom_id', 'exam_type', 'cgpa', 'percentage', 'rank')
+    )
+
+    changed = []
+    for standing_id, classroom_id, exam_type, cgpa, percentage, old_rank in rows:
+        rank = counter.next((classroom_id, exam_type), (cgpa, percentage))
+        if old_rank != rank:
+            changed.append(CombinedStanding(id=standing_id, rank=rank))
+
+    if changed:
+        CombinedStanding.objects.bulk_update(changed, ['rank'], batch_size=500)
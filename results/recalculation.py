@@ -0,0 +1,297 @@
+from contextlib import ContextDecorator
+from decimal import Decimal, ROUND_HALF_UP
+from functools import reduce
+import operator
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+from academics.models import ClassRoom
+from .models import Examination, Result, StudentOverallResult, CombinedStanding
+from .ranking import rank_examinations, rank_combined_standings
+from .grading import get_grading_scale
+from .stats import refresh_subject_statistics
+
+TWO_PLACES = Decimal('0.01')
+
+_deferred = threading.local()
+
+OVERALL_FIELDS = [
+    'total_marks_obtained', 'total_marks_possible', 'percentage',
+    'cgpa', 'grade', 'is_passed',
+]
+
+STANDING_FIELDS = ['results_count'] + OVERALL_FIELDS
+
+
+def _normalize_pairs(pairs):
+    """Turn (examination, student) pairs of instances or ids into {exam_id: {student_id}}"""
+    grouped = {}
+    for examination, student in pairs:
+        exam_id = getattr(examination, 'pk', examination)
+        student_id = getattr(student, 'pk', student)
+        if exam_id is None or student_id is None:
+            continue
+        grouped.setdefault(int(exam_id), set()).add(int(student_id))
+    return grouped
+
+
+def _pairs_filter(grouped):
+    """Build one Q matching exactly the given (examination, student) pairs"""
+    return reduce(operator.or_, (
+        Q(examination_id=exam_id, student_id__in=student_ids)
+        for exam_id, student_ids in grouped.items()
+    ))
+
+
+def recalculate_overall_results(pairs):
+    """
+    Recalculate StudentOverallResult for a set of (examination, student) pairs.
+
+    Subject totals, GPA sums and failures are aggregated in one grouped query,
+    overall rows are written with a single bulk_create/bulk_update, and every
+    affected examination is re-ranked once. Pairs without any Result lose
+    their overall row.
+    """
+    grouped = _normalize_pairs(pairs)
+    if not grouped:
+        return
+
+    pair_filter = _pairs_filter(grouped)
+    exam_info = {
+        exam_id: (total_marks, get_grading_scale(school_id), (classroom_id, exam_type))
+        for exam_id, total_marks, school_id, classroom_id, exam_type in
+        Examination.objects.filter(id__in=grouped).values_list(
+            'id', 'total_marks', 'school_id', 'classroom_id', 'exam_type'
+        )
+    }
+
+    aggregates = (
+        Result.objects.filter(pair_filter)
+        .values('examination_id', 'student_id')
+        .annotate(
+            subjects=Count('id'),
+            obtained=Sum('total_obtained'),
+            gpa_sum=Sum('gpa'),
+            failed=Count('id', filter=Q(is_passed=False)),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        existing = {
+            (o.examination_id, o.student_id): o
+            for o in StudentOverallResult.objects.filter(pair_filter)
+        }
+
+        to_create = []
+        to_update = []
+        seen = set()
+        for row in aggregates:
+            key = (row['examination_id'], row['student_id'])
+            seen.add(key)
+
+            total_marks, scale, _ = exam_info[key[0]]
+            subjects = row['subjects']
+            obtained = Decimal(row['obtained'] or 0)
+            possible = Decimal(total_marks * subjects)
+            percentage = (obtained / possible * 100) if possible > 0 else Decimal('0')
+            cgpa = Decimal(row['gpa_sum'] or 0) / subjects
+
+            values = {
+                'total_marks_obtained': obtained.quantize(TWO_PLACES, ROUND_HALF_UP),
+                'total_marks_possible': possible.quantize(TWO_PLACES, ROUND_HALF_UP),
+                'percentage': percentage.quantize(TWO_PLACES, ROUND_HALF_UP),
+                'cgpa': cgpa.quantize(TWO_PLACES, ROUND_HALF_UP),
+                'grade': scale.overall_grade(cgpa),
+                # All subjects must be passed
+                'is_passed': row['failed'] == 0,
+            }
+
+            overall = existing.get(key)
+            if overall is None:
+                to_create.append(StudentOverallResult(
+                    examination_id=key[0], student_id=key[1], **values
+                ))
+            elif any(getattr(overall, f) != v for f, v in values.items()):
+                for field, value in values.items():
+                    setattr(overall, field, value)
+                to_update.append(overall)
+
+        stale = [o.id for key, o in existing.items() if key not in seen]
+        if stale:
+            StudentOverallResult.objects.filter(id__in=stale).delete()
+        if to_create:
+            StudentOverallResult.objects.bulk_create(to_create)
+        if to_update:
+            StudentOverallResult.objects.bulk_update(to_update, OVERALL_FIELDS)
+
+        rank_examinations(grouped.keys())
+
+        # Combined (per exam type) standings of the same students
+        standings = {}
+        for exam_id, student_ids in grouped.items():
+            if exam_id in exam_info:
+                standings.setdefault(exam_info[exam_id][2], set()).update(student_ids)
+        refresh_combined_standings(standings)
+
+
+def refresh_combined_standings(targets):
+    """
+    Refresh CombinedStanding rows.
+
+    targets maps (classroom_id, exam_type) to a set of student ids, or to
+    None to rebuild every student of that classroom and exam type. Totals
+    come from one GROUP BY over the matching Results; each touched
+    (classroom, exam_type) is then re-ranked.
+    """
+    if not targets:
+        return
+
+    def key_filter(prefix=''):
+        return reduce(operator.or_, (
+            Q(**{f'{prefix}classroom_id': classroom_id, f'{prefix}exam_type': exam_type},
+              **({'student_id__in': student_ids} if student_ids is not None else {}))
+            for (classroom_id, exam_type), student_ids in targets.items()
+        ))
+
+    schools = dict(
+        ClassRoom.objects.filter(id__in={classroom_id for classroom_id, _ in targets})
+        .values_list('id', 'school_id')
+    )
+    aggregates = (
+        Result.objects.filter(key_filter('examination__'))
+        .values('examination__classroom_id', 'examination__exam_type', 'student_id')
+        .annotate(
+            results_count=Count('id'),
+            obtained=Sum('total_obtained'),
+            possible=Sum('examination__total_marks'),
+            gpa_sum=Sum('gpa'),
+            failed=Count('id', filter=Q(is_passed=False)),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        existing = {
+            (s.classroom_id, s.exam_type, s.student_id): s
+            for s in CombinedStanding.objects.filter(key_filter())
+        }
+
+        to_create = []
+        to_update = []
+        seen = set()
+        for row in aggregates:
+            key = (row['examination__classroom_id'], row['examination__exam_type'], row['student_id'])
+            seen.add(key)
+
+            count = row['results_count']
+            obtained = Decimal(row['obtained'] or 0)
+            possible = Decimal(row['possible'] or 0)
+            percentage = (obtained / possible * 100) if possible > 0 else Decimal('0')
+            cgpa = Decimal(row['gpa_sum'] or 0) / count
+            scale = get_grading_scale(schools[key[0]])
+
+            values = {
+                'results_count': count,
+                'total_marks_obtained': obtained.quantize(TWO_PLACES, ROUND_HALF_UP),
+                'total_marks_possible': possible.quantize(TWO_PLACES, ROUND_HALF_UP),
+                'percentage': percentage.quantize(TWO_PLACES, ROUND_HALF_UP),
+                'cgpa': cgpa.quantize(TWO_PLACES, ROUND_HALF_UP),
+                'grade': scale.overall_grade(cgpa),
+                'is_passed': row['failed'] == 0,
+            }
+
+            standing = existing.get(key)
+            if standing is None:
+                to_create.append(CombinedStanding(
+                    classroom_id=key[0], exam_type=key[1], student_id=key[2], **values
+                ))
+            elif any(getattr(standing, f) != v for f, v in values.items()):
+                for field, value in values.items():
+                    setattr(standing, field, value)
+                to_update.append(standing)
+
+        stale = [s.id for key, s in existing.items() if key not in seen]
+        if stale:
+            CombinedStanding.objects.filter(id__in=stale).delete()
+        if to_create:
+            CombinedStanding.objects.bulk_create(to_create)
+        if to_update:
+            CombinedStanding.objects.bulk_update(to_update, STANDING_FIELDS)
+
+        rank_combined_standings(targets.keys())
+
+
+def recalculate_for_results(touched):
+    """
+    Recalculate everything derived from a set of (examination, student, subject)
+    triples: overall results, ranks, combined standings and subject statistics.
+    A subject of None refreshes the statistics of every subject of that exam.
+    """
+    # Read twice below, so a generator would leave the second pass empty
+    touched = list(touched)
+    subjects = {}
+    for exam_id, _, subject_id in touched:
+        if subject_id is None or subjects.get(exam_id, set()) is None:
+            subjects[exam_id] = None
+        else:
+            subjects.setdefault(exam_id, set()).add(subject_id)
+
+    with transaction.atomic():
+        recalculate_overall_results((exam_id, student_id) for exam_id, student_id, _ in touched)
+        refresh_subject_statistics(subjects)
+
+
+class DeferredResultRecalculation(ContextDecorator):
+    """
+    Suspend per-row result recalculation while Results are written.
+
+    The Result signal handlers record the touched (examination, student,
+    subject) triples instead of recalculating; the outermost block
+    recalculates them all at once on exit. If the block raises inside a
+    transaction, the recalculation waits for that transaction to commit.
+    """
+
+    def __enter__(self):
+        depth = getattr(_deferred, 'depth', 0)
+        if depth == 0:
+            _deferred.pending = set()
+        _deferred.depth = depth + 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _deferred.depth -= 1
+        if _deferred.depth:
+            return False
+
+        pending, _deferred.pending = _deferred.pending, set()
+        if not pending:
+            return False
+
+        if exc_type is not None and connection.in_atomic_block:
+            transaction.on_commit(lambda: recalculate_for_results(pending))
+        else:
+            recalculate_for_results(pending)
+        return False
+
+
+def deferred_result_recalculation():
+    """Context manager/decorator batching result recalculation"""
+    return DeferredResultRecalculation()
+
+
+def defer_recalculation(examination, student, subject=None):
+    """
+    Record a touched result for the enclosing deferred block.
+    Returns False when no block is active and the caller should recalculate now.
+    """
+    if not getattr(_deferred, 'depth', 0):
+        return False
+    _deferred.pending.add((
+        getattr(examination, 'pk', examination),
+        getattr(student, 'pk', student),
+        getattr(subject, 'pk', subject),
+    ))
+    return True
@@ -0,0 +1,227 @@
+"""
+Report card page layout.
+
+Nothing here touches Django or the database: cards arrive as plain dicts
+(see report_cards.collect_report_cards) so documents can be rendered in
+worker processes. Pages are drawn with fpdf2 in the Noto fonts of fonts/,
+which are embedded (subset) in every PDF. Bangla text falls back to Noto
+Serif Bengali and is shaped with HarfBuzz, so conjuncts and vowel signs
+come out as written.
+"""
+import io
+import os
+
+from fpdf import FPDF
+import pypdfium2
+
+PAGE_WIDTH = 595   # A4 in points
+PAGE_HEIGHT = 842
+MARGIN = 40
+
+# (header, width, align) of the subject table
+SUBJECT_COLUMNS = [
+    ('Subject', 175, 'left'),
+    ('Written', 55, 'right'),
+    ('MCQ', 50, 'right'),
+    ('Practical', 55, 'right'),
+    ('Total', 55, 'right'),
+    ('Grade', 60, 'center'),
+    ('GPA', 65, 'right'),
+]
+
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
+TEXT_FONT = 'NotoSans'
+# Glyphs missing from the text font (Bangla) come from here; no bold cut is
+# bundled, so bold Bangla is set in the regular weight
+FALLBACK_FONT = 'NotoSerifBengali'
+FONT_FILES = [
+    (TEXT_FONT, '', 'NotoSans-Regular.ttf'),
+    (TEXT_FONT, 'B', 'NotoSans-Bold.ttf'),
+    (FALLBACK_FONT, '', 'NotoSerifBengali-Regular.otf'),
+]
+
+ALIGN = {'left': 'L', 'right': 'R', 'center': 'C'}
+
+
+def new_document():
+    """An empty A4 document with the report card fonts and text shaping set up"""
+    pdf = FPDF(unit='pt', format=(PAGE_WIDTH, PAGE_HEIGHT))
+    pdf.set_auto_page_break(False)
+    pdf.set_margin(0)
+    pdf.c_margin = 0
+    for family, style, filename in FONT_FILES:
+        pdf.add_font(family, style, os.path.join(FONT_DIR, filename))
+    pdf.set_fallback_fonts([FALLBACK_FONT], exact_match=False)
+    pdf.set_text_shaping(True)
+    return pdf
+
+
+class PageCanvas:
+    """Draws on the current page of a document, y measured up from the bottom"""
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+
+    def text(self, x, y, value, size=10, bold=False, align='left', width=0):
+        value = '' if value is None else str(value)
+        self.pdf.set_font(TEXT_FONT, 'B' if bold else '', size)
+        # fpdf2 puts the baseline of a cell of height `size` 0.8 * size below its top
+        self.pdf.set_xy(x, PAGE_HEIGHT - y - size * 0.8)
+        self.pdf.cell(width or PAGE_WIDTH - MARGIN - x, size, value, align=ALIGN[align])
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        self.pdf.set_line_width(width)
+        self.pdf.line(x1, PAGE_HEIGHT - y1, x2, PAGE_HEIGHT - y2)
+
+    def rect(self, x, y, w, h, fill=None):
+        top = PAGE_HEIGHT - y - h
+        if fill is not None:
+            self.pdf.set_fill_color(round(fill * 255))
+            self.pdf.rect(x, top, w, h, style='F')
+        else:
+            self.pdf.set_line_width(0.5)
+            self.pdf.rect(x, top, w, h)
+
+
+def _fmt(value):
+    return '-' if value is None or value == '' else str(value)
+
+
+def render_report_card(pdf, card):
+    """Lay out one student's report card on a new page of `pdf`"""
+    pdf.add_page()
+    canvas = PageCanvas(pdf)
+    left = MARGIN
+    right = PAGE_WIDTH - MARGIN
+    content_width = right - left
+    y = PAGE_HEIGHT - MARGIN
+
+    # Header
+    canvas.text(left, y - 18, card['school'], size=18, bold=True, align='center', width=content_width)
+    canvas.text(left, y - 40, card['examination'], size=12, align='center', width=content_width)
+    canvas.text(left, y - 58, 'REPORT CARD', size=11, bold=True, align='center', width=content_width)
+    y -= 72
+    canvas.line(left, y, right, y, width=1)
+
+    # Student details, two columns
+    details = [
+        ('Name', card['name'], 'Class', card['classroom']),
+        ('Roll', card['roll'], 'Section', card['section']),
+        ('Guardian', card['guardian'], 'Exam date', card['exam_date']),
+    ]
+    y -= 20
+    for label_a, value_a, label_b, value_b in details:
+        canvas.text(left, y, f'{label_a}:', bold=True)
+        canvas.text(left + 60, y, _fmt(value_a))
+        canvas.text(left + 300, y, f'{label_b}:', bold=True)
+        canvas.text(left + 370, y, _fmt(value_b))
+        y -= 16
+
+    # Subject table
+    y -= 10
+    row_height = 18
+    canvas.rect(left, y - row_height, content_width, row_height, fill=0.85)
+    x = left
+    for header, width, align in SUBJECT_COLUMNS:
+        canvas.text(x + 4, y - 13, header, bold=True, align=align, width=width - 8)
+        x += width
+    y -= row_height
+
+    for subject in card['subjects']:
+        values = [
+            subject['name'], subject['written'], subject['mcq'], subject['practical'],
+            subject['total'], subject['grade'], subject['gpa'],
+        ]
+        x = left
+        for value, (_, width, align) in zip(values, SUBJECT_COLUMNS):
+            canvas.text(x + 4, y - 13, _fmt(value), align=align, width=width - 8)
+            x += width
+        canvas.line(left, y - row_height, right, y - row_height, width=0.3)
+        y -= row_height
+    canvas.rect(left, y, content_width, (len(card['subjects']) + 1) * row_height)
+
+    # Summary
+    y -= 30
+    summary = [
+        ('Total marks', f"{_fmt(card['obtained'])} / {_fmt(card['possible'])}"),
+        ('Percentage', f"{_fmt(card['percentage'])}%"),
+        ('GPA', _fmt(card['cgpa'])),
+        ('Overall grade', _fmt(card['grade'])),
+        ('Result', 'Passed' if card['is_passed'] else 'Failed'),
+        ('Class rank', f"{_fmt(card['rank'])} of {card['class_size']}"),
+        ('Section rank', _fmt(card['section_rank'])),
+    ]
+    for label, value in summary:
+        canvas.text(left, y, f'{label}:', bold=True)
+        canvas.text(left + 110, y, value)
+        y -= 16
+
+    # Attendance
+    attendance = card['attendance']
+    y -= 14
+    canvas.text(left, y, 'Attendance', size=12, bold=True)
+    y -= 18
+    if attendance['total']:
+        canvas.text(left, y, (
+            f"Present {attendance['present']} of {attendance['total']} days "
+            f"({attendance['percentage']}%), absent {attendance['absent']}"
+        ))
+    else:
+        canvas.text(left, y, 'No attendance recorded')
+    canvas.text(left, y - 14, f"Period: {attendance['start']} to {attendance['end']}", size=8)
+
+    # Signatures
+    y = MARGIN + 40
+    for i, label in enumerate(['Class Teacher', 'Guardian', 'Head Teacher']):
+        x = left + i * (content_width / 3)
+        canvas.line(x + 10, y, x + content_width / 3 - 10, y)
+        canvas.text(x + 10, y - 14, label, size=9, align='center', width=content_width / 3 - 20)
+
+
+def render_report_cards_pdf(cards, split=False):
+    """
+    Render cards as the pages of one PDF document (bytes), or with split as
+    a list of one-page documents, so fonts are still only subset once.
+    Top-level and DB-free so ProcessPoolExecutor can run it in workers.
+    """
+    pdf = new_document()
+    for card in cards:
+        render_report_card(pdf, card)
+    document = bytes(pdf.output())
+    return split_pdf(document) if split else document
+
+
+def _save(pdf):
+    out = io.BytesIO()
+    pdf.save(out)
+    return out.getvalue()
+
+
+def split_pdf(document):
+    """Split a PDF document (bytes) into one document per page"""
+    source = pypdfium2.PdfDocument(document)
+    try:
+        pages = []
+        for index in range(len(source)):
+            page = pypdfium2.PdfDocument.new()
+            page.import_pages(source, [index])
+            pages.append(_save(page))
+            page.close()
+        return pages
+    finally:
+        source.close()
+
+
+def merge_pdfs(documents):
+    """Concatenate the pages of PDF documents (bytes) into one document"""
+    if len(documents) == 1:
+        return documents[0]
+    merged = pypdfium2.PdfDocument.new()
+    try:
+        for document in documents:
+            source = pypdfium2.PdfDocument(document)
+            merged.import_pages(source)
+            source.close()
+        return _save(merged)
+    finally:
+        merged.close()
@@ -0,0 +1,184 @@
+"""
+Class-wide report card generation.
+
+Marks, overall results and attendance of an examination are read with one
+batched query each, flattened into plain dicts and rendered to PDF documents
+in a ProcessPoolExecutor. The cards are written to MEDIA_ROOT as one merged
+PDF or a zip of per-student PDFs.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+import io
+import os
+import zipfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.text import slugify
+
+from attendance.months import attendance_totals
+from schools.exports import full_name
+from .models import Result, StudentOverallResult
+from .report_card_pdf import render_report_cards_pdf, merge_pdfs
+
+REPORT_CARD_FORMATS = ('pdf', 'zip')
+REPORT_CARD_DIR = 'report_cards'
+
+# Below this many cards starting worker processes costs more than it saves
+PARALLEL_THRESHOLD = 50
+
+
+def _marks(value):
+    return f'{value:.2f}' if value is not None else None
+
+
+def attendance_period(examination, start=None, end=None):
+    """Default attendance period: 1 January of the exam year up to the exam date"""
+    end = end or examination.exam_date or timezone.localdate()
+    start = start or date(end.year, 1, 1)
+    return start, end
+
+
+def collect_report_cards(examination, student_ids=None, section=None,
+                         attendance_start=None, attendance_end=None):
+    """
+    Return one plain dict per student of the examination, ordered by
+    section and roll number. Only students with an overall result are included.
+    """
+    start, end = attendance_period(examination, attendance_start, attendance_end)
+
+    overall = StudentOverallResult.objects.filter(examination=examination)
+    if student_ids is not None:
+        overall = overall.filter(student_id__in=student_ids)
+    if section is not None:
+        overall = overall.filter(student__section_id=getattr(section, 'pk', section))
+    class_size = StudentOverallResult.objects.filter(examination=examination).count()
+
+    students = list(
+        overall.order_by('student__section__name', 'student__roll_number', 'student_id')
+        .values_list(
+            'student_id', 'student__user__first_name', 'student__user__last_name',
+            'student__user__username', 'student__roll_number', 'student__section__name',
+            'student__guardian_name', 'total_marks_obtained', 'total_marks_possible',
+            'percentage', 'cgpa', 'grade', 'is_passed', 'rank', 'section_rank',
+        )
+    )
+    if not students:
+        return []
+    ids = [row[0] for row in students]
+
+    subjects = {}
+    for student_id, name, written, mcq, practical, total, grade, gpa in (
+        Result.objects.filter(examination=examination, student_id__in=ids)
+        .order_by('student_id', 'subject__name')
+        .values_list(
+            'student_id', 'subject__name', 'written_marks', 'mcq_marks',
+            'practical_marks', 'total_obtained', 'grade', 'gpa',
+        )
+    ):
+        subjects.setdefault(student_id, []).append({
+            'name': name,
+            'written': _marks(written),
+            'mcq': _marks(mcq),
+            'practical': _marks(practical),
+            'total': _marks(total),
+            'grade': grade,
+            'gpa': _marks(gpa),
+        })
+
+    # (present, absent) from the monthly attendance bitmaps
+    attendance = attendance_totals(ids, start, end)
+
+    school = examination.school.name
+    exam_name = examination.name
+    classroom = examination.classroom.name
+    exam_date = examination.exam_date.isoformat() if examination.exam_date else None
+
+    cards = []
+    for (student_id, first_name, last_name, username, roll, section_name, guardian,
+         obtained, possible, percentage, cgpa, grade, is_passed, rank, section_rank) in students:
+        present_days, absent_days = attendance.get(student_id, (0, 0))
+        total_days = present_days + absent_days
+        cards.append({
+            'student_id': student_id,
+            'school': school,
+            'examination': exam_name,
+            'classroom': classroom,
+            'section': section_name,
+            'exam_date': exam_date,
+            'name': full_name(first_name, last_name, username),
+            'roll': roll,
+            'guardian': guardian,
+            'subjects': subjects.get(student_id, []),
+            'obtained': _marks(obtained),
+            'possible': _marks(possible),
+            'percentage': _marks(percentage),
+            'cgpa': _marks(cgpa),
+            'grade': grade,
+            'is_passed': is_passed,
+            'rank': rank,
+            'section_rank': section_rank,
+            'class_size': class_size,
+            'attendance': {
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'total': total_days,
+                'present': present_days,
+                'absent': absent_days,
+                'percentage': round(present_days * 100 / total_days, 1) if total_days else 0,
+            },
+        })
+    return cards
+
+
+def render_report_cards(cards, workers=None, per_card=False):
+    """
+    Render cards to PDF documents (bytes), in card order: one per card when
+    per_card, otherwise runs of consecutive cards to be merged. Large
+    batches are spread over a ProcessPoolExecutor (REPORT_CARD_WORKERS
+    processes, default every core), one run of cards per worker.
+    """
+    workers = workers or getattr(settings, 'REPORT_CARD_WORKERS', None) or os.cpu_count() or 1
+    if workers <= 1 or len(cards) < PARALLEL_THRESHOLD:
+        return render_report_cards_pdf(cards, split=True) if per_card else [render_report_cards_pdf(cards)]
+
+    # Each run embeds the fonts once; few large runs keep that and pickling cheap
+    size = -(-len(cards) // workers)
+    runs = [cards[i:i + size] for i in range(0, len(cards), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        documents = list(executor.map(partial(render_report_cards_pdf, split=per_card), runs))
+    return [page for run in documents for page in run] if per_card else documents
+
+
+def generate_report_cards(examination, file_format='pdf', workers=None, **filters):
+    """
+    Render the report cards of an examination and save them under
+    MEDIA_ROOT/report_cards/. Returns (storage path, number of cards), or
+    (None, 0) when the examination has no results.
+    """
+    if file_format not in REPORT_CARD_FORMATS:
+        raise ValueError(f"Unsupported format '{file_format}'. Use one of: {', '.join(REPORT_CARD_FORMATS)}")
+
+    cards = collect_report_cards(examination, **filters)
+    if not cards:
+        return None, 0
+    documents = render_report_cards(cards, workers=workers, per_card=file_format == 'zip')
+
+    if file_format == 'pdf':
+        content = merge_pdfs(documents)
+    else:
+        buffer = io.BytesIO()
+        # PDF streams are already deflated
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for card, document in zip(cards, documents):
+                roll = slugify(card['roll'] or '') or 'na'
+                archive.writestr(f"{roll}-{slugify(card['name'])}-{card['student_id']}.pdf", document)
+        content = buffer.getvalue()
+
+    stamp = timezone.now().strftime('%Y%m%d%H%M%S')
+    name = f"{REPORT_CARD_DIR}/{examination.school_id}/exam-{examination.id}-{slugify(examination.name)}-{stamp}.{file_format}"
+    path = default_storage.save(name, ContentFile(content))
+    return path, len(cards)
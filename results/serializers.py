@@ -1,5 +1,7 @@
 from rest_framework import serializers
-from .models import Examination, Result, StudentOverallResult
+from django.db import transaction
+from .models import Examination, Result, StudentOverallResult, GradingScale, GradeBand, ExamSubjectStatistics
+from .grading import invalidate_grading_scale
 from academics.serializers import StudentProfileSerializer, SubjectSerializer
 
 
@@ -28,4 +30,69 @@ class StudentOverallResultSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = StudentOverallResult
-        fields = ['id', 'examination', 'student', 'total_marks_obtained', 'total_marks_possible', 'percentage', 'cgpa', 'grade', 'rank', 'is_passed']
+        fields = ['id', 'examination', 'student', 'total_marks_obtained', 'total_marks_possible', 'percentage', 'cgpa', 'grade', 'rank', 'section_rank', 'is_passed']
+
+
+class GradeBandSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GradeBand
+        fields = ['id', 'grade', 'min_percentage', 'gpa']
+
+
+class GradingScaleSerializer(serializers.ModelSerializer):
+    bands = GradeBandSerializer(many=True)
+    
+    class Meta:
+        model = GradingScale
+        fields = ['id', 'school', 'name', 'version', 'is_active', 'created_at', 'bands']
+        read_only_fields = ['version', 'created_at']
+    
+    def validate_bands(self, bands):
+        if not bands:
+            raise serializers.ValidationError('At least one band is required.')
+        cutoffs = [b['min_percentage'] for b in bands]
+        if len(set(cutoffs)) != len(cutoffs):
+            raise serializers.ValidationError('Band min_percentage values must be unique.')
+        if min(cutoffs) != 0:
+            raise serializers.ValidationError('A band with min_percentage 0 is required for failing marks.')
+        return bands
+    
+    @transaction.atomic
+    def create(self, validated_data):
+        bands = validated_data.pop('bands')
+        scale = GradingScale.objects.create(**validated_data)
+        GradeBand.objects.bulk_create([GradeBand(scale=scale, **b) for b in bands])
+        invalidate_grading_scale(scale.school_id)
+        return scale
+    
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """
+        New bands are saved as the next version of the school's scale and
+        the edited version is deactivated, so the bands earlier grades were
+        given with stay on record. Other changes are made in place.
+        """
+        bands = validated_data.pop('bands', None)
+        if bands is None:
+            instance = super().update(instance, validated_data)
+            invalidate_grading_scale(instance.school_id)
+            return instance
+
+        GradingScale.objects.filter(pk=instance.pk).update(is_active=False)
+        invalidate_grading_scale(instance.school_id)
+        return self.create({
+            'school': instance.school,
+            'name': instance.name,
+            'is_active': instance.is_active,
+            **validated_data,
+            'bands': bands,
+        })
+
+
+class ExamSubjectStatisticsSerializer(serializers.ModelSerializer):
+    subject_name = serializers.CharField(source='subject.name', read_only=True)
+    examination_name = serializers.CharField(source='examination.name', read_only=True)
+    
+    class Meta:
+        model = ExamSubjectStatistics
+        fields = ['id', 'examination', 'examination_name', 'subject', 'subject_name', 'results_count', 'mean', 'median', 'std_dev', 'min_marks', 'max_marks', 'passed_count', 'pass_rate', 'grade_distribution', 'updated_at']
@@ -1,6 +1,9 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Result, StudentOverallResult
+from .models import Result, GradingScale, GradeBand
+from .recalculation import recalculate_overall_results, recalculate_for_results, defer_recalculation
+from .ranking import rank_examinations
+from .grading import invalidate_grading_scale
 
 
 @receiver(post_save, sender=Result)
@@ -8,8 +11,11 @@ def calculate_overall_result_on_save(sender, instance, created, **kwargs):
     """
     Automatically calculate overall result when a Result is saved.
     This ensures GPA is always up-to-date when results are added or updated.
+    Inside deferred_result_recalculation() the result is only recorded.
     """
-    calculate_student_overall_result(instance.examination, instance.student)
+    if defer_recalculation(instance.examination_id, instance.student_id, instance.subject_id):
+        return
+    recalculate_for_results([(instance.examination_id, instance.student_id, instance.subject_id)])
 
 
 @receiver(post_delete, sender=Result)
@@ -17,71 +23,18 @@ def calculate_overall_result_on_delete(sender, instance, **kwargs):
     """
     Recalculate overall result when a Result is deleted.
     """
-    calculate_student_overall_result(instance.examination, instance.student)
+    if defer_recalculation(instance.examination_id, instance.student_id, instance.subject_id):
+        return
+    recalculate_for_results([(instance.examination_id, instance.student_id, instance.subject_id)])
 
 
 def calculate_student_overall_result(examination, student):
     """
     Calculate and save overall result for a student in an examination.
-    This combines all subject results to calculate CGPA and overall grade.
+    This combines all subject results to calculate CGPA and overall grade,
+    then re-ranks the examination.
     """
-    # Get all results for this student in this examination
-    student_results = Result.objects.filter(
-        examination=examination,
-        student=student
-    )
-    
-    if not student_results.exists():
-        # If no results exist, delete the overall result if it exists
-        StudentOverallResult.objects.filter(
-            examination=examination,
-            student=student
-        ).delete()
-        return
-    
-    # Calculate totals
-    total_obtained = sum(float(r.total_obtained) for r in student_results)
-    total_possible = float(examination.total_marks) * student_results.count()
-    percentage = (total_obtained / total_possible * 100) if total_possible > 0 else 0
-    
-    # Calculate CGPA (average of all subject GPAs)
-    cgpa = sum(float(r.gpa) for r in student_results) / student_results.count()
-    
-    # Determine overall grade based on CGPA
-    if cgpa >= 5.0:
-        grade = 'A+'
-    elif cgpa >= 4.0:
-        grade = 'A'
-    elif cgpa >= 3.5:
-        grade = 'A-'
-    elif cgpa >= 3.0:
-        grade = 'B'
-    elif cgpa >= 2.0:
-        grade = 'C'
-    elif cgpa >= 1.0:
-        grade = 'D'
-    else:
-        grade = 'F'
-    
-    # Check if passed (all subjects must be passed)
-    is_passed = all(r.is_passed for r in student_results)
-    
-    # Create or update overall result
-    overall_result, created = StudentOverallResult.objects.update_or_create(
-        examination=examination,
-        student=student,
-        defaults={
-            'total_marks_obtained': total_obtained,
-            'total_marks_possible': total_possible,
-            'percentage': percentage,
-            'cgpa': cgpa,
-            'grade': grade,
-            'is_passed': is_passed
-        }
-    )
-    
-    # Calculate ranks for all students in this examination
-    calculate_ranks(examination)
+    recalculate_overall_results([(examination, student)])
 
 
 def calculate_ranks(examination):
@@ -89,13 +42,16 @@ def calculate_ranks(examination):
     Calculate and assign ranks to all students in an examination.
     Ranks are based on CGPA (higher is better).
     """
-    # Get all overall results for this examination, ordered by CGPA
-    overall_results = StudentOverallResult.objects.filter(
-        examination=examination
-    ).order_by('-cgpa', '-percentage')
-    
-    # Assign ranks
-    for rank, result in enumerate(overall_results, start=1):
-        if result.rank != rank:
-            result.rank = rank
-            result.save(update_fields=['rank'])
+    rank_examinations([examination])
+
+
+@receiver([post_save, post_delete], sender=GradingScale)
+def invalidate_scale_on_change(sender, instance, **kwargs):
+    """Drop the cached grading scale when a scale changes"""
+    invalidate_grading_scale(instance.school_id)
+
+
+@receiver([post_save, post_delete], sender=GradeBand)
+def invalidate_scale_on_band_change(sender, instance, **kwargs):
+    """Drop cached grading scales when a band changes"""
+    invalidate_grading_scale()
@@ -0,0 +1,111 @@
+from decimal import Decimal, ROUND_HALF_UP
+from functools import reduce
+import operator
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Result, ExamSubjectStatistics
+
+TWO_PLACES = Decimal('0.01')
+
+STAT_FIELDS = [
+    'results_count', 'mean', 'median', 'std_dev', 'min_marks', 'max_marks',
+    'passed_count', 'pass_rate', 'grade_distribution', 'updated_at',
+]
+
+
+def _dec(value):
+    return Decimal(str(round(float(value), 2))).quantize(TWO_PLACES, ROUND_HALF_UP)
+
+
+def compute_subject_statistics(rows):
+    """
+    Reduce (examination_id, subject_id, total_obtained, grade, is_passed)
+    rows, ordered by examination and subject, to
+    {(examination_id, subject_id): field values} with NumPy.
+    """
+    rows = list(rows)
+    computed = {}
+    if not rows:
+        return computed
+
+    keys = np.array([(r[0], r[1]) for r in rows], dtype=np.int64)
+    marks = np.array([float(r[2]) for r in rows])
+    grades = np.array([r[3] for r in rows], dtype=object)
+    passed = np.array([r[4] for r in rows], dtype=bool)
+
+    # Rows are ordered by (examination, subject): split at key changes
+    starts = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+    bounds = zip(np.concatenate(([0], starts)), np.concatenate((starts, [len(rows)])))
+    for start, end in bounds:
+        group = marks[start:end]
+        count = end - start
+        passed_count = int(passed[start:end].sum())
+        labels, counts = np.unique(grades[start:end].astype(str), return_counts=True)
+        computed[tuple(int(k) for k in keys[start])] = {
+            'results_count': count,
+            'mean': _dec(group.mean()),
+            'median': _dec(np.median(group)),
+            'std_dev': _dec(group.std()),
+            'min_marks': _dec(group.min()),
+            'max_marks': _dec(group.max()),
+            'passed_count': passed_count,
+            'pass_rate': _dec(passed_count / count * 100),
+            'grade_distribution': {str(g): int(c) for g, c in zip(labels, counts)},
+        }
+    return computed
+
+
+def refresh_subject_statistics(targets):
+    """
+    Refresh ExamSubjectStatistics rows.
+
+    targets maps an examination id to a set of subject ids, or to None for
+    every subject of that examination. The marks are read with one
+    values_list() query and reduced per subject with NumPy.
+    """
+    targets = {getattr(e, 'pk', e): subjects for e, subjects in targets.items()}
+    if not targets:
+        return
+
+    def key_filter():
+        return reduce(operator.or_, (
+            Q(examination_id=exam_id, **({'subject_id__in': subjects} if subjects is not None else {}))
+            for exam_id, subjects in targets.items()
+        ))
+
+    computed = compute_subject_statistics(
+        Result.objects.filter(key_filter())
+        .order_by('examination_id', 'subject_id')
+        .values_list('examination_id', 'subject_id', 'total_obtained', 'grade', 'is_passed')
+    )
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            (s.examination_id, s.subject_id): s
+            for s in ExamSubjectStatistics.objects.filter(key_filter())
+        }
+
+        to_create = []
+        to_update = []
+        for key, values in computed.items():
+            stat = existing.get(key)
+            if stat is None:
+                to_create.append(ExamSubjectStatistics(examination_id=key[0], subject_id=key[1], **values))
+                continue
+            for field, value in values.items():
+                setattr(stat, field, value)
+            stat.updated_at = now
+            to_update.append(stat)
+
+        stale = [s.id for key, s in existing.items() if key not in computed]
+        if stale:
+            ExamSubjectStatistics.objects.filter(id__in=stale).delete()
+        if to_create:
+            ExamSubjectStatistics.objects.bulk_create(to_create)
+        if to_update:
+            ExamSubjectStatistics.objects.bulk_update(to_update, STAT_FIELDS)
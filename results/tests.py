@@ -0,0 +1,181 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from academics.models import ClassRoom, Section, Subject, StudentProfile
+from schools.models import School
+from . import ranking
+from .grading import CompiledScale
+from .models import Examination, Result, StudentOverallResult, CombinedStanding, ExamSubjectStatistics, GradingScale
+
+
+class BulkResultsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+        cls.classroom = ClassRoom.objects.create(school=cls.school, name='Class 6')
+        section = Section.objects.create(classroom=cls.classroom, name='A')
+        cls.subjects = [Subject.objects.create(school=cls.school, name=name) for name in ('Bangla', 'Math')]
+        cls.students = [
+            StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{i}'),
+                school=cls.school, classroom=cls.classroom, section=section, roll_number=str(i),
+            )
+            for i in range(1, 4)
+        ]
+        cls.examination = Examination.objects.create(
+            school=cls.school, classroom=cls.classroom, name='Annual', exam_type='annual',
+            total_marks=100, pass_marks=33,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def post_results(self, results):
+        return self.client.post(
+            f'/api/results/examinations/{self.examination.id}/bulk_results/',
+            {'results': results}, format='json', secure=True,
+        )
+
+    def test_creates_overall_results_and_ranks(self):
+        marks = {self.students[0]: 90, self.students[1]: 50, self.students[2]: 20}
+        response = self.post_results([
+            {'student_id': student.id, 'subject_id': subject.id, 'written_marks': mark}
+            for student, mark in marks.items()
+            for subject in self.subjects
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 6)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(Result.objects.filter(examination=self.examination).count(), 6)
+
+        overall = {
+            o.student_id: o for o in StudentOverallResult.objects.filter(examination=self.examination)
+        }
+        self.assertEqual(len(overall), 3)
+        self.assertEqual([overall[s.id].rank for s in self.students], [1, 2, 3])
+        self.assertEqual([overall[s.id].section_rank for s in self.students], [1, 2, 3])
+        self.assertEqual(overall[self.students[0].id].total_marks_obtained, 180)
+        self.assertFalse(overall[self.students[2].id].is_passed)
+
+        standings = CombinedStanding.objects.filter(classroom=self.classroom, exam_type='annual')
+        self.assertEqual(
+            sorted(standings.values_list('student_id', 'rank')),
+            [(s.id, rank) for rank, s in enumerate(self.students, 1)],
+        )
+        self.assertEqual(ExamSubjectStatistics.objects.filter(examination=self.examination).count(), 2)
+
+    def test_updated_marks_rerank(self):
+        self.post_results([
+            {'student_id': self.students[0].id, 'subject_id': self.subjects[0].id, 'written_marks': 40},
+            {'student_id': self.students[1].id, 'subject_id': self.subjects[0].id, 'written_marks': 60},
+        ])
+        response = self.post_results([
+            {'student_id': self.students[0].id, 'subject_id': self.subjects[0].id, 'written_marks': 95},
+            {'student_id': 0, 'subject_id': self.subjects[0].id},
+        ])
+
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(len(response.data['errors']), 1)
+        ranks = dict(
+            StudentOverallResult.objects.filter(examination=self.examination).values_list('student_id', 'rank')
+        )
+        self.assertEqual(ranks, {self.students[0].id: 1, self.students[1].id: 2})
+
+
+class GradingScaleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+
+    def post_scale(self, bands):
+        return APIClient().post(
+            '/api/results/grading-scales/', {'school': self.school.id, 'name': 'Scale', 'bands': bands},
+            format='json', secure=True,
+        )
+
+    def test_bands_must_start_at_zero(self):
+        response = self.post_scale([
+            {'grade': 'A', 'min_percentage': 80, 'gpa': 5},
+            {'grade': 'C', 'min_percentage': 40, 'gpa': 2},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bands', response.data)
+        self.assertFalse(GradingScale.objects.exists())
+
+    def test_marks_below_a_scale_without_zero_band_fail(self):
+        scale = CompiledScale([('A', 80, 5.0), ('C', 40, 2.0)])
+
+        grades, gpas = scale.grade_many([10, 40, 95])
+        self.assertEqual(list(grades), ['F', 'C', 'A'])
+        self.assertEqual(list(gpas), [0.0, 2.0, 5.0])
+
+    def test_versions_count_up_per_school(self):
+        bands = [{'grade': 'P', 'min_percentage': 33, 'gpa': 1}, {'grade': 'F', 'min_percentage': 0, 'gpa': 0}]
+        first = self.post_scale(bands).data
+        second = self.post_scale(bands).data
+
+        self.assertEqual((first['version'], second['version']), (1, 2))
+
+
+class RankingTests(TestCase):
+    # (section, cgpa, percentage) in student id order; three students tie on
+    # 4.50 / 80, two of them in section A
+    SCORES = [('A', 5, 90), ('B', 4.5, 80), ('A', 4.5, 80), ('B', 4.5, 70), ('A', 3, 50), ('A', 4.5, 80)]
+    # method -> (class ranks, section ranks) in student id order
+    EXPECTED = {
+        'competition': ([1, 2, 2, 5, 6, 2], [1, 1, 2, 2, 4, 2]),
+        'dense': ([1, 2, 2, 3, 4, 2], [1, 1, 2, 2, 3, 2]),
+        'ordinal': ([1, 2, 3, 5, 6, 4], [1, 1, 2, 2, 4, 3]),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name='School')
+        classroom = ClassRoom.objects.create(school=school, name='Class 6')
+        sections = {name: Section.objects.create(classroom=classroom, name=name) for name in 'AB'}
+        cls.examination = Examination.objects.create(
+            school=school, classroom=classroom, name='Annual', exam_type='annual', total_marks=100, pass_marks=33,
+        )
+        for i, (section, cgpa, percentage) in enumerate(cls.SCORES, start=1):
+            student = StudentProfile.objects.create(
+                user=get_user_model().objects.create(username=f'student{i}'),
+                school=school, classroom=classroom, section=sections[section], roll_number=str(i),
+            )
+            StudentOverallResult.objects.create(
+                examination=cls.examination, student=student, cgpa=cgpa, percentage=percentage,
+            )
+
+    def ranks(self):
+        rows = list(
+            StudentOverallResult.objects.filter(examination=self.examination)
+            .order_by('student_id').values_list('rank', 'section_rank')
+        )
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    def check_methods(self):
+        for method, expected in self.EXPECTED.items():
+            with self.subTest(method=method):
+                StudentOverallResult.objects.update(rank=None, section_rank=None)
+                with self.settings(RESULT_RANK_METHOD=method):
+                    ranking.rank_examinations([self.examination.id])
+                self.assertEqual(self.ranks(), expected)
+
+    def test_window_update(self):
+        if not ranking.supports_window_update():
+            self.skipTest('The database cannot rank with UPDATE ... FROM')
+        self.check_methods()
+
+    def test_python_fallback(self):
+        with mock.patch.object(ranking, 'supports_window_update', return_value=False):
+            self.check_methods()
+
+    def test_unchanged_ranks_are_not_rewritten(self):
+        ranking.rank_examinations([self.examination.id], method='dense')
+        with self.assertNumQueries(1):
+            ranking.rank_examinations([self.examination.id], method='dense')
+        self.assertEqual(self.ranks(), self.EXPECTED['dense'])
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ExaminationViewSet, ResultViewSet, StudentOverallResultViewSet
+from .views import ExaminationViewSet, ResultViewSet, StudentOverallResultViewSet, GradingScaleViewSet, ExamSubjectStatisticsViewSet
 
 router = DefaultRouter()
 router.register('examinations', ExaminationViewSet)
 router.register('results', ResultViewSet)
 router.register('overall', StudentOverallResultViewSet)
+router.register('grading-scales', GradingScaleViewSet)
+router.register('subject-statistics', ExamSubjectStatisticsViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
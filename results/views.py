@@ -3,10 +3,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
-from .models import Examination, Result, StudentOverallResult
-from .serializers import ExaminationSerializer, ResultSerializer, StudentOverallResultSerializer
-import csv
+from decimal import Decimal, InvalidOperation
+from .models import Examination, Result, StudentOverallResult, GradingScale, CombinedStanding, ExamSubjectStatistics
+from .serializers import ExaminationSerializer, ResultSerializer, StudentOverallResultSerializer, GradingScaleSerializer, ExamSubjectStatisticsSerializer
+from .recalculation import recalculate_for_results, refresh_combined_standings
+from .grading import regrade_examination, grade_results, GRADED_FIELDS
+from schools.exports import stream_export, full_name
 
 
 class ExaminationViewSet(viewsets.ModelViewSet):
@@ -17,6 +19,75 @@ class ExaminationViewSet(viewsets.ModelViewSet):
     filterset_fields = ['school', 'classroom', 'section', 'exam_type']
     search_fields = ['name']
     
+    def perform_update(self, serializer):
+        old = serializer.instance
+        old_marks = (old.total_marks, old.pass_marks)
+        old_standing_key = (old.classroom_id, old.exam_type)
+        examination = serializer.save()
+        # Marks changed: every result's grade, GPA and pass flag is stale
+        if (examination.total_marks, examination.pass_marks) != old_marks:
+            regrade_examination(examination)
+        # Moved to another classroom or exam type: both combined standings change
+        new_standing_key = (examination.classroom_id, examination.exam_type)
+        if new_standing_key != old_standing_key:
+            refresh_combined_standings({old_standing_key: None, new_standing_key: None})
+    
+    @action(detail=True, methods=['post'])
+    def report_cards(self, request, pk=None):
+        """
+        Render report cards of every student (or one ?student_section=) to MEDIA_ROOT.
+        ?file_format=pdf gives one merged PDF, zip one PDF per student.
+        """
+        from datetime import date
+        from django.core.files.storage import default_storage
+        from .report_cards import generate_report_cards, REPORT_CARD_FORMATS
+        
+        examination = self.get_object()
+        params = {**request.query_params.dict(), **(request.data if isinstance(request.data, dict) else {})}
+        file_format = (params.get('file_format') or 'pdf').lower()
+        if file_format not in REPORT_CARD_FORMATS:
+            return Response(
+                {"detail": f"Unsupported file_format. Use one of: {', '.join(REPORT_CARD_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            # Not ?section=, which the examination filterset already uses
+            section = int(params['student_section']) if params.get('student_section') else None
+            attendance_start = date.fromisoformat(params['attendance_start']) if params.get('attendance_start') else None
+            attendance_end = date.fromisoformat(params['attendance_end']) if params.get('attendance_end') else None
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "student_section must be an id and attendance_start/attendance_end YYYY-MM-DD dates"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        path, count = generate_report_cards(
+            examination,
+            file_format=file_format,
+            section=section,
+            attendance_start=attendance_start,
+            attendance_end=attendance_end,
+        )
+        if not count:
+            return Response(
+                {"detail": "No results found for this examination"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({
+            'message': f'{count} report cards generated',
+            'count': count,
+            'path': path,
+            'url': request.build_absolute_uri(default_storage.url(path)),
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    def regrade(self, request, pk=None):
+        """Re-grade all results of an examination with the school's current grading scale"""
+        examination = self.get_object()
+        regraded = regrade_examination(examination)
+        return Response({'message': 'Examination re-graded', 'regraded': regraded})
+    
     @action(detail=True, methods=['post'])
     def bulk_results(self, request, pk=None):
         """Create or update results in bulk for an examination"""
@@ -29,93 +100,121 @@ class ExaminationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        created = 0
-        updated = 0
-        errors = []
-        
         from academics.models import StudentProfile, Subject
         from django.db import transaction
         
-        with transaction.atomic():
-            for idx, result_item in enumerate(results_data):
-                try:
-                    student_id = result_item.get('student_id')
-                    subject_id = result_item.get('subject_id')
-                    
-                    if not student_id or not subject_id:
-                        errors.append({
-                            'index': idx,
-                            'error': 'student_id and subject_id are required'
-                        })
-                        continue
-                    
-                    # Validate student belongs to exam class
-                    try:
-                        student = StudentProfile.objects.get(id=student_id)
-                        if student.classroom_id != examination.classroom_id:
-                            errors.append({
-                                'index': idx,
-                                'error': f'Student does not belong to class {examination.classroom.name}'
-                            })
-                            continue
-                    except StudentProfile.DoesNotExist:
-                        errors.append({
-                            'index': idx,
-                            'error': f'Student with id {student_id} not found'
-                        })
-                        continue
-                    
-                    # Get subject
-                    try:
-                        subject = Subject.objects.get(id=subject_id)
-                    except Subject.DoesNotExist:
-                        errors.append({
-                            'index': idx,
-                            'error': f'Subject with id {subject_id} not found'
-                        })
-                        continue
-                    
-                    # Create or update result
-                    result, is_created = Result.objects.update_or_create(
-                        examination=examination,
-                        student=student,
-                        subject=subject,
-                        defaults={
-                            'written_marks': result_item.get('written_marks', 0),
-                            'mcq_marks': result_item.get('mcq_marks', 0),
-                            'practical_marks': result_item.get('practical_marks', 0),
-                            'remarks': result_item.get('remarks', '')
-                        }
-                    )
-                    
-                    if is_created:
-                        created += 1
-                    else:
-                        updated += 1
-                        
-                except Exception as e:
-                    errors.append({
-                        'index': idx,
-                        'error': str(e)
-                    })
+        errors = []
+        
+        # Resolve every student and subject with one IN query each
+        def as_id(value):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return None
+        
+        student_ids = {as_id(item.get('student_id')) for item in results_data if isinstance(item, dict)}
+        subject_ids = {as_id(item.get('subject_id')) for item in results_data if isinstance(item, dict)}
+        student_classes = dict(
+            StudentProfile.objects.filter(id__in=student_ids - {None}).values_list('id', 'classroom_id')
+        )
+        known_subjects = set(
+            Subject.objects.filter(id__in=subject_ids - {None}).values_list('id', flat=True)
+        )
+        
+        # Validate in memory; a later row for the same student/subject wins
+        rows = {}
+        for idx, result_item in enumerate(results_data):
+            if not isinstance(result_item, dict):
+                errors.append({'index': idx, 'error': 'Each result must be an object'})
+                continue
+            
+            student_id = as_id(result_item.get('student_id'))
+            subject_id = as_id(result_item.get('subject_id'))
+            
+            if not student_id or not subject_id:
+                errors.append({
+                    'index': idx,
+                    'error': 'student_id and subject_id are required'
+                })
+                continue
+            
+            if student_id not in student_classes:
+                errors.append({
+                    'index': idx,
+                    'error': f'Student with id {student_id} not found'
+                })
+                continue
             
-            # After saving results, calculate overall results for affected students
-            affected_students = set()
-            for result_item in results_data:
-                student_id = result_item.get('student_id')
-                if student_id:
-                    affected_students.add(student_id)
+            if student_classes[student_id] != examination.classroom_id:
+                errors.append({
+                    'index': idx,
+                    'error': f'Student does not belong to class {examination.classroom.name}'
+                })
+                continue
+            
+            if subject_id not in known_subjects:
+                errors.append({
+                    'index': idx,
+                    'error': f'Subject with id {subject_id} not found'
+                })
+                continue
             
-            # Calculate overall results for each affected student
-            for student_id in affected_students:
-                try:
-                    student = StudentProfile.objects.get(id=student_id)
-                    self._calculate_overall_result(examination, student)
-                except Exception as e:
-                    errors.append({
-                        'student_id': student_id,
-                        'error': f'Failed to calculate overall result: {str(e)}'
-                    })
+            try:
+                marks = {
+                    field: Decimal(str(result_item.get(field) or 0))
+                    for field in ('written_marks', 'mcq_marks', 'practical_marks')
+                }
+            except InvalidOperation:
+                marks = None
+            # Fits DecimalField(max_digits=5, decimal_places=2)
+            if marks is None or not all(m.is_finite() and 0 <= m < 1000 for m in marks.values()):
+                errors.append({
+                    'index': idx,
+                    'error': 'Marks must be numbers between 0 and 999.99'
+                })
+                continue
+            
+            rows[(student_id, subject_id)] = Result(
+                examination=examination,
+                student_id=student_id,
+                subject_id=subject_id,
+                remarks=result_item.get('remarks', '') or '',
+                **marks
+            )
+        
+        if not rows:
+            return Response({
+                'message': 'Bulk result creation completed',
+                'created': 0,
+                'updated': 0,
+                'errors': errors
+            })
+        
+        existing = set(
+            Result.objects.filter(
+                examination=examination,
+                student_id__in={student_id for student_id, _ in rows},
+                subject_id__in={subject_id for _, subject_id in rows}
+            ).values_list('student_id', 'subject_id')
+        )
+        updated = len(existing & rows.keys())
+        created = len(rows) - updated
+        
+        results = list(rows.values())
+        grade_results(results, examination)
+        
+        with transaction.atomic():
+            # One INSERT ... ON CONFLICT DO UPDATE per batch; no per-row signals fire
+            Result.objects.bulk_create(
+                results,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['examination', 'student', 'subject'],
+                update_fields=['written_marks', 'mcq_marks', 'practical_marks', 'remarks'] + GRADED_FIELDS,
+            )
+            recalculate_for_results([
+                (examination.id, student_id, subject_id) for student_id, subject_id in rows
+            ])
         
         return Response({
             'message': 'Bulk result creation completed',
@@ -123,73 +222,23 @@ class ExaminationViewSet(viewsets.ModelViewSet):
             'updated': updated,
             'errors': errors
         })
-    
-    def _calculate_overall_result(self, examination, student):
-        """Calculate and save overall result for a student in an examination"""
-        # Get all results for this student in this examination
-        student_results = Result.objects.filter(
-            examination=examination,
-            student=student
-        )
-        
-        if not student_results.exists():
-            return
-        
-        # Calculate totals
-        total_obtained = sum(r.total_obtained for r in student_results)
-        total_possible = examination.total_marks * student_results.count()
-        percentage = (total_obtained / total_possible * 100) if total_possible > 0 else 0
-        
-        # Calculate CGPA (average of all subject GPAs)
-        cgpa = sum(r.gpa for r in student_results) / student_results.count()
-        
-        # Determine overall grade based on CGPA
-        if cgpa >= 5.0:
-            grade = 'A+'
-        elif cgpa >= 4.0:
-            grade = 'A'
-        elif cgpa >= 3.5:
-            grade = 'A-'
-        elif cgpa >= 3.0:
-            grade = 'B'
-        elif cgpa >= 2.0:
-            grade = 'C'
-        elif cgpa >= 1.0:
-            grade = 'D'
-        else:
-            grade = 'F'
-        
-        # Check if passed (all subjects must be passed)
-        is_passed = all(r.is_passed for r in student_results)
-        
-        # Create or update overall result
-        overall_result, created = StudentOverallResult.objects.update_or_create(
-            examination=examination,
-            student=student,
-            defaults={
-                'total_marks_obtained': total_obtained,
-                'total_marks_possible': total_possible,
-                'percentage': percentage,
-                'cgpa': cgpa,
-                'grade': grade,
-                'is_passed': is_passed
-            }
-        )
-        
-        # Calculate ranks for all students in this examination
-        self._calculate_ranks(examination)
-    
-    def _calculate_ranks(self, examination):
-        """Calculate and assign ranks to all students in an examination"""
-        # Get all overall results for this examination, ordered by CGPA
-        overall_results = StudentOverallResult.objects.filter(
-            examination=examination
-        ).order_by('-cgpa', '-percentage')
-        
-        # Assign ranks
-        for rank, result in enumerate(overall_results, start=1):
-            result.rank = rank
-            result.save(update_fields=['rank'])
+
+
+class GradingScaleViewSet(viewsets.ModelViewSet):
+    queryset = GradingScale.objects.select_related('school').prefetch_related('bands').all()
+    serializer_class = GradingScaleSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['school', 'is_active']
+
+
+class ExamSubjectStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Precomputed per-subject statistics of examinations"""
+    queryset = ExamSubjectStatistics.objects.select_related('examination', 'subject').all()
+    serializer_class = ExamSubjectStatisticsSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['examination', 'subject', 'examination__classroom', 'examination__school']
 
 
 class ResultViewSet(viewsets.ModelViewSet):
@@ -200,39 +249,66 @@ class ResultViewSet(viewsets.ModelViewSet):
     filterset_fields = ['examination', 'student', 'subject', 'grade', 'is_passed']
     search_fields = ['student__user__first_name', 'student__user__last_name', 'student__roll_number']
     
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('view') == 'compact':
+            return self.flat(request)
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
-    def export_csv(self, request):
-        """Export results to CSV"""
-        exam_id = request.query_params.get('examination')
+    def flat(self, request):
+        """Compact flat result rows from a single values() query (also ?view=compact on the list)"""
+        qs = self.filter_queryset(self.get_queryset()).values_list(
+            'id', 'examination_id', 'student_id', 'student__roll_number',
+            'student__user__first_name', 'student__user__last_name', 'student__user__username',
+            'subject_id', 'subject__name', 'written_marks', 'mcq_marks', 'practical_marks',
+            'total_obtained', 'grade', 'gpa', 'is_passed',
+        )
         
+        data = [
+            {
+                'id': row[0],
+                'examination': row[1],
+                'student': row[2],
+                'roll_number': row[3],
+                'student_name': full_name(row[4], row[5], row[6]),
+                'subject': row[7],
+                'subject_name': row[8],
+                'written_marks': str(row[9]),
+                'mcq_marks': str(row[10]),
+                'practical_marks': str(row[11]),
+                'total_obtained': str(row[12]),
+                'grade': row[13],
+                'gpa': str(row[14]),
+                'is_passed': row[15],
+            }
+            for row in qs
+        ]
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def export_csv(self, request):
+        """Export results to CSV (or XLSX with ?file_format=xlsx), streamed"""
         qs = self.filter_queryset(self.get_queryset())
         
-        response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-        response['Content-Disposition'] = 'attachment; filename="results_export.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Serial', 'Roll Number', 'Student Name', 'Subject', 'Written', 'MCQ', 'Practical', 'Total', 'Grade', 'GPA', 'Status'])
-        
-        for idx, result in enumerate(qs, start=1):
-            student = result.student
-            student_name = f"{student.user.first_name} {student.user.last_name}".strip() or student.user.username
-            status_text = 'Passed' if result.is_passed else 'Failed'
-            
-            writer.writerow([
-                idx,
-                student.roll_number or '',
-                student_name,
-                result.subject.name,
-                result.written_marks,
-                result.mcq_marks,
-                result.practical_marks,
-                result.total_obtained,
-                result.grade,
-                result.gpa,
-                status_text
-            ])
-        
-        return response
+        fields = [
+            'student__roll_number', 'student__user__first_name', 'student__user__last_name',
+            'student__user__username', 'subject__name', 'written_marks', 'mcq_marks',
+            'practical_marks', 'total_obtained', 'grade', 'gpa', 'is_passed',
+        ]
+        
+        def build_row(idx, row):
+            roll, first, last, username, subject, written, mcq, practical, total, grade, gpa, passed = row
+            return [
+                idx, roll or '', full_name(first, last, username), subject,
+                written, mcq, practical, total, grade, gpa,
+                'Passed' if passed else 'Failed'
+            ]
+        
+        return stream_export(
+            request, qs, fields,
+            ['Serial', 'Roll Number', 'Student Name', 'Subject', 'Written', 'MCQ', 'Practical', 'Total', 'Grade', 'GPA', 'Status'],
+            build_row, 'results_export'
+        )
 
 
 class StudentOverallResultViewSet(viewsets.ModelViewSet):
@@ -242,7 +318,7 @@ class StudentOverallResultViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['examination', 'student', 'is_passed']
     search_fields = ['student__user__first_name', 'student__user__last_name']
-    ordering_fields = ['cgpa', 'rank', 'percentage']
+    ordering_fields = ['cgpa', 'rank', 'section_rank', 'percentage']
     ordering = ['-cgpa']
     
     @action(detail=False, methods=['get'])
@@ -258,136 +334,99 @@ class StudentOverallResultViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        from academics.models import StudentProfile
-        
-        try:
-            student = StudentProfile.objects.get(id=student_id)
-        except StudentProfile.DoesNotExist:
-            return Response(
-                {"detail": "Student not found"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Get all examinations of this type for this classroom
-        examinations = Examination.objects.filter(
+        # Standings are maintained by the result recalculation path
+        standing = CombinedStanding.objects.filter(
+            classroom_id=classroom_id,
             exam_type=exam_type,
-            classroom_id=classroom_id
-        )
-        
-        if not examinations.exists():
-            return Response(
-                {"detail": "No examinations found for this type and classroom"},
-                status=status.HTTP_404_NOT_FOUND
-            )
+            student_id=student_id
+        ).first()
         
-        # Get all results for this student across all these examinations
-        results = Result.objects.filter(
-            examination__in=examinations,
-            student=student
-        ).select_related('examination', 'subject')
-        
-        if not results.exists():
+        if standing is None:
             return Response(
                 {"detail": "No results found for this student"},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Calculate combined totals
-        total_obtained = sum(float(r.total_obtained) for r in results)
-        total_possible = sum(r.examination.total_marks for r in results)
-        avg_gpa = sum(float(r.gpa) for r in results) / results.count()
-        percentage = (total_obtained / total_possible * 100) if total_possible > 0 else 0
-        is_passed = all(r.is_passed for r in results)
-        
-        # Determine grade based on CGPA
-        if avg_gpa >= 5.0:
-            grade = 'A+'
-        elif avg_gpa >= 4.0:
-            grade = 'A'
-        elif avg_gpa >= 3.5:
-            grade = 'A-'
-        elif avg_gpa >= 3.0:
-            grade = 'B'
-        elif avg_gpa >= 2.0:
-            grade = 'C'
-        elif avg_gpa >= 1.0:
-            grade = 'D'
-        else:
-            grade = 'F'
+        total_students = CombinedStanding.objects.filter(
+            classroom_id=classroom_id,
+            exam_type=exam_type
+        ).count()
         
-        # Calculate rank by comparing with other students in the same classroom
-        # Get all students in this classroom
-        from academics.models import StudentProfile
-        all_students = StudentProfile.objects.filter(classroom_id=classroom_id)
+        return Response({
+            'student': standing.student_id,
+            'exam_type': exam_type,
+            'classroom': classroom_id,
+            'total_marks_obtained': float(standing.total_marks_obtained),
+            'total_marks_possible': float(standing.total_marks_possible),
+            'percentage': float(standing.percentage),
+            'cgpa': float(standing.cgpa),
+            'grade': standing.grade,
+            'is_passed': standing.is_passed,
+            'rank': standing.rank,
+            'total_students': total_students
+        })
+    
+    @action(detail=False, methods=['get'])
+    def combined_leaderboard(self, request):
+        """Get the combined standings of a whole classroom for an exam type, ordered by rank"""
+        exam_type = request.query_params.get('exam_type')
+        classroom_id = request.query_params.get('classroom')
         
-        student_results = []
-        for s in all_students:
-            s_results = Result.objects.filter(
-                examination__in=examinations,
-                student=s
+        if not exam_type or not classroom_id:
+            return Response(
+                {"detail": "exam_type and classroom parameters are required"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            if s_results.exists():
-                s_total_obtained = sum(float(r.total_obtained) for r in s_results)
-                s_total_possible = sum(r.examination.total_marks for r in s_results)
-                s_avg_gpa = sum(float(r.gpa) for r in s_results) / s_results.count()
-                s_percentage = (s_total_obtained / s_total_possible * 100) if s_total_possible > 0 else 0
-                
-                student_results.append({
-                    'student_id': s.id,
-                    'cgpa': s_avg_gpa,
-                    'percentage': s_percentage
-                })
-        
-        # Sort by CGPA descending, then percentage descending
-        student_results.sort(key=lambda x: (-x['cgpa'], -x['percentage']))
         
-        # Find rank
-        rank = None
-        for idx, sr in enumerate(student_results, start=1):
-            if sr['student_id'] == student.id:
-                rank = idx
-                break
+        standings = CombinedStanding.objects.filter(
+            classroom_id=classroom_id,
+            exam_type=exam_type
+        ).select_related('student__user').order_by('rank')
+        
+        data = []
+        for standing in standings:
+            user = standing.student.user
+            data.append({
+                'rank': standing.rank,
+                'student': standing.student_id,
+                'student_name': f"{user.first_name} {user.last_name}".strip() or user.username,
+                'roll_number': standing.student.roll_number,
+                'total_marks_obtained': float(standing.total_marks_obtained),
+                'total_marks_possible': float(standing.total_marks_possible),
+                'percentage': float(standing.percentage),
+                'cgpa': float(standing.cgpa),
+                'grade': standing.grade,
+                'is_passed': standing.is_passed
+            })
         
         return Response({
-            'student': student.id,
             'exam_type': exam_type,
             'classroom': classroom_id,
-            'total_marks_obtained': round(total_obtained, 2),
-            'total_marks_possible': round(total_possible, 2),
-            'percentage': round(percentage, 2),
-            'cgpa': round(avg_gpa, 2),
-            'grade': grade,
-            'is_passed': is_passed,
-            'rank': rank,
-            'total_students': len(student_results)
+            'total_students': len(data),
+            'standings': data
         })
     
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        """Export overall results to CSV"""
+        """Export overall results to CSV (or XLSX with ?file_format=xlsx), streamed"""
         qs = self.filter_queryset(self.get_queryset())
         
-        response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-        response['Content-Disposition'] = 'attachment; filename="overall_results_export.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Rank', 'Roll Number', 'Student Name', 'Total Obtained', 'Total Possible', 'Percentage', 'CGPA', 'Grade', 'Status'])
-        
-        for result in qs:
-            student = result.student
-            student_name = f"{student.user.first_name} {student.user.last_name}".strip() or student.user.username
-            status_text = 'Passed' if result.is_passed else 'Failed'
-            
-            writer.writerow([
-                result.rank or '',
-                student.roll_number or '',
-                student_name,
-                result.total_marks_obtained,
-                result.total_marks_possible,
-                result.percentage,
-                result.cgpa,
-                result.grade,
-                status_text
-            ])
-        
-        return response
+        fields = [
+            'rank', 'student__roll_number', 'student__user__first_name', 'student__user__last_name',
+            'student__user__username', 'total_marks_obtained', 'total_marks_possible',
+            'percentage', 'cgpa', 'grade', 'is_passed',
+        ]
+        
+        def build_row(idx, row):
+            rank, roll, first, last, username, obtained, possible, percentage, cgpa, grade, passed = row
+            return [
+                rank or '', roll or '', full_name(first, last, username),
+                obtained, possible, percentage, cgpa, grade,
+                'Passed' if passed else 'Failed'
+            ]
+        
+        return stream_export(
+            request, qs, fields,
+            ['Rank', 'Roll Number', 'Student Name', 'Total Obtained', 'Total Possible', 'Percentage', 'CGPA', 'Grade', 'Status'],
+            build_row, 'overall_results_export'
+        )
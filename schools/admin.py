@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import School
+from .models import School, SchoolCalendar, CalendarEvent
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import path, reverse
 from django.utils.html import format_html
@@ -10,7 +10,7 @@ from django.middleware.csrf import get_token
 
 @admin.register(School)
 class SchoolAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'address', 'logo', 'import_link')
+    list_display = ('id', 'name', 'address', 'logo', 'receipt_prefix', 'import_link')
     
     def import_link(self, obj):
         url = reverse('admin:schools_school_import_students', args=[obj.id])
@@ -97,3 +97,13 @@ class SchoolAdmin(admin.ModelAdmin):
         <p><a href="{reverse('admin:schools_school_change', args=[school_id])}">Cancel</a></p>
         """
         return HttpResponse(html)
+
+
+@admin.register(SchoolCalendar)
+class SchoolCalendarAdmin(admin.ModelAdmin):
+    list_display = ('id', 'school', 'weekly_off_days', 'use_default_off_days', 'updated_at')
+
+@admin.register(CalendarEvent)
+class CalendarEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'school', 'name', 'kind', 'start_date', 'end_date')
+    list_filter = ('kind', 'school')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SchoolsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'schools'
+    
+    def ready(self):
+        """Import signals when the app is ready"""
+        import schools.signals
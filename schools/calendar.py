@@ -0,0 +1,117 @@
+"""
+Per-school working-day calendar.
+
+Weekly off-days, holidays and exam days are folded into one bitmap per
+month (bit 0 = day 1), the same layout as attendance.AttendanceMonth, so
+working days of any range are popcounts. A school's year of months is
+built with one query and cached in memory for SCHOOL_CALENDAR_CACHE_SECONDS;
+calendar changes drop the cache through signals.
+"""
+from calendar import monthrange
+from datetime import date
+import time
+
+from django.conf import settings
+from django.db.models import Q
+
+from attendance.months import month_start, range_mask, iter_months
+from .models import SchoolCalendar, CalendarEvent
+
+# (school_id, year) -> (expires_at, {month: CalendarMonth})
+_calendar_cache = {}
+
+
+class CalendarMonth:
+    """Day bitmaps of one month of a school calendar"""
+
+    def __init__(self, month, off_mask, holiday_mask, exam_mask):
+        self.month = month
+        self.days = monthrange(month.year, month.month)[1]
+        self.all_mask = (1 << self.days) - 1
+        self.off_mask = off_mask
+        self.holiday_mask = holiday_mask
+        self.exam_mask = exam_mask
+        # Exam days are school days; off-days and holidays are not
+        self.working_mask = self.all_mask & ~(off_mask | holiday_mask)
+
+    def working(self, start=None, end=None):
+        """Working-day bits, optionally limited to [start, end]"""
+        return self.working_mask & range_mask(self.month, start, end)
+
+    def working_days(self, start=None, end=None):
+        return self.working(start, end).bit_count()
+
+
+def _event_mask(month, days, start, end):
+    if start > date(month.year, month.month, days) or end < month:
+        return 0
+    return range_mask(month, max(start, month), end) & ((1 << days) - 1)
+
+
+def _build_year(school_id, year):
+    calendar = SchoolCalendar.objects.filter(school_id=school_id).values_list(
+        'weekly_off_days', 'use_default_off_days',
+    ).first()
+    # Schools without a calendar have no weekly off-days
+    off_days, use_default = calendar or ([], False)
+    off_days = set(getattr(settings, 'SCHOOL_WEEKLY_OFF_DAYS', []) if use_default else off_days)
+
+    first, last = date(year, 1, 1), date(year, 12, 31)
+    events = list(
+        CalendarEvent.objects.filter(school_id=school_id)
+        .filter(Q(start_date__lte=last) & Q(end_date__gte=first))
+        .values_list('kind', 'start_date', 'end_date')
+    )
+
+    months = {}
+    for month in iter_months(first, last):
+        days = monthrange(year, month.month)[1]
+        off_mask = 0
+        for day in range(days):
+            if date(year, month.month, day + 1).weekday() in off_days:
+                off_mask |= 1 << day
+        holiday_mask = exam_mask = 0
+        for kind, start, end in events:
+            mask = _event_mask(month, days, start, end)
+            if kind == 'holiday':
+                holiday_mask |= mask
+            else:
+                exam_mask |= mask
+        months[month] = CalendarMonth(month, off_mask, holiday_mask, exam_mask)
+    return months
+
+
+def get_calendar_month(school_id, month):
+    """Return the cached CalendarMonth of a school for the month containing `month`"""
+    month = month_start(month)
+    key = (int(school_id), month.year)
+    now = time.monotonic()
+    cached = _calendar_cache.get(key)
+    if not cached or cached[0] <= now:
+        ttl = getattr(settings, 'SCHOOL_CALENDAR_CACHE_SECONDS', 300)
+        cached = (now + ttl, _build_year(*key))
+        _calendar_cache[key] = cached
+    return cached[1][month]
+
+
+def working_days(school_id, start, end):
+    """Number of working days of a school between start and end (inclusive)"""
+    if end < start:
+        return 0
+    return sum(
+        get_calendar_month(school_id, month).working_days(start, end)
+        for month in iter_months(start, end)
+    )
+
+
+def is_working_day(school_id, day):
+    return bool(get_calendar_month(school_id, day).working_mask & (1 << (day.day - 1)))
+
+
+def invalidate_school_calendar(school_id=None):
+    """Drop the cached months of one school, or of all schools"""
+    if school_id is None:
+        _calendar_cache.clear()
+        return
+    for key in [key for key in _calendar_cache if key[0] == school_id]:
+        _calendar_cache.pop(key, None)
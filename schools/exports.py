@@ -0,0 +1,78 @@
+"""
+Streaming CSV/XLSX exports shared by the list endpoints.
+
+Rows are read with values_list(...).iterator() and written to the client as
+they are produced, so memory stays flat however many rows are exported.
+"""
+import csv
+import tempfile
+
+from django.http import JsonResponse, StreamingHttpResponse
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+CHUNK_SIZE = 2000
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """File-like object that hands back whatever csv.writer writes"""
+    def write(self, value):
+        return value
+
+
+def full_name(first_name, last_name, username):
+    """Student/user display name as used across the exports"""
+    return f"{first_name or ''} {last_name or ''}".strip() or username or ''
+
+
+def _csv_stream(header, rows):
+    writer = csv.writer(Echo())
+    # BOM so Excel opens UTF-8 (Bangla names) correctly
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _xlsx_stream(header, rows, sheet_title):
+    from openpyxl import Workbook
+
+    # Write-only mode keeps rows out of memory; the finished file is then streamed
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+
+def stream_export(request, queryset, fields, header, build_row, filename, chunk_size=CHUNK_SIZE):
+    """
+    Stream queryset rows as CSV (default) or XLSX (?file_format=xlsx).
+
+    fields is the values_list() projection; build_row(serial, values) turns
+    one projected tuple into the output row.
+    """
+    file_format = (request.GET.get('file_format') or 'csv').lower()
+    if file_format not in EXPORT_FORMATS:
+        return JsonResponse(
+            {'detail': f"Unsupported file_format. Use one of: {', '.join(EXPORT_FORMATS)}"},
+            status=400
+        )
+
+    values = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    rows = (build_row(serial, row) for serial, row in enumerate(values, start=1))
+
+    if file_format == 'xlsx':
+        response = StreamingHttpResponse(_xlsx_stream(header, rows, filename), content_type=XLSX_CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(_csv_stream(header, rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0004_schoolcalendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='receipt_prefix',
+            field=models.CharField(blank=True, max_length=10, null=True, unique=True),
+        ),
+    ]
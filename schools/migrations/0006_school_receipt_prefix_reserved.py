@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:11
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def clear_reserved_prefixes(apps, schema_editor):
+    """Schools that set an RCP<digits> prefix fall back to their own RCP<id> default"""
+    School = apps.get_model('schools', 'School')
+    School.objects.filter(receipt_prefix__regex=r'^RCP[0-9]+$').update(receipt_prefix=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0005_school_receipt_prefix'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='school',
+            name='receipt_prefix',
+            field=models.CharField(blank=True, max_length=10, null=True, unique=True, validators=[django.core.validators.RegexValidator('^RCP\\d+$', inverse_match=True, message='RCP followed by digits is reserved for the default receipt prefixes.')]),
+        ),
+        migrations.RunPython(clear_reserved_prefixes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0006_school_receipt_prefix_reserved'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schoolcalendar',
+            name='use_default_off_days',
+            field=models.BooleanField(default=False),
+        ),
+    ]
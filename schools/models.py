@@ -1,9 +1,54 @@
+from django.core.validators import RegexValidator
 from django.db import models
 
 class School(models.Model):
     name = models.CharField(max_length=255)
     address = models.CharField(max_length=255, blank=True)
     logo = models.ImageField(upload_to='school_logos/', blank=True, null=True)
+    # Start of the school's payment receipt numbers; RCP<id> when empty, so
+    # explicit prefixes may not take that form
+    receipt_prefix = models.CharField(
+        max_length=10, unique=True, blank=True, null=True,
+        validators=[RegexValidator(
+            r'^RCP\d+$', inverse_match=True,
+            message='RCP followed by digits is reserved for the default receipt prefixes.',
+        )],
+    )
 
     def __str__(self):
         return self.name
+
+
+class SchoolCalendar(models.Model):
+    """Weekly off-days of a school; holidays and exam days are CalendarEvents"""
+    school = models.OneToOneField(School, on_delete=models.CASCADE, related_name='calendar')
+    weekly_off_days = models.JSONField(default=list, blank=True)  # weekday numbers, 0 = Monday
+    # Take the weekly off-days from settings.SCHOOL_WEEKLY_OFF_DAYS instead
+    use_default_off_days = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.school.name} calendar"
+
+
+class CalendarEvent(models.Model):
+    """A holiday or exam period (inclusive date range) of a school"""
+    KINDS = [
+        ('holiday', 'Holiday'),
+        ('exam', 'Exam days'),
+    ]
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='calendar_events')
+    name = models.CharField(max_length=200)
+    kind = models.CharField(max_length=20, choices=KINDS, default='holiday')
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    class Meta:
+        ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['school', 'start_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.start_date} - {self.end_date})"
@@ -1,7 +1,31 @@
 from rest_framework import serializers
-from .models import School
+from .models import School, SchoolCalendar, CalendarEvent
 
 class SchoolSerializer(serializers.ModelSerializer):
     class Meta:
         model = School
-        fields = ['id', 'name', 'address', 'logo']
+        fields = ['id', 'name', 'address', 'logo', 'receipt_prefix']
+
+
+class SchoolCalendarSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SchoolCalendar
+        fields = ['id', 'school', 'weekly_off_days', 'use_default_off_days', 'updated_at']
+        read_only_fields = ['updated_at']
+
+    def validate_weekly_off_days(self, value):
+        if not isinstance(value, list) or any(not isinstance(d, int) or not 0 <= d <= 6 for d in value):
+            raise serializers.ValidationError("Use a list of weekday numbers from 0 (Monday) to 6 (Sunday)")
+        return sorted(set(value))
+
+class CalendarEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CalendarEvent
+        fields = ['id', 'school', 'name', 'kind', 'start_date', 'end_date']
+
+    def validate(self, attrs):
+        start = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start and end and end < start:
+            raise serializers.ValidationError({'end_date': 'end_date cannot be before start_date'})
+        return attrs
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import SchoolCalendar, CalendarEvent
+from .calendar import invalidate_school_calendar
+
+
+@receiver([post_save, post_delete], sender=SchoolCalendar)
+@receiver([post_save, post_delete], sender=CalendarEvent)
+def invalidate_calendar_on_change(sender, instance, **kwargs):
+    """Drop the cached working-day bitmaps when a school's calendar changes"""
+    invalidate_school_calendar(instance.school_id)
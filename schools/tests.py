@@ -1,3 +1,64 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .calendar import invalidate_school_calendar, is_working_day, working_days
+from .models import School, SchoolCalendar, CalendarEvent
+
+MARCH_START, MARCH_END = date(2026, 3, 1), date(2026, 3, 31)
+
+
+@override_settings(SCHOOL_WEEKLY_OFF_DAYS=[4])
+class WorkingDayCalendarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='School')
+
+    def setUp(self):
+        invalidate_school_calendar()
+
+    def test_schools_without_a_calendar_have_no_off_days(self):
+        self.assertEqual(working_days(self.school.id, MARCH_START, MARCH_END), 31)
+        self.assertTrue(is_working_day(self.school.id, date(2026, 3, 6)))
+
+    def test_default_off_days_are_opt_in(self):
+        calendar = SchoolCalendar.objects.create(school=self.school, weekly_off_days=[5, 6])
+        # Saturdays and Sundays: 7, 14, 21, 28 and 1, 8, 15, 22, 29
+        self.assertEqual(working_days(self.school.id, MARCH_START, MARCH_END), 22)
+
+        calendar.use_default_off_days = True
+        calendar.save()
+        # Fridays: 6, 13, 20, 27
+        self.assertEqual(working_days(self.school.id, MARCH_START, MARCH_END), 27)
+        self.assertFalse(is_working_day(self.school.id, date(2026, 3, 6)))
+
+    def test_holidays_are_off_and_exam_days_are_working(self):
+        SchoolCalendar.objects.create(school=self.school, use_default_off_days=True)
+        CalendarEvent.objects.create(
+            school=self.school, name='Spring break', kind='holiday',
+            start_date=date(2026, 2, 27), end_date=date(2026, 3, 3),
+        )
+        CalendarEvent.objects.create(
+            school=self.school, name='Midterms', kind='exam',
+            start_date=date(2026, 3, 16), end_date=date(2026, 3, 18),
+        )
+        # 27 weekdays but Fridays, less March 1-3
+        self.assertEqual(working_days(self.school.id, MARCH_START, MARCH_END), 24)
+        self.assertEqual(working_days(self.school.id, date(2026, 2, 26), date(2026, 3, 4)), 2)
+        self.assertTrue(is_working_day(self.school.id, date(2026, 3, 16)))
+
+    def test_months_endpoint(self):
+        calendar = SchoolCalendar.objects.create(school=self.school, use_default_off_days=True)
+        CalendarEvent.objects.create(
+            school=self.school, name='Founders day', kind='holiday',
+            start_date=date(2026, 3, 2), end_date=date(2026, 3, 2),
+        )
+
+        response = APIClient().get(f'/api/school-calendars/{calendar.id}/months/?year=2026', secure=True)
+        self.assertEqual(response.status_code, 200)
+        march = response.json()[2]
+        self.assertEqual(march['month'], '2026-03')
+        self.assertEqual(march['working_days'], 26)
+        self.assertEqual(march['off_mask'], sum(1 << (day - 1) for day in (6, 13, 20, 27)))
+        self.assertEqual(march['holiday_mask'], 1 << 1)
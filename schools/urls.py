@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import SchoolViewSet, dashboard_stats
+from .views import SchoolViewSet, SchoolCalendarViewSet, CalendarEventViewSet, dashboard_stats
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
 router.register(r'schools', SchoolViewSet)
+router.register(r'school-calendars', SchoolCalendarViewSet)
+router.register(r'calendar-events', CalendarEventViewSet)
 
 urlpatterns = [
     path('dashboard-stats/', dashboard_stats, name='dashboard-stats'),
@@ -1,14 +1,16 @@
 from rest_framework import viewsets, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
-from django.db.models import Count, Sum, Q, IntegerField, F
-from django.db.models.functions import Cast
-from .models import School
-from .serializers import SchoolSerializer
+from django.db.models import Count, Sum, Q
+from django_filters.rest_framework import DjangoFilterBackend
+from .models import School, SchoolCalendar, CalendarEvent
+from .serializers import SchoolSerializer, SchoolCalendarSerializer, CalendarEventSerializer
+from .calendar import get_calendar_month, is_working_day, working_days
 from academics.models import ClassRoom, StudentProfile, TeacherAssignment, Subject
 from users.models import Profile, User
-from attendance.models import AttendanceRecord
+from attendance.models import AttendanceDailyRollup
 from fees.models import Payment, FeeStructure
+from fees.summaries import collection_totals
 from datetime import datetime, timedelta
 
 class SchoolViewSet(viewsets.ModelViewSet):
@@ -16,6 +18,43 @@ class SchoolViewSet(viewsets.ModelViewSet):
     serializer_class = SchoolSerializer
     permission_classes = [permissions.AllowAny]  # TEMP: dev-only open access
 
+class SchoolCalendarViewSet(viewsets.ModelViewSet):
+    queryset = SchoolCalendar.objects.select_related('school').all()
+    serializer_class = SchoolCalendarSerializer
+    permission_classes = [permissions.AllowAny]  # TEMP: dev-only open access
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['school']
+    
+    @action(detail=True, methods=['get'])
+    def months(self, request, pk=None):
+        """Working-day bitmaps of every month of ?year= (bit 0 = day 1)"""
+        calendar = self.get_object()
+        try:
+            year = int(request.query_params.get('year') or datetime.now().year)
+        except ValueError:
+            return Response({"error": "Invalid year"}, status=400)
+        
+        months = []
+        for month_num in range(1, 13):
+            month = get_calendar_month(calendar.school_id, datetime(year, month_num, 1).date())
+            months.append({
+                'month': month.month.strftime('%Y-%m'),
+                'days': month.days,
+                'working_days': month.working_days(),
+                'working_mask': month.working_mask,
+                'off_mask': month.off_mask,
+                'holiday_mask': month.holiday_mask,
+                'exam_mask': month.exam_mask,
+            })
+        return Response(months)
+
+class CalendarEventViewSet(viewsets.ModelViewSet):
+    queryset = CalendarEvent.objects.all()
+    serializer_class = CalendarEventSerializer
+    permission_classes = [permissions.AllowAny]  # TEMP: dev-only open access
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['school', 'kind']
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])  # TEMP: dev-only open access
 def dashboard_stats(request):
@@ -53,22 +92,26 @@ def dashboard_stats(request):
     today = datetime.now().date()
     week_ago = today - timedelta(days=7)
     attendance_data = (
-        AttendanceRecord.objects.filter(
+        AttendanceDailyRollup.objects.filter(
             school_id=school_id,
             date__gte=week_ago
         )
         .values('date')
         .annotate(
-            present=Sum(Cast('present', IntegerField())),
-            total=Count('id'),
-        )
-        .annotate(
-            absent=F('total') - F('present')
+            present=Sum('present'),
+            absent=Sum('absent'),
         )
         .values('date', 'present', 'absent')
         .order_by('date')
     )
     
+    # Flag off-days/holidays so empty days are not read as missed roll-calls
+    attendance_data = [
+        {**row, 'is_working_day': is_working_day(school_id, row['date'])}
+        for row in attendance_data
+    ]
+    working_days_last_week = working_days(school_id, week_ago, today)
+    
     # Recent fee collections (last 30 days)
     month_ago = today - timedelta(days=30)
     fee_data = Payment.objects.filter(
@@ -78,6 +121,12 @@ def dashboard_stats(request):
         amount=Sum('amount')
     ).order_by('payment_date')
     
+    # Expected vs collected fees from the maintained FeeCollection summaries
+    fee_summary = {
+        'month': collection_totals(school_id, today.year, today.month),
+        'year': collection_totals(school_id, today.year),
+    }
+    
     # Class distribution
     class_distribution = StudentProfile.objects.filter(
         school_id=school_id
@@ -92,7 +141,9 @@ def dashboard_stats(request):
         'teachers_count': teachers_count,
         'classes_count': classes_count,
         'subjects_count': subjects_count,
-        'attendance_data': list(attendance_data),
+        'attendance_data': attendance_data,
+        'working_days_last_week': working_days_last_week,
         'fee_data': list(fee_data),
+        'fee_summary': fee_summary,
         'class_distribution': list(class_distribution)
     })